@@ -15,6 +15,8 @@ from .schemas import (
 )
 from .services import AuthService, UserService
 from .models import User
+from utils.budgets import perf_budget
+from utils.ratelimit import rate_limit
 
 
 # Authentication middleware
@@ -27,11 +29,24 @@ class AuthBearer(HttpBearer):
         return None
 
 
+class AsyncAuthBearer(AuthBearer):
+    """AuthBearer for async endpoints; the user lookup does not block the event loop"""
+    is_async = True
+
+    async def authenticate(self, request, token):
+        user = await AuthService.aget_user_from_token(token)
+        if user:
+            request.user = user
+            return token
+        return None
+
+
 router = Router()
 
 
 # Authentication endpoints
 @router.post("/login", response={200: TokenSchema, 401: ErrorResponseSchema})
+@rate_limit('login', per_ip='20/m', per_account='10/15m', account=lambda payload: payload.email.lower())
 def login(request, payload: LoginSchema):
     try:
         # Get user agent and IP for session tracking
@@ -55,6 +70,7 @@ def login(request, payload: LoginSchema):
 
 
 @router.post("/register", response={201: TokenSchema, 400: ErrorResponseSchema})
+@rate_limit('register', per_ip='10/h')
 def register(request, payload: RegisterSchema):
     try:
         result = AuthService.register(payload.dict())
@@ -76,6 +92,7 @@ def verify_email(request, payload: EmailVerificationSchema):
 
 
 @router.post("/password-reset/request", response={200: MessageResponseSchema})
+@rate_limit('password-reset', per_ip='5/15m', per_account='3/h', account=lambda payload: payload.email.lower())
 def request_password_reset(request, payload: PasswordResetRequestSchema):
     AuthService.request_password_reset(payload.email)
     # Always return success to prevent email enumeration
@@ -90,6 +107,8 @@ def confirm_password_reset(request, payload: PasswordResetConfirmSchema):
 
 
 @router.post("/refresh-token", response={200: TokenSchema, 401: ErrorResponseSchema})
+@rate_limit('refresh-token', per_ip='60/m', per_account='30/m',
+            account=lambda payload: AuthService.get_user_id_from_token(payload.refresh_token))
 def refresh_token(request, payload: RefreshTokenSchema):
     try:
         result = AuthService.refresh_token(payload.refresh_token)
@@ -115,8 +134,9 @@ def logout(request):
 
 
 # User profile endpoints
-@router.get("/me", response={200: UserProfileSchema, 401: ErrorResponseSchema}, auth=AuthBearer())
-def get_profile(request):
+@router.get("/me", response={200: UserProfileSchema, 401: ErrorResponseSchema}, auth=AsyncAuthBearer())
+@perf_budget(max_queries=1, max_ms=25)
+async def get_profile(request):
     return request.user
 
 
@@ -157,6 +177,7 @@ def upload_profile_picture(request, file: UploadedFile = File(...)):
 
 # Session management endpoints
 @router.get("/sessions", response=SessionListSchema, auth=AuthBearer())
+@perf_budget(max_queries=2, max_ms=25)
 def get_sessions(request):
     sessions = UserService.get_sessions(request.user)
     return {"sessions": sessions}
@@ -0,0 +1,112 @@
+# apps/accounts/hashers.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 with costs from settings; hashes made with other costs are upgraded on login"""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with the iteration count from settings"""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class PasswordHashingBusy(Exception):
+    """More password hashes are queued than PASSWORD_HASHING_QUEUE allows"""
+
+
+class PasswordHashingPool:
+    """
+    Run password hashing on a few dedicated threads.
+
+    PBKDF2 and Argon2 release the GIL, so the threads really run in
+    parallel with request handling; bounding them keeps a login burst from
+    taking every core. Work beyond the workers plus PASSWORD_HASHING_QUEUE
+    waiting jobs is refused immediately with PasswordHashingBusy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 2)
+                queue = getattr(settings, 'PASSWORD_HASHING_QUEUE', 8)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+                self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, func, *args):
+        if getattr(settings, 'PASSWORD_HASHING_WORKERS', 2) <= 0:
+            return func(*args)
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """Stop the threads; the next job starts a pool with current settings"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
+
+
+password_pool = PasswordHashingPool()
+
+
+def _verify(password, encoded):
+    # An unknown user ('' encoded) still costs one hash, as in Django
+    valid, must_update = hashers.verify_password(password, encoded)
+    return valid, valid and must_update
+
+
+def make_password(password):
+    """Hash a password on the hashing pool"""
+    return password_pool.run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    """
+    Check a password on the hashing pool. Returns (valid, needs_rehash);
+    needs_rehash is set when the hash uses an older hasher or cost than
+    PASSWORD_HASHERS[0] prescribes.
+    """
+    return password_pool.run(_verify, password, encoded)
+
+
+def check_password(user, password):
+    """
+    Check a user's password, upgrading its hash after a successful check.
+    ``user`` may be None, which is checked as a wrong password.
+    """
+    valid, needs_rehash = verify_password(password, user.password if user is not None else '')
+    if needs_rehash:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return valid
@@ -1,5 +1,6 @@
 # apps/accounts/models.py
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone  # Import Django's timezone utility
@@ -63,6 +64,10 @@ class User(AbstractUser):
         verbose_name = _('user')
         verbose_name_plural = _('users')
         db_table = 'users'
+        constraints = [
+            # Registration relies on this instead of checking first
+            models.UniqueConstraint(Lower('email'), name='users_email_ci_unique'),
+        ]
 
     def __str__(self):
         return self.email
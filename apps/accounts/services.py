@@ -1,13 +1,14 @@
 # apps/accounts/services.py
 from django.utils import timezone  # Import Django's timezone utility
 from datetime import timedelta
-from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError
 from django.conf import settings
+from django.db import IntegrityError, transaction
 import jwt as pyjwt  # Renamed to avoid conflicts
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from .models import User, EmailVerification, PasswordReset, UserSession
+from . import hashers
 import logging
 
 # Set up logging
@@ -33,6 +34,14 @@ class AuthService:
         """Create a refresh token for a user"""
         return AuthService.create_token(user_id, expiry=timedelta(days=7))  # 7 days refresh token
 
+    @staticmethod
+    def get_user_id_from_token(token):
+        """Get the user id carried by a valid JWT token, without a query"""
+        try:
+            return pyjwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])['user_id']
+        except (pyjwt.ExpiredSignatureError, pyjwt.InvalidTokenError, KeyError):
+            return None
+
     @staticmethod
     def get_user_from_token(token):
         """Get user from a JWT token"""
@@ -43,11 +52,23 @@ class AuthService:
         except (pyjwt.ExpiredSignatureError, pyjwt.InvalidTokenError, User.DoesNotExist):
             return None
 
+    @staticmethod
+    async def aget_user_from_token(token):
+        """Get user from a JWT token, for async views"""
+        user_id = AuthService.get_user_id_from_token(token)
+        if user_id is None:
+            return None
+        try:
+            return await User.objects.aget(id=user_id)
+        except User.DoesNotExist:
+            return None
+
     @staticmethod
     def login(email, password, user_agent=None, ip_address=None):
         """Authenticate a user and return tokens"""
-        user = authenticate(username=email, password=password)
-        if not user:
+        # Same checks as authenticate(), with hashing on the hashing pool
+        user = User.objects.filter(email=email).first()
+        if not hashers.check_password(user, password) or not user.is_active:
             raise ValidationError("Invalid credentials")
 
         # Temporarily comment out email verification check for testing
@@ -71,48 +92,50 @@ class AuthService:
     @staticmethod
     def register(data, send_verification=True):
         """Register a new user"""
+        # Ensure first_name and last_name are never null
+        first_name = data.get('first_name', '')
+        if first_name is None:
+            first_name = ''
+
+        last_name = data.get('last_name', '')
+        if last_name is None:
+            last_name = ''
+
+        # What create_user() does, with the hashing on the hashing pool.
+        # Hashed before the transaction so no locks are held meanwhile
+        user = User(
+            username=User.normalize_username(data['username']),
+            email=User.objects.normalize_email(data['email']),
+            password=hashers.make_password(data['password']),
+            first_name=first_name,
+            last_name=last_name,
+            phone_number=data.get('phone_number', '')
+        )
+
+        # The case-insensitive unique index on email decides duplicates, so
+        # concurrent sign-ups for one address cannot both succeed
         try:
-            if User.objects.filter(email=data['email']).exists():
-                raise ValidationError("Email already registered")
-
-            # Ensure first_name and last_name are never null
-            first_name = data.get('first_name', '')
-            if first_name is None:
-                first_name = ''
-
-            last_name = data.get('last_name', '')
-            if last_name is None:
-                last_name = ''
-
-            user = User.objects.create_user(
-                username=data['username'],
-                email=data['email'],
-                password=data['password'],
-                first_name=first_name,
-                last_name=last_name,
-                phone_number=data.get('phone_number', '')
-            )
+            with transaction.atomic():
+                user.save()
+                verification = EmailVerification.create_verification(user) if send_verification else None
+        except IntegrityError:
+            raise ValidationError("Email already registered")
+
+        if verification is not None:
+            try:
+                EmailService.send_verification_email(user, verification)
+            except Exception as e:
+                # Log the error but don't fail registration
+                logger.error(f"Error sending verification email: {e}")
+                # For testing, automatically verify the user
+                user.is_email_verified = True
+                user.save(update_fields=['is_email_verified'])
 
-            # Create email verification if requested
-            if send_verification:
-                try:
-                    verification = EmailVerification.create_verification(user)
-                    EmailService.send_verification_email(user, verification)
-                except Exception as e:
-                    # Log the error but don't fail registration
-                    logger.error(f"Error sending verification email: {e}")
-                    # For testing, automatically verify the user
-                    user.is_email_verified = True
-                    user.save()
-
-            return {
-                'access_token': AuthService.create_token(user.id),
-                'refresh_token': AuthService.create_refresh_token(user.id),
-                'user': user
-            }
-        except Exception as e:
-            logger.error(f"Registration error: {e}")
-            raise
+        return {
+            'access_token': AuthService.create_token(user.id),
+            'refresh_token': AuthService.create_refresh_token(user.id),
+            'user': user
+        }
 
     @staticmethod
     def verify_email(token):
@@ -164,7 +187,7 @@ class AuthService:
                 return False
 
             user = reset.user
-            user.set_password(new_password)
+            user.password = hashers.make_password(new_password)
             user.save()
 
             # Mark the token as used
@@ -213,10 +236,10 @@ class UserService:
     @staticmethod
     def change_password(user, current_password, new_password):
         """Change a user's password"""
-        if not user.check_password(current_password):
+        if not hashers.check_password(user, current_password):
             raise ValidationError("Current password is incorrect")
 
-        user.set_password(new_password)
+        user.password = hashers.make_password(new_password)
         user.save()
 
         # Invalidate all sessions except the current one
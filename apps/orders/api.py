@@ -1,8 +1,93 @@
 # apps/orders/api.py
+from datetime import date, timedelta
+from typing import List, Optional
+from django.utils import timezone
 from ninja import Router
+from apps.accounts.api import AuthBearer
+from apps.accounts.schemas import ErrorResponseSchema
+from .schemas import CategorySalesSchema, DailySalesSchema, ProductSalesSchema
+from .services import OrderService, SalesRollupService
+from utils.budgets import perf_budget
+from utils.streaming import ndjson_response
 
 router = Router()
 
 @router.get("/")
 def list_orders(request):
-    return {"message": "Orders API"}
\ No newline at end of file
+    return {"message": "Orders API"}
+
+
+# Admin export, one OrderSchema-shaped line per order
+@router.get("/export.ndjson", response={403: ErrorResponseSchema}, auth=AuthBearer())
+@perf_budget(max_queries=4, max_ms=250, staff=True)
+def export_orders(request):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+
+    return ndjson_response(
+        request,
+        OrderService.iter_export(),
+        last_modified=OrderService.export_last_modified(),
+        filename="orders.ndjson"
+    )
+
+
+# Admin analytics, read from the daily rollups only
+def _date_range(start, end):
+    """(start, end) defaulting to the last 30 days, or raise ValueError"""
+    end = end or timezone.localdate()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise ValueError("start must not be after end")
+    if (end - start).days >= SalesRollupService.MAX_RANGE_DAYS:
+        raise ValueError(f"At most {SalesRollupService.MAX_RANGE_DAYS} days per request")
+    return start, end
+
+
+@router.get(
+    "/analytics/daily", response={200: List[DailySalesSchema], 400: ErrorResponseSchema, 403: ErrorResponseSchema},
+    auth=AuthBearer()
+)
+@perf_budget(max_queries=2, max_ms=50, staff=True)
+def daily_sales(request, start: Optional[date] = None, end: Optional[date] = None):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+    try:
+        start, end = _date_range(start, end)
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+    return list(SalesRollupService.daily(start, end))
+
+
+@router.get(
+    "/analytics/products", response={200: List[ProductSalesSchema], 400: ErrorResponseSchema, 403: ErrorResponseSchema},
+    auth=AuthBearer()
+)
+@perf_budget(max_queries=2, max_ms=50, staff=True)
+def product_sales(request, start: Optional[date] = None, end: Optional[date] = None, limit: int = 20):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+    try:
+        start, end = _date_range(start, end)
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+    return list(SalesRollupService.top_products(start, end, max(1, min(limit, 100))))
+
+
+@router.get(
+    "/analytics/categories",
+    response={200: List[CategorySalesSchema], 400: ErrorResponseSchema, 403: ErrorResponseSchema},
+    auth=AuthBearer()
+)
+@perf_budget(max_queries=2, max_ms=50, staff=True)
+def category_sales(request, start: Optional[date] = None, end: Optional[date] = None):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+    try:
+        start, end = _date_range(start, end)
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+    return list(SalesRollupService.categories(start, end))
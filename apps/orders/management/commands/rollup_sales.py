@@ -0,0 +1,50 @@
+# apps/orders/management/commands/rollup_sales.py
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+from apps.orders.models import Order, RollupWatermark
+from apps.orders.services import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = "Update the daily sales rollups from the orders changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help="Rebuild every day from --start to --end (default: all order history) in parallel"
+        )
+        parser.add_argument('--start', type=date.fromisoformat, help="First day to backfill, YYYY-MM-DD")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day to backfill, YYYY-MM-DD")
+        parser.add_argument('--workers', type=int, default=4, help="Backfill worker processes")
+        parser.add_argument('--chunk-days', type=int, default=30, help="Days rebuilt per backfill task")
+
+    def handle(self, *args, **options):
+        if not options['backfill']:
+            days = SalesRollupService.update_incremental()
+            self.stdout.write(self.style.SUCCESS(f"Sales rollups updated ({days} days rebuilt)"))
+            return
+
+        started = timezone.now()
+        start, end = options['start'], options['end']
+        whole_history = start is None and end is None
+        if start is None or end is None:
+            history = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+            if history['first'] is None:
+                self.stdout.write("No orders to roll up")
+                return
+            start = start or timezone.localdate(history['first'])
+            end = end or timezone.localdate(history['last'])
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        if options['chunk_days'] < 1:
+            raise CommandError("--chunk-days must be at least 1")
+
+        days = SalesRollupService.backfill(start, end, workers=options['workers'], chunk_days=options['chunk_days'])
+        if whole_history:
+            # Incremental runs then start from here instead of rebuilding it all again
+            RollupWatermark.objects.get_or_create(
+                name=SalesRollupService.WATERMARK, defaults={'position': started}
+            )
+        self.stdout.write(self.style.SUCCESS(f"Sales rollups rebuilt from {start} to {end} ({days} days with sales)"))
@@ -0,0 +1,36 @@
+# apps/orders/management/commands/sweep_holds.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from apps.orders.services import HoldService
+
+
+class Command(BaseCommand):
+    help = "Cancel pending orders whose stock hold expired and put their stock back"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=HoldService.SWEEP_BATCH_SIZE, help="Holds released per transaction"
+        )
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help="Keep sweeping, pausing this many seconds whenever nothing has expired"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['interval'] is None:
+            released = HoldService.release_expired(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Released {released} expired stock holds"))
+            return
+
+        while True:
+            released = HoldService.release_expired(batch_size=options['batch_size'])
+            if released:
+                self.stdout.write(f"Released {released} expired stock holds")
+            else:
+                # Don't keep a connection open while idle
+                connection.close()
+                time.sleep(options['interval'])
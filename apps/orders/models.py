@@ -0,0 +1,108 @@
+# apps/orders/models.py
+from django.conf import settings
+from django.db import models
+from utils.constants import OrderStatus
+
+
+class Order(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='orders')
+    status = models.CharField(
+        max_length=20,
+        choices=[(status.value, status.name.title()) for status in OrderStatus],
+        default=OrderStatus.PENDING.value,
+    )
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Order #{self.pk} - {self.status}"
+
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey('products.Product', on_delete=models.PROTECT, related_name='order_items')
+    # Snapshot of the product at checkout time
+    product_name = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+
+class StockHold(models.Model):
+    """Stock reserved for a pending order until it is paid or expires_at passes"""
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='stock_hold')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The sweeper takes the oldest expired holds first
+            models.Index(fields=['expires_at'], name='stock_hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stock hold for order #{self.order_id} until {self.expires_at}"
+
+
+# Sales rollups, rebuilt a day at a time by the rollup_sales command so the
+# analytics endpoints never aggregate raw orders
+class DailySales(models.Model):
+    day = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Daily sales'
+
+    def __str__(self):
+        return f"Sales on {self.day}"
+
+
+class DailyProductSales(models.Model):
+    day = models.DateField()
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Daily product sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_product_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"Sales of product {self.product_id} on {self.day}"
+
+
+class DailyCategorySales(models.Model):
+    day = models.DateField()
+    category = models.ForeignKey('products.Category', on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'Daily category sales'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='daily_category_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"Sales in category {self.category_id} on {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """How far a rollup has read the orders, by Order.updated_at"""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.position}"
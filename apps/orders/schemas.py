@@ -0,0 +1,44 @@
+# apps/orders/schemas.py
+from ninja import Schema
+from typing import List
+from datetime import date, datetime
+
+
+class OrderItemSchema(Schema):
+    product_id: int
+    product_name: str
+    quantity: int
+    unit_price: float
+
+
+class OrderSchema(Schema):
+    id: int
+    user_id: int
+    status: str
+    total_amount: float
+    created_at: datetime
+    updated_at: datetime
+    items: List[OrderItemSchema] = []
+
+
+class DailySalesSchema(Schema):
+    day: date
+    orders: int
+    units: int
+    revenue: float
+
+
+class ProductSalesSchema(Schema):
+    product_id: int
+    name: str
+    orders: int
+    units: int
+    revenue: float
+
+
+class CategorySalesSchema(Schema):
+    category_id: int
+    name: str
+    orders: int
+    units: int
+    revenue: float
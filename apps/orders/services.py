@@ -0,0 +1,265 @@
+# apps/orders/services.py
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from apps.products.inventory import StockService
+from .models import DailyCategorySales, DailyProductSales, DailySales, Order, OrderItem, RollupWatermark, StockHold
+from utils.constants import OrderStatus, StockReason
+from utils.parallel import map_chunks
+from utils.streaming import iter_ndjson
+
+
+class OrderService:
+    ROW_FIELDS = ('id', 'user_id', 'status', 'total_amount', 'created_at', 'updated_at')
+    EXPORT_CHUNK_SIZE = 2000
+
+    @staticmethod
+    def rows(queryset):
+        """Orders as plain rows for exports"""
+        return queryset.values(*OrderService.ROW_FIELDS)
+
+    @staticmethod
+    def finish_rows(rows):
+        """Shape a chunk of order rows like OrderSchema, items in one query"""
+        items = defaultdict(list)
+        item_rows = OrderItem.objects.filter(
+            order_id__in=[row['id'] for row in rows]
+        ).order_by('id').values_list('order_id', 'product_id', 'product_name', 'quantity', 'unit_price')
+        for order_id, product_id, product_name, quantity, unit_price in item_rows:
+            items[order_id].append({
+                'product_id': product_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'unit_price': float(unit_price),
+            })
+
+        for row in rows:
+            row['total_amount'] = float(row['total_amount'])
+            row['items'] = items[row['id']]
+        return rows
+
+    @staticmethod
+    def export_last_modified():
+        return Order.objects.aggregate(latest=Max('updated_at'))['latest']
+
+    @staticmethod
+    def iter_export(chunk_size=EXPORT_CHUNK_SIZE):
+        """Stream every order as NDJSON through a server-side cursor"""
+        rows = OrderService.rows(Order.objects.order_by('id')).iterator(chunk_size=chunk_size)
+        return iter_ndjson(rows, OrderService.finish_rows, chunk_size=chunk_size)
+
+
+class SalesRollupService:
+    """
+    Daily sales totals, overall and per product and category.
+
+    A day's rollup rows are always rebuilt whole from its orders, so
+    running any day twice gives the same rows. Orders count on the day
+    they were placed; cancelled orders are left out. The incremental run
+    only rebuilds the days of orders changed since its watermark.
+    """
+    WATERMARK = 'daily_sales'
+    # Re-read orders changed this long before the watermark, so one whose
+    # transaction committed late is not skipped for good
+    SETTLE_SECONDS = 300
+    MAX_RANGE_DAYS = 366
+
+    @staticmethod
+    def _bounds(start, end):
+        """Aware datetimes from the start of day start to the end of day end"""
+        tz = timezone.get_current_timezone()
+        return (
+            timezone.make_aware(datetime.combine(start, time.min), tz),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+        )
+
+    @staticmethod
+    def rebuild_days(start, end):
+        """Recompute the rollups of the days from start to end inclusive, returning the days with sales"""
+        since, until = SalesRollupService._bounds(start, end)
+        line_total = ExpressionWrapper(
+            F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)
+        )
+        lines = (
+            OrderItem.objects.filter(order__created_at__gte=since, order__created_at__lt=until)
+            .exclude(order__status=OrderStatus.CANCELLED.value)
+            .annotate(day=TruncDate('order__created_at'))
+            .order_by()
+        )
+        totals = {
+            'orders': Count('order_id', distinct=True),
+            'units': Sum('quantity'),
+            'revenue': Sum(line_total),
+        }
+
+        days = [DailySales(**row) for row in lines.values('day').annotate(**totals)]
+        products = [
+            DailyProductSales(**row) for row in lines.values('day', 'product_id').annotate(**totals)
+        ]
+        categories = [
+            DailyCategorySales(day=row.pop('day'), category_id=row.pop('product__category_id'), **row)
+            for row in lines.values('day', 'product__category_id').annotate(**totals)
+        ]
+
+        with transaction.atomic():
+            for model, rows in ((DailySales, days), (DailyProductSales, products), (DailyCategorySales, categories)):
+                model.objects.filter(day__gte=start, day__lte=end).delete()
+                model.objects.bulk_create(rows, batch_size=1000)
+        return len(days)
+
+    @staticmethod
+    def update_incremental(now=None):
+        """
+        Rebuild the days of the orders created or changed since the last run
+        (every day with orders on the first run), returning the days rebuilt
+        """
+        now = now or timezone.now()
+        watermark = RollupWatermark.objects.filter(name=SalesRollupService.WATERMARK).first()
+        orders = Order.objects.order_by()
+        if watermark:
+            orders = orders.filter(
+                updated_at__gte=watermark.position - timedelta(seconds=SalesRollupService.SETTLE_SECONDS)
+            )
+        days = sorted(orders.annotate(day=TruncDate('created_at')).values_list('day', flat=True).distinct())
+
+        # Runs of consecutive days are rebuilt together
+        rebuilt = 0
+        while rebuilt < len(days):
+            first = last = days[rebuilt]
+            rebuilt += 1
+            while rebuilt < len(days) and days[rebuilt] == last + timedelta(days=1):
+                last = days[rebuilt]
+                rebuilt += 1
+            SalesRollupService.rebuild_days(first, last)
+
+        # Orders changed while this ran are picked up next time
+        RollupWatermark.objects.update_or_create(
+            name=SalesRollupService.WATERMARK, defaults={'position': now}
+        )
+        return len(days)
+
+    @staticmethod
+    def backfill(start, end, workers=4, chunk_days=30):
+        """
+        Rebuild every day from start to end in chunks of chunk_days, spread
+        over a pool of worker processes. Returns the days with sales.
+        """
+        chunks = []
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+            chunks.append((chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+
+        return sum(map_chunks(SalesRollupService.rebuild_days, chunks, workers=workers))
+
+    @staticmethod
+    def daily(start, end):
+        return DailySales.objects.filter(day__gte=start, day__lte=end).order_by('day').values(
+            'day', 'orders', 'units', 'revenue'
+        )
+
+    @staticmethod
+    def top_products(start, end, limit):
+        """Products by revenue over the days from start to end"""
+        return (
+            DailyProductSales.objects.filter(day__gte=start, day__lte=end)
+            .values('product_id', name=F('product__name'))
+            .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'product_id')[:limit]
+        )
+
+    @staticmethod
+    def categories(start, end):
+        """Categories by revenue over the days from start to end"""
+        return (
+            DailyCategorySales.objects.filter(day__gte=start, day__lte=end)
+            .values('category_id', name=F('category__name'))
+            .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'category_id')
+        )
+
+
+class HoldService:
+    """
+    Stock held for pending orders while they await payment.
+
+    Placing an order's hold takes its items out of stock until expires_at.
+    Payment confirms the hold by deleting it; once it expires, the sweeper
+    cancels the order and puts the stock back if it is still pending, and
+    otherwise only drops the hold. Each sweeper batch locks its
+    holds with SKIP LOCKED, so any number of sweepers can run side by side
+    and each takes different rows instead of queueing behind the others.
+    """
+    SWEEP_BATCH_SIZE = 500
+
+    @staticmethod
+    def place(order_id, now=None):
+        """
+        Reserve a pending order's items until ORDER_HOLD_SECONDS from now.
+        Raises ValueError when the order is not pending, already holds
+        stock, or some item is short.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            status = Order.objects.select_for_update().filter(id=order_id).values_list('status', flat=True).first()
+            if status != OrderStatus.PENDING.value:
+                raise ValueError("Only pending orders can hold stock")
+            if StockHold.objects.filter(order_id=order_id).exists():
+                raise ValueError("Order already holds stock")
+            StockService.reserve_order(order_id)
+            return StockHold.objects.create(
+                order_id=order_id,
+                expires_at=now + timedelta(seconds=getattr(settings, 'ORDER_HOLD_SECONDS', 900)),
+            )
+
+    @staticmethod
+    def confirm(order_id):
+        """
+        Keep the stock of a paid order for good. False when the hold is gone
+        because it already expired and the order was cancelled.
+        """
+        deleted, _ = StockHold.objects.filter(order_id=order_id).delete()
+        return deleted > 0
+
+    @staticmethod
+    def release_expired_batch(now=None, batch_size=SWEEP_BATCH_SIZE):
+        """Release up to batch_size expired holds in one transaction, returning how many"""
+        now = now or timezone.now()
+        with transaction.atomic():
+            order_ids = list(
+                StockHold.objects.select_for_update(skip_locked=True)
+                .filter(expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('order_id', flat=True)[:batch_size]
+            )
+            if not order_ids:
+                return 0
+            # Orders paid or moved on by an admin keep their stock: only
+            # their hold goes
+            pending = list(
+                Order.objects.select_for_update()
+                .filter(id__in=order_ids, status=OrderStatus.PENDING.value)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            if pending:
+                StockService.release_orders(pending, StockReason.CANCELLATION)
+                Order.objects.filter(id__in=pending).update(status=OrderStatus.CANCELLED.value, updated_at=now)
+            StockHold.objects.filter(order_id__in=order_ids).delete()
+        return len(order_ids)
+
+    @staticmethod
+    def release_expired(now=None, batch_size=SWEEP_BATCH_SIZE):
+        """Release every hold expired by now, batch by batch, returning how many"""
+        now = now or timezone.now()
+        released = 0
+        while True:
+            count = HoldService.release_expired_batch(now, batch_size)
+            released += count
+            if count < batch_size:
+                return released
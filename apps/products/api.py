@@ -1,27 +1,59 @@
 # apps/products/api.py
+from asgiref.sync import sync_to_async
 from ninja import Router, File
 from ninja.files import UploadedFile
 from ninja.pagination import paginate
-from typing import List
-from django.shortcuts import get_object_or_404
+from typing import List, Optional
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from .schemas import (
     CategorySchema, CategoryCreateSchema,
-    ProductSchema, ProductCreateSchema, ProductUpdateSchema
+    ProductSchema, ProductCreateSchema, ProductUpdateSchema, ProductSort,
+    ProductBatchSchema, ProductSlugBatchSchema, SuggestionsSchema,
+    HomeSchema, CatalogChangesSchema
 )
+from apps.accounts.schemas import ErrorResponseSchema
 from .models import Category, Product, ProductImage
+from .services import (
+    CatalogService, CategoryService, ChangeFeedService, HomeService, ProductService, SuggestService
+)
+from .inventory import StockService
+from .recommendations import RecommendationService
+from .tracking import view_counter
+from utils.budgets import perf_budget
+from utils.fieldsets import sparse_fields, sparse_response
+from utils.renderers import renders_rows, trusted_output
+from utils.singleflight import cached_response
+from utils.streaming import ndjson_response
 
 router = Router()
 
 
 # Category endpoints
 @router.get("/categories", response=List[CategorySchema])
-def list_categories(request):
-    return Category.objects.filter(is_active=True)
+@perf_budget(max_queries=1, max_ms=50)
+@sparse_fields(CategorySchema)
+@cached_response('categories', CategorySchema, version=CatalogService.get_version)
+@trusted_output(CategoryService.finish_rows, CategorySchema)
+async def list_categories(request, fields: Optional[str] = None):
+    categories = Category.objects.filter(is_active=True)
+    if renders_rows(request):
+        return [row async for row in CategoryService.rows(categories, fields=fields)]
+    return [category async for category in categories]
 
 
 @router.get("/categories/{category_id}", response=CategorySchema)
-def get_category(request, category_id: int):
-    return get_object_or_404(Category, id=category_id, is_active=True)
+@perf_budget(max_queries=1, max_ms=25)
+@sparse_fields(CategorySchema)
+async def get_category(request, category_id: int, fields: Optional[str] = None):
+    if fields:
+        categories = Category.objects.filter(id=category_id, is_active=True)
+        row = await CategoryService.rows(categories, fields=fields).afirst()
+        if row is None:
+            raise Http404
+        return sparse_response(CategoryService.finish_rows([row], fields)[0], fields)
+    return await aget_object_or_404(Category, id=category_id, is_active=True)
 
 
 @router.post("/categories", response=CategorySchema)
@@ -38,16 +70,115 @@ def create_category(request, payload: CategoryCreateSchema):
     return category
 
 
+# Homepage feed, served pre-serialized from the snapshot
+@router.get("/home", response=HomeSchema)
+@perf_budget(max_queries=0, max_ms=25)
+async def get_home(request):
+    # A cache hit is one round trip; a miss rebuilds from the database
+    snapshot = await sync_to_async(HomeService.get_snapshot)()
+    return HttpResponse(snapshot, content_type="application/json")
+
+
 # Product endpoints
 @router.get("/products", response=List[ProductSchema])
+@perf_budget(max_queries=3, max_ms=150, query={'limit': 100})
+@sparse_fields(ProductSchema)
+@cached_response('products', ProductSchema, version=CatalogService.get_version)
+@trusted_output(ProductService.finish_rows, ProductSchema)
 @paginate
-def list_products(request):
-    return Product.objects.filter(is_active=True)
+def list_products(request, sort: ProductSort = 'newest', min_price: Optional[float] = None,
+                  max_price: Optional[float] = None, on_sale: Optional[bool] = None,
+                  fields: Optional[str] = None):
+    products = ProductService.filter_products(
+        ProductService.get_active_products(),
+        sort=sort,
+        min_price=min_price,
+        max_price=max_price,
+        on_sale=on_sale
+    )
+    if renders_rows(request):
+        return ProductService.rows(products, fields=fields)
+    return products
+
+
+# Full product feed for partners, one ProductSchema-shaped line per product
+@router.get("/feed.ndjson")
+@perf_budget(max_queries=4, max_ms=250)
+def product_feed(request):
+    return ndjson_response(
+        request,
+        ProductService.iter_feed(),
+        last_modified=ProductService.feed_last_modified(),
+        filename="products.ndjson"
+    )
+
+
+# Incremental catalog sync: only rows changed since the client's token
+@router.get("/changes", response={200: CatalogChangesSchema, 400: ErrorResponseSchema})
+@perf_budget(max_queries=3, max_ms=250)
+def catalog_changes(request, since: Optional[str] = None, limit: int = ChangeFeedService.PAGE_SIZE):
+    try:
+        return 200, ChangeFeedService.get_changes(since, limit=max(1, min(limit, ChangeFeedService.PAGE_SIZE)))
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+
+# Search-as-you-type, answered from an in-process index without queries
+@router.get("/products/suggest", response=SuggestionsSchema)
+@perf_budget(max_queries=0, max_ms=10, query={'q': 'bench'})
+def suggest_products(request, q: str, limit: int = SuggestService.LIMIT):
+    return SuggestService.suggest(q, limit=max(1, limit))
+
+
+def _split(values):
+    return [value.strip() for value in values.split(',') if value.strip()]
+
+
+# Many products in one request, e.g. to render a cart or a wishlist
+@router.get("/products/batch", response={200: ProductBatchSchema, 400: ErrorResponseSchema})
+@perf_budget(max_queries=2, max_ms=50, query={'ids': '1,2,3,4,5'})
+def get_products_batch(request, ids: str):
+    try:
+        product_ids = [int(value) for value in _split(ids)]
+    except ValueError:
+        return 400, {"detail": "ids must be a comma-separated list of integers"}
+    if len(product_ids) > ProductService.BATCH_LIMIT:
+        return 400, {"detail": f"At most {ProductService.BATCH_LIMIT} products per request"}
+    return 200, ProductService.get_batch(product_ids)
+
+
+@router.get("/products/batch/by-slug", response={200: ProductSlugBatchSchema, 400: ErrorResponseSchema})
+@perf_budget(max_queries=2, max_ms=50, query={'slugs': 'bench-product-1,bench-product-2'})
+def get_products_batch_by_slug(request, slugs: str):
+    product_slugs = _split(slugs)
+    if len(product_slugs) > ProductService.BATCH_LIMIT:
+        return 400, {"detail": f"At most {ProductService.BATCH_LIMIT} products per request"}
+    return 200, ProductService.get_batch(product_slugs, field='slug')
 
 
 @router.get("/products/{product_id}", response=ProductSchema)
-def get_product(request, product_id: int):
-    return get_object_or_404(Product, id=product_id, is_active=True)
+@perf_budget(max_queries=2, max_ms=25)
+@sparse_fields(ProductSchema)
+async def get_product(request, product_id: int, fields: Optional[str] = None):
+    if fields:
+        row = await sync_to_async(ProductService.get_row)(product_id, fields)
+        if row is None:
+            raise Http404
+        view_counter.record(product_id)
+        return sparse_response(row, fields)
+    # category and images are loaded up front: lazy loads fail in async views
+    product = await aget_object_or_404(ProductService.get_active_products(), id=product_id)
+    view_counter.record(product_id)
+    return product
+
+
+# "Frequently bought together", precomputed by build_recommendations
+@router.get("/products/{product_id}/related", response=List[ProductSchema])
+@perf_budget(max_queries=3, max_ms=25)
+def get_related_products(request, product_id: int, limit: int = 10):
+    related_ids = RecommendationService.get_related_ids(product_id, limit=max(1, min(limit, 50)))
+    # Rendered products come from the per-product cache; inactive ones drop out
+    return ProductService.get_batch(related_ids)['products'] if related_ids else []
 
 
 @router.post("/products", response=ProductSchema)
@@ -55,23 +186,35 @@ def create_product(request, payload: ProductCreateSchema):
     product_data = payload.dict()
     category_id = product_data.pop('category_id')
     category = get_object_or_404(Category, id=category_id)
+    stock = product_data.pop('stock', 0)
 
-    product = Product.objects.create(category=category, **product_data)
+    with transaction.atomic():
+        product = Product.objects.create(category=category, **product_data)
+        StockService.set_levels({product.id: stock}, reference="product created")
+    product.refresh_from_db(fields=['stock'])
     return product
 
 
 @router.put("/products/{product_id}", response=ProductSchema)
 def update_product(request, product_id: int, payload: ProductUpdateSchema):
     product = get_object_or_404(Product, id=product_id)
+    changes = payload.dict(exclude_unset=True)
+    # Stock only changes through the ledger
+    stock = changes.pop('stock', None)
 
-    for attr, value in payload.dict(exclude_unset=True).items():
+    for attr, value in changes.items():
         if attr == 'category_id' and value is not None:
             category = get_object_or_404(Category, id=value)
             product.category = category
         else:
             setattr(product, attr, value)
 
-    product.save()
+    with transaction.atomic():
+        # Only the edited fields: saving the stale stock would undo concurrent movements
+        product.save(update_fields=[*changes, 'updated_at'])
+        if stock is not None:
+            StockService.set_levels({product.id: stock}, reference="admin edit")
+    product.refresh_from_db(fields=['stock'])
     return product
 
 
@@ -0,0 +1,12 @@
+# apps/products/apps.py
+from django.apps import AppConfig
+
+
+class ProductsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.products'
+    label = 'products'
+
+    def ready(self):
+        # Register the catalog version signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,215 @@
+# apps/products/inventory.py
+"""
+Stock as an append-only ledger.
+
+Every change to a product's stock is a StockMovement row, inserted in bulk
+together with the matching update of Product.stock, which is only a cached
+sum of the ledger. snapshot_stock periodically records each changed
+product's total, so the stock at any moment is one snapshot plus the
+movements after it. verify_stock compares the cached sums with the ledger.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Exists, F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.orders.models import OrderItem
+from utils.constants import StockReason
+from utils.parallel import map_chunks
+from .models import Product, StockMovement, StockSnapshot
+from .services import CatalogService
+
+
+class StockService:
+    BATCH_SIZE = 1000
+    VERIFY_CHUNK_SIZE = 5000
+    # Snapshots only cover movements this old, so one whose transaction
+    # commits after a higher id has been snapshotted is not skipped for good
+    SNAPSHOT_SETTLE_SECONDS = 60
+
+    @staticmethod
+    def record(movements):
+        """Insert StockMovement rows and add them to Product.stock, returning the products changed"""
+        if not movements:
+            return 0
+        totals = defaultdict(int)
+        for movement in movements:
+            totals[movement.product_id] += movement.delta
+        totals = sorted((product_id, delta) for product_id, delta in totals.items() if delta)
+
+        with transaction.atomic():
+            StockMovement.objects.bulk_create(movements, batch_size=StockService.BATCH_SIZE)
+            table = connection.ops.quote_name(Product._meta.db_table)
+            updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+            with connection.cursor() as cursor:
+                for start in range(0, len(totals), StockService.BATCH_SIZE):
+                    batch = totals[start:start + StockService.BATCH_SIZE]
+                    # One statement per batch, whatever the number of products:
+                    # the same UPDATE ... FROM works on PostgreSQL and SQLite
+                    cursor.execute(
+                        f"WITH changes (id, delta) AS (VALUES {', '.join(['(%s, %s)'] * len(batch))}) "
+                        f"UPDATE {table} SET stock = {table}.stock + changes.delta, updated_at = %s "
+                        f"FROM changes WHERE {table}.id = changes.id",
+                        [value for row in batch for value in row] + [updated_at]
+                    )
+            # Cached listings include the stock
+            transaction.on_commit(CatalogService.bump_version)
+        return len(totals)
+
+    @staticmethod
+    def apply(changes, reason, reference=''):
+        """Record {product_id: delta} as movements, returning the products changed"""
+        reason = StockReason(reason).value
+        return StockService.record([
+            StockMovement(product_id=product_id, delta=delta, reason=reason, reference=reference)
+            for product_id, delta in changes.items()
+            if delta
+        ])
+
+    @staticmethod
+    def set_levels(levels, reason=StockReason.ADJUSTMENT, reference=''):
+        """Bring products to the given {product_id: stock} levels, e.g. from an admin edit or an import"""
+        with transaction.atomic():
+            current = dict(
+                Product.objects.select_for_update()
+                .filter(id__in=list(levels))
+                .order_by('id')
+                .values_list('id', 'stock')
+            )
+            changes = {
+                product_id: stock - current[product_id]
+                for product_id, stock in levels.items()
+                if product_id in current
+            }
+            return StockService.apply(changes, reason, reference)
+
+    @staticmethod
+    def _order_movements(order_ids, sign, reason):
+        reason = StockReason(reason).value
+        lines = OrderItem.objects.filter(order_id__in=order_ids).order_by('order_id', 'id')
+        return [
+            StockMovement(product_id=product_id, delta=sign * quantity, reason=reason, reference=f"order:{order_id}")
+            for order_id, product_id, quantity in lines.values_list('order_id', 'product_id', 'quantity')
+        ]
+
+    @staticmethod
+    def reserve_order(order_id):
+        """Take an order's items out of stock, or raise ValueError when some are short"""
+        movements = StockService._order_movements([order_id], -1, StockReason.RESERVATION)
+        needed = defaultdict(int)
+        for movement in movements:
+            needed[movement.product_id] -= movement.delta
+        with transaction.atomic():
+            # Locked in id order, so concurrent reservations cannot deadlock
+            available = dict(
+                Product.objects.select_for_update()
+                .filter(id__in=list(needed))
+                .order_by('id')
+                .values_list('id', 'stock')
+            )
+            short = sorted(
+                product_id for product_id, quantity in needed.items() if available.get(product_id, 0) < quantity
+            )
+            if short:
+                raise ValueError(f"Not enough stock for products: {', '.join(map(str, short))}")
+            return StockService.record(movements)
+
+    @staticmethod
+    def release_orders(order_ids, reason=StockReason.CANCELLATION):
+        """Put the items of orders back, when they are cancelled or returned"""
+        return StockService.record(StockService._order_movements(order_ids, 1, reason))
+
+    @staticmethod
+    def stock_at(product_id, when):
+        """A product's stock as of when: the latest snapshot before it plus the movements since"""
+        snapshot = (
+            StockSnapshot.objects.filter(product_id=product_id, taken_at__lte=when)
+            .order_by('-taken_at', '-id')
+            .values('stock', 'movement_id')
+            .first()
+        ) or {'stock': 0, 'movement_id': 0}
+        tail = StockMovement.objects.filter(
+            product_id=product_id, id__gt=snapshot['movement_id'], created_at__lte=when
+        ).aggregate(total=Sum('delta'))['total']
+        return snapshot['stock'] + (tail or 0)
+
+    @staticmethod
+    def take_snapshots(now=None):
+        """Snapshot every product with movements since the last run, returning how many"""
+        now = now or timezone.now()
+        settled = now - timedelta(seconds=StockService.SNAPSHOT_SETTLE_SECONDS)
+        since = StockSnapshot.objects.aggregate(last=Max('movement_id'))['last'] or 0
+        until = StockMovement.objects.filter(id__gt=since, created_at__lt=settled).aggregate(last=Max('id'))['last']
+        if until is None:
+            return 0
+
+        previous = StockSnapshot.objects.filter(product_id=OuterRef('product_id')).order_by('-movement_id')
+        totals = (
+            StockMovement.objects.filter(id__gt=since, id__lte=until)
+            .order_by()
+            .values('product_id')
+            .annotate(
+                delta=Sum('delta'),
+                previous=Coalesce(Subquery(previous.values('stock')[:1]), 0),
+            )
+        )
+        snapshots = [
+            StockSnapshot(
+                product_id=row['product_id'], stock=row['previous'] + row['delta'], movement_id=until, taken_at=now
+            )
+            for row in totals.iterator(chunk_size=StockService.BATCH_SIZE)
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=StockService.BATCH_SIZE)
+        return len(snapshots)
+
+    @staticmethod
+    def prune_snapshots(keep_days):
+        """Delete snapshots older than keep_days that a newer snapshot of the same product supersedes"""
+        cutoff = timezone.now() - timedelta(days=keep_days)
+        newer = StockSnapshot.objects.filter(product_id=OuterRef('product_id'), movement_id__gt=OuterRef('movement_id'))
+        deleted, _ = StockSnapshot.objects.filter(taken_at__lt=cutoff).filter(
+            Exists(newer.filter(taken_at__lt=cutoff))
+        ).delete()
+        return deleted
+
+    @staticmethod
+    def verify_range(first_id, last_id, fix=False):
+        """
+        [(product_id, stock, ledger total)] for the products with ids from
+        first_id to last_id whose Product.stock disagrees with their ledger,
+        optionally resetting Product.stock to the ledger
+        """
+        ledger = (
+            StockMovement.objects.filter(product_id=OuterRef('id'))
+            .order_by()
+            .values('product_id')
+            .annotate(total=Sum('delta'))
+            .values('total')
+        )
+        # One statement, so both sides are read from the same database state
+        mismatches = list(
+            Product.objects.filter(id__gte=first_id, id__lte=last_id)
+            .annotate(ledger=Coalesce(Subquery(ledger), 0))
+            .exclude(stock=F('ledger'))
+            .order_by('id')
+            .values_list('id', 'stock', 'ledger')
+        )
+        if fix and mismatches:
+            with transaction.atomic():
+                for product_id, _, total in mismatches:
+                    Product.objects.filter(id=product_id).update(stock=total, updated_at=timezone.now())
+                transaction.on_commit(CatalogService.bump_version)
+        return mismatches
+
+    @staticmethod
+    def verify(workers=1, chunk_size=VERIFY_CHUNK_SIZE, fix=False):
+        """Check every product in id ranges of chunk_size, spread over worker processes"""
+        bounds = Product.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return []
+        chunks = [
+            (start, start + chunk_size - 1, fix)
+            for start in range(bounds['first'], bounds['last'] + 1, chunk_size)
+        ]
+        return [row for rows in map_chunks(StockService.verify_range, chunks, workers=workers) for row in rows]
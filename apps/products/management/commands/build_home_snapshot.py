@@ -0,0 +1,11 @@
+# apps/products/management/commands/build_home_snapshot.py
+from django.core.management.base import BaseCommand
+from apps.products.services import HomeService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-serialized homepage feed for the current catalog version"
+
+    def handle(self, *args, **options):
+        payload = HomeService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Home snapshot rebuilt ({len(payload)} bytes)"))
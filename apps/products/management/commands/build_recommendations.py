@@ -0,0 +1,22 @@
+# apps/products/management/commands/build_recommendations.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.products.recommendations import RecommendationService
+
+
+class Command(BaseCommand):
+    help = "Update 'frequently bought together' recommendations from the orders placed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help="Recount every order instead of only the new ones"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lines, products = RecommendationService.update(full=options['full'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Recommendations updated from {lines} order lines ({products} products)"
+        ))
@@ -0,0 +1,21 @@
+# apps/products/management/commands/compute_trending.py
+from django.core.management.base import BaseCommand
+from apps.products.services import TrendingService
+
+
+class Command(BaseCommand):
+    help = "Recompute the trending score of every product from its recent hourly views"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=None,
+            help="Also delete hourly view stats older than this many days"
+        )
+
+    def handle(self, *args, **options):
+        scored = TrendingService.update_trending()
+        self.stdout.write(self.style.SUCCESS(f"Trending scores updated ({scored} products with recent views)"))
+
+        if options['keep_days'] is not None:
+            deleted = TrendingService.prune_stats(options['keep_days'])
+            self.stdout.write(f"Deleted {deleted} hourly stats rows older than {options['keep_days']} days")
@@ -0,0 +1,21 @@
+# apps/products/management/commands/snapshot_stock.py
+from django.core.management.base import BaseCommand
+from apps.products.inventory import StockService
+
+
+class Command(BaseCommand):
+    help = "Snapshot the stock of every product with stock movements since the last snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=None,
+            help="Also delete superseded snapshots older than this many days"
+        )
+
+    def handle(self, *args, **options):
+        taken = StockService.take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f"Stock snapshots taken ({taken} products changed)"))
+
+        if options['keep_days'] is not None:
+            deleted = StockService.prune_snapshots(options['keep_days'])
+            self.stdout.write(f"Deleted {deleted} superseded snapshots older than {options['keep_days']} days")
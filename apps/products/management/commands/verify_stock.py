@@ -0,0 +1,33 @@
+# apps/products/management/commands/verify_stock.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.products.inventory import StockService
+
+
+class Command(BaseCommand):
+    help = "Check Product.stock against the stock movement ledger for every product"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes checking id ranges in parallel")
+        parser.add_argument(
+            '--chunk-size', type=int, default=StockService.VERIFY_CHUNK_SIZE, help="Product ids checked per pass"
+        )
+        parser.add_argument('--fix', action='store_true', help="Reset mismatched stock to the ledger total")
+        parser.add_argument('--show', type=int, default=20, help="Mismatches to list")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        mismatches = StockService.verify(
+            workers=options['workers'], chunk_size=options['chunk_size'], fix=options['fix']
+        )
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Stock matches the ledger for every product"))
+            return
+
+        for product_id, stock, ledger in mismatches[:options['show']]:
+            self.stdout.write(f"  product {product_id}: stock {stock}, ledger {ledger}")
+        if options['fix']:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} products reset to their ledger total"))
+        else:
+            raise CommandError(f"{len(mismatches)} products disagree with the ledger")
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.4 on 2026-10-19 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_catalog_changes_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Product stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['trending_score', 'id'], name='product_active_trending_idx'),
+        ),
+        migrations.AddField(
+            model_name='productstats',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='productstats',
+            index=models.Index(fields=['hour'], name='product_stats_hour_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productstats',
+            constraint=models.UniqueConstraint(fields=('product', 'hour'), name='product_stats_hour_unique'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 # apps/products/models.py
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
 from django.utils.text import slugify
+from utils.constants import StockReason
 
 
 class Category(models.Model):
@@ -17,6 +19,10 @@ class Category(models.Model):
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
         ordering = ['name']
+        indexes = [
+            # Keyset paging for the catalog change feed
+            models.Index(fields=['updated_at', 'id'], name='category_changes_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -34,14 +40,54 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     sale_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products')
+    # Sum of the product's StockMovement ledger; changed through StockService only
     stock = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
+    # What the customer actually pays, kept by the database itself so that
+    # save(), bulk_update() and queryset.update() all stay consistent.
+    effective_price = models.GeneratedField(
+        expression=Case(
+            When(sale_price__lt=F('price'), then=F('sale_price')),
+            default=F('price'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
+    on_sale = models.GeneratedField(
+        expression=Case(
+            When(sale_price__lt=F('price'), then=Value(True)),
+            default=Value(False),
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+    # Decayed recent views, recomputed by the compute_trending command
+    trending_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Partial on is_active so listing sorts walk the index in order
+            models.Index(
+                fields=['effective_price', 'id'],
+                condition=Q(is_active=True),
+                name='product_active_price_idx',
+            ),
+            models.Index(
+                fields=['on_sale', 'effective_price'],
+                condition=Q(is_active=True),
+                name='product_active_sale_idx',
+            ),
+            models.Index(
+                fields=['trending_score', 'id'],
+                condition=Q(is_active=True),
+                name='product_active_trending_idx',
+            ),
+            models.Index(fields=['updated_at', 'id'], name='product_changes_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -49,8 +95,14 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        # Generated columns come back from the INSERT, but an UPDATE leaves the
+        # instance holding the old values
+        if not adding:
+            self.refresh_from_db(fields=['effective_price', 'on_sale'])
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
@@ -59,4 +111,92 @@ class ProductImage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Image for {self.product.name}"
\ No newline at end of file
+        return f"Image for {self.product.name}"
+
+
+class ProductStats(models.Model):
+    """Views of a product in one hour, added to in bulk by the view counter"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stats')
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Product stats'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'hour'], name='product_stats_hour_unique'),
+        ]
+        indexes = [
+            # The trending job reads a recent window of hours
+            models.Index(fields=['hour'], name='product_stats_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.views} views of product {self.product_id} at {self.hour:%Y-%m-%d %H:00}"
+
+
+class ProductRecommendation(models.Model):
+    """A product's most frequent order partners, written by build_recommendations"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='recommendation')
+    # Neighbour ids, most frequent first, and how many orders had both
+    related = models.JSONField(default=list)
+    scores = models.JSONField(default=list)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Recommendations for product {self.product_id}"
+
+
+class RecommendationState(models.Model):
+    """
+    The last order build_recommendations counted, saved in the same
+    transaction as the ProductRecommendation rows. The pair counts file
+    records the same id; a run that finds them different recounts everything.
+    """
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Recommendations up to order #{self.last_order_id}"
+
+
+class StockMovement(models.Model):
+    """One change to a product's stock. Rows are only ever inserted"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    delta = models.IntegerField()
+    reason = models.CharField(
+        max_length=20,
+        choices=[(reason.value, reason.name.title()) for reason in StockReason],
+    )
+    # What caused it, e.g. "order:42" or an import file name
+    reference = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Replaying one product's ledger after a snapshot
+            models.Index(fields=['product', 'id'], name='stock_movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.delta:+d} x product {self.product_id} ({self.reason})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements cannot be changed once recorded")
+        super().save(*args, **kwargs)
+
+
+class StockSnapshot(models.Model):
+    """A product's stock including every movement up to movement_id, written by snapshot_stock"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    stock = models.IntegerField()
+    movement_id = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='stock_snapshot_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"Stock of product {self.product_id} at {self.taken_at}"
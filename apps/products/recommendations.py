@@ -0,0 +1,226 @@
+# apps/products/recommendations.py
+"""
+"Frequently bought together" from order co-occurrence.
+
+Pairs of products bought in the same order are counted with NumPy over the
+streamed order lines. Pair counts are kept as two parallel arrays, an
+int64 key ``a << 32 | b`` and its count, saved with the id of the last
+order they include; an update only reads newer orders and merges their
+pairs in. The top neighbours of every product touched are then written to
+ProductRecommendation, which the related endpoint reads in one query.
+
+Counts are never taken back, so an update stops before the first order
+still holding stock: until it is paid or the sweeper cancels it, the
+order may yet drop out. Orders cancelled by other means after they were
+counted stay in until the next ``--full`` recount.
+"""
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from apps.orders.models import Order, OrderItem
+from utils.constants import OrderStatus
+from .models import ProductRecommendation, RecommendationState
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+logger = logging.getLogger(__name__)
+
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+
+
+def count_pairs(order_ids, product_ids, max_basket=50):
+    """
+    Co-occurrence counts of the products in each order, both directions.
+
+    Lines are deduplicated per order and sorted by order, so the products of
+    an order are contiguous: pairing every line with the one ``offset``
+    places later, for growing offsets, yields each pair of an order once.
+    Orders with more than ``max_basket`` distinct products are skipped, as
+    they say little about what goes together.
+    """
+    if len(order_ids) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    lines = np.unique((np.asarray(order_ids, dtype=np.int64) << ID_BITS) | np.asarray(product_ids, dtype=np.int64))
+    orders, products = lines >> ID_BITS, lines & ID_MASK
+    sizes = np.unique(orders, return_counts=True)[1]
+    keep = np.repeat(sizes <= max_basket, sizes)
+    orders, products = orders[keep], products[keep]
+    largest = int(sizes[sizes <= max_basket].max(initial=0))
+
+    firsts, seconds = [], []
+    for offset in range(1, largest):
+        same_order = orders[:-offset] == orders[offset:]
+        if not same_order.any():
+            break
+        firsts.append(products[:-offset][same_order])
+        seconds.append(products[offset:][same_order])
+    if not firsts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    a = np.concatenate(firsts)
+    b = np.concatenate(seconds)
+    keys = np.concatenate([(a << ID_BITS) | b, (b << ID_BITS) | a])
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys, counts.astype(np.int64)
+
+
+def merge_counts(keys, counts, new_keys, new_counts):
+    """Add one set of pair counts to another"""
+    if len(keys) == 0:
+        return new_keys, new_counts
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([counts, new_counts])).astype(np.int64)
+
+
+def top_neighbours(keys, counts, k, products=None):
+    """
+    {product_id: ([neighbour ids], [counts])} with each product's k most
+    frequent partners, optionally only for the given product ids
+    """
+    a = keys >> ID_BITS
+    b = keys & ID_MASK
+    if products is not None:
+        wanted = np.isin(a, np.asarray(list(products), dtype=np.int64))
+        a, b, counts = a[wanted], b[wanted], counts[wanted]
+    # By product, then most frequent partner first, then lowest id
+    order = np.lexsort((b, -counts, a))
+    a, b, counts = a[order], b[order], counts[order]
+
+    group_ids, starts = np.unique(a, return_index=True)
+    rank = np.arange(len(a)) - np.repeat(starts, np.diff(np.append(starts, len(a))))
+    top = rank < k
+    a, b, counts = a[top], b[top], counts[top]
+    bounds = np.searchsorted(a, group_ids, side='left')
+    ends = np.append(bounds[1:], len(a))
+    return {
+        int(product_id): (b[start:end].tolist(), counts[start:end].tolist())
+        for product_id, start, end in zip(group_ids, bounds, ends)
+    }
+
+
+class RecommendationService:
+    LINE_CHUNK_SIZE = 100000
+    SETTLE_SECONDS = 60
+
+    @staticmethod
+    def state_path():
+        return Path(settings.RECOMMENDATIONS_STATE_FILE)
+
+    @staticmethod
+    def load_state():
+        """(keys, counts, last_order_id) saved by the previous run, or None"""
+        path = RecommendationService.state_path()
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as state:
+                return state['keys'], state['counts'], int(state['last_order_id'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error reading recommendation state {path}, rebuilding: {e}")
+            return None
+
+    @staticmethod
+    def write_state(keys, counts, last_order_id):
+        """Write the state next to its file, returning the path to move into place once stored"""
+        path = RecommendationService.state_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez(tmp_path, keys=keys, counts=counts, last_order_id=np.int64(last_order_id))
+        return tmp_path
+
+    @staticmethod
+    def stored_order_id():
+        """The last order counted by the rows in the database, or None before the first run"""
+        return RecommendationState.objects.values_list('last_order_id', flat=True).first()
+
+    @staticmethod
+    def read_lines(after_order_id):
+        """(order ids, product ids, last order id) of the lines of newer settled orders, streamed in chunks"""
+        # Orders are only read once they are a minute old, so an order whose
+        # transaction commits after a higher id is not skipped for good, and
+        # only up to the first one still holding stock
+        settled = timezone.now() - timedelta(seconds=RecommendationService.SETTLE_SECONDS)
+        bounds = Order.objects.filter(id__gt=after_order_id, created_at__lt=settled).aggregate(
+            last=Max('id'), held=Min('id', filter=Q(stock_hold__isnull=False))
+        )
+        last_order_id = bounds['last'] if bounds['held'] is None else bounds['held'] - 1
+        if last_order_id is None or last_order_id <= after_order_id:
+            return np.empty(0, np.int64), np.empty(0, np.int64), after_order_id
+
+        lines = (
+            OrderItem.objects.filter(order_id__gt=after_order_id, order_id__lte=last_order_id)
+            .exclude(order__status=OrderStatus.CANCELLED.value)
+            .order_by('order_id')
+            .values_list('order_id', 'product_id')
+            .iterator(chunk_size=RecommendationService.LINE_CHUNK_SIZE)
+        )
+        flat = np.fromiter((value for line in lines for value in line), dtype=np.int64)
+        return flat[0::2], flat[1::2], last_order_id
+
+    @staticmethod
+    def update(full=False):
+        """
+        Count the orders placed since the last run (all of them with
+        ``full``) and refresh the neighbours of the products they touched.
+        Returns (orders' lines read, products updated).
+        """
+        if np is None:
+            raise RuntimeError("Recommendations need numpy installed")
+
+        state = None if full else RecommendationService.load_state()
+        if state is not None and state[2] != RecommendationService.stored_order_id():
+            # A run stopped between storing its rows and saving its counts
+            logger.error("Recommendation state does not match the stored rows, recounting every order")
+            state = None
+        keys, counts, last_order_id = state or (np.empty(0, np.int64), np.empty(0, np.int64), 0)
+
+        order_ids, product_ids, new_last_order_id = RecommendationService.read_lines(last_order_id)
+        new_keys, new_counts = count_pairs(
+            order_ids, product_ids, max_basket=getattr(settings, 'RECOMMENDATIONS_MAX_BASKET', 50)
+        )
+        keys, counts = merge_counts(keys, counts, new_keys, new_counts)
+
+        touched = None if state is None else set((new_keys >> ID_BITS).tolist())
+        neighbours = top_neighbours(keys, counts, getattr(settings, 'RECOMMENDATIONS_PER_PRODUCT', 20), touched)
+        tmp_path = RecommendationService.write_state(keys, counts, new_last_order_id)
+        RecommendationService.store(neighbours, new_last_order_id, replace_all=state is None)
+        os.replace(tmp_path, RecommendationService.state_path())
+        return len(order_ids), len(neighbours)
+
+    @staticmethod
+    def store(neighbours, last_order_id, replace_all=False):
+        """Write the neighbours and the last order they count in one transaction"""
+        now = timezone.now()
+        rows = [
+            ProductRecommendation(product_id=product_id, related=related, scores=scores, updated_at=now)
+            for product_id, (related, scores) in neighbours.items()
+        ]
+        with transaction.atomic():
+            if replace_all:
+                ProductRecommendation.objects.all().delete()
+            ProductRecommendation.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=['related', 'scores', 'updated_at'],
+            )
+            RecommendationState.objects.update_or_create(
+                id=1, defaults={'last_order_id': last_order_id, 'updated_at': now}
+            )
+
+    @staticmethod
+    def get_related_ids(product_id, limit):
+        """Ids of the products most often bought with product_id, in one query"""
+        related = ProductRecommendation.objects.filter(product_id=product_id).values_list('related', flat=True).first()
+        return (related or [])[:limit]
@@ -1,8 +1,10 @@
 # apps/products/schemas.py
 from ninja import Schema
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
+ProductSort = Literal['newest', 'price_asc', 'price_desc', 'discount', 'trending']
+
 class CategorySchema(Schema):
     id: int
     name: str
@@ -27,6 +29,8 @@ class ProductSchema(Schema):
     description: str
     price: float
     sale_price: Optional[float] = None
+    effective_price: float
+    on_sale: bool
     category_id: int
     category_name: str
     stock: int
@@ -35,6 +39,29 @@ class ProductSchema(Schema):
     created_at: datetime
     images: List[ProductImageSchema] = []
 
+    @staticmethod
+    def resolve_category_name(obj):
+        # Rows from ProductService.rows() already carry the joined name
+        if isinstance(obj, dict):
+            return obj['category_name']
+        return obj.category.name
+
+class ProductBatchSchema(Schema):
+    products: List[ProductSchema]
+    missing: List[int]
+
+class ProductSlugBatchSchema(Schema):
+    products: List[ProductSchema]
+    missing: List[str]
+
+class SuggestionSchema(Schema):
+    id: int
+    name: str
+
+class SuggestionsSchema(Schema):
+    products: List[SuggestionSchema]
+    categories: List[SuggestionSchema]
+
 class ProductCreateSchema(Schema):
     name: str
     description: str
@@ -53,4 +80,22 @@ class ProductUpdateSchema(Schema):
     category_id: Optional[int] = None
     stock: Optional[int] = None
     is_active: Optional[bool] = None
-    is_featured: Optional[bool] = None
\ No newline at end of file
+    is_featured: Optional[bool] = None
+
+class TopCategorySchema(CategorySchema):
+    product_count: int
+
+class HomeSchema(Schema):
+    version: int
+    generated_at: datetime
+    featured: List[ProductSchema]
+    new_arrivals: List[ProductSchema]
+    top_categories: List[TopCategorySchema]
+
+class CatalogChangesSchema(Schema):
+    products: List[ProductSchema]
+    deleted_products: List[int]
+    categories: List[CategorySchema]
+    deleted_categories: List[int]
+    next_token: str
+    has_more: bool
\ No newline at end of file
@@ -0,0 +1,552 @@
+# apps/products/services.py
+import base64
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Max, Q, Sum
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from .models import Category, Product, ProductImage, ProductStats
+from .schemas import HomeSchema, ProductSchema
+from utils.metrics import cache_stats
+from utils.prefix_index import PrefixIndex
+from utils.streaming import iter_ndjson
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogService:
+    VERSION_KEY = 'catalog:version'
+
+    @staticmethod
+    def get_version():
+        """Current catalog version, shared by every worker through the cache"""
+        version = cache.get(CatalogService.VERSION_KEY)
+        if version is None:
+            # Seed from the clock so a flushed cache never reuses an old version
+            cache.add(CatalogService.VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(CatalogService.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def bump_version():
+        """Mark every catalog-derived cache entry as stale"""
+        try:
+            return cache.incr(CatalogService.VERSION_KEY)
+        except ValueError:
+            # Key missing: seeding it is already a new version
+            return CatalogService.get_version()
+
+
+class CategoryService:
+    ROW_FIELDS = ('id', 'name', 'slug', 'description', 'image')
+
+    @staticmethod
+    def rows(queryset, extra_fields=(), fields=None):
+        """Categories as plain rows for trusted output, optionally only some fields"""
+        columns = [name for name in CategoryService.ROW_FIELDS if fields is None or name in fields]
+        return queryset.values(*columns, *extra_fields)
+
+    @staticmethod
+    def finish_rows(rows, fields=None):
+        """Shape category rows like CategorySchema"""
+        if fields is not None and 'image' not in fields:
+            return rows
+        for row in rows:
+            row['image'] = default_storage.url(row['image']) if row['image'] else None
+        return rows
+
+
+class ProductService:
+    # Sort options exposed by list_products. The price sorts walk the partial
+    # effective_price index instead of computing a Coalesce over every row.
+    SORT_OPTIONS = {
+        'newest': ('-created_at',),
+        'price_asc': ('effective_price', 'id'),
+        'price_desc': ('-effective_price', '-id'),
+        'discount': ((Cast('effective_price', FloatField()) / F('price')).asc(), 'id'),
+        'trending': ('-trending_score', '-id'),
+    }
+    DEFAULT_SORT = 'newest'
+
+    @staticmethod
+    def get_active_products():
+        """Active products with the relations ProductSchema renders"""
+        return (
+            Product.objects.filter(is_active=True)
+            .select_related('category')
+            .prefetch_related('images')
+        )
+
+    @staticmethod
+    def filter_products(queryset, sort=None, min_price=None, max_price=None, on_sale=None):
+        """Apply the listing filters and sort order to a product queryset"""
+        if min_price is not None:
+            queryset = queryset.filter(effective_price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(effective_price__lte=max_price)
+
+        sort = sort or ProductService.DEFAULT_SORT
+
+        # The discount sort defaults to discounted products, unless the
+        # caller asked for on_sale explicitly
+        if sort == 'discount' and on_sale is None:
+            on_sale = True
+        if on_sale is not None:
+            queryset = queryset.filter(on_sale=on_sale)
+
+        return queryset.order_by(*ProductService.SORT_OPTIONS[sort])
+
+    BATCH_LIMIT = 200
+
+    @staticmethod
+    def get_batch(keys, field='id'):
+        """
+        Products by id or slug in the order requested, plus the keys that
+        matched no active product. Products are cached one by one under the
+        catalog version, so only the ones missing from the cache are queried.
+        """
+        keys = list(dict.fromkeys(keys))
+        timeout = getattr(settings, 'PRODUCT_CACHE_SECONDS', 0)
+        version = CatalogService.get_version()
+        cache_keys = {key: f"product:{version}:{field}:{key}" for key in keys}
+
+        cached = cache.get_many(list(cache_keys.values())) if timeout else {}
+        found = {key: cached[cache_key] for key, cache_key in cache_keys.items() if cache_key in cached}
+        misses = [key for key in keys if key not in found]
+        for key in keys:
+            cache_stats.record('product', hit=key in found)
+
+        if misses:
+            products = ProductService.get_active_products().in_bulk(misses, field_name=field)
+            fetched = {key: ProductSchema.from_orm(product).model_dump() for key, product in products.items()}
+            if timeout and fetched:
+                cache.set_many({cache_keys[key]: row for key, row in fetched.items()}, timeout=timeout)
+            found.update(fetched)
+
+        return {
+            'products': [found[key] for key in keys if key in found],
+            'missing': [key for key in keys if key not in found],
+        }
+
+    ROW_FIELDS = (
+        'id', 'name', 'slug', 'description', 'price', 'sale_price', 'effective_price',
+        'on_sale', 'category_id', 'stock', 'is_active', 'is_featured', 'created_at',
+    )
+
+    PRICE_FIELDS = ('price', 'sale_price', 'effective_price')
+
+    @staticmethod
+    def rows(queryset, extra_fields=(), fields=None):
+        """
+        Products as plain rows for trusted output, category name joined in.
+        With ``fields`` only those columns are selected, plus the id images
+        are matched on, and the category is only joined when asked for.
+        """
+        if fields is None:
+            return queryset.prefetch_related(None).values(
+                *ProductService.ROW_FIELDS, *extra_fields, category_name=F('category__name')
+            )
+        columns = [name for name in ProductService.ROW_FIELDS if name == 'id' or name in fields]
+        joined = {'category_name': F('category__name')} if 'category_name' in fields else {}
+        return queryset.prefetch_related(None).values(*columns, *extra_fields, **joined)
+
+    @staticmethod
+    def finish_rows(rows, fields=None):
+        """Shape a page of product rows like ProductSchema, images in one query"""
+        price_fields = [name for name in ProductService.PRICE_FIELDS if fields is None or name in fields]
+        for row in rows:
+            for name in price_fields:
+                if row[name] is not None:
+                    row[name] = float(row[name])
+
+        # Grid pages that leave out images skip their query altogether
+        if fields is not None and 'images' not in fields:
+            return rows
+
+        images = defaultdict(list)
+        image_rows = ProductImage.objects.filter(
+            product_id__in=[row['id'] for row in rows]
+        ).values_list('product_id', 'id', 'image', 'is_primary')
+        for product_id, image_id, image, is_primary in image_rows:
+            images[product_id].append({
+                'id': image_id,
+                'image': default_storage.url(image),
+                'is_primary': is_primary,
+            })
+        for row in rows:
+            row['images'] = images[row['id']]
+        return rows
+
+    @staticmethod
+    def get_row(product_id, fields=None):
+        """One active product as a finished row, or None"""
+        rows = list(ProductService.rows(Product.objects.filter(id=product_id, is_active=True), fields=fields))
+        return ProductService.finish_rows(rows, fields)[0] if rows else None
+
+    FEED_CHUNK_SIZE = 2000
+
+    @staticmethod
+    def feed_last_modified():
+        """Latest change to anything the product feed renders"""
+        # Deactivated products keep their row, so their updated_at counts too
+        timestamps = [
+            Product.objects.aggregate(latest=Max('updated_at'))['latest'],
+            Category.objects.aggregate(latest=Max('updated_at'))['latest'],
+        ]
+        timestamps = [ts for ts in timestamps if ts is not None]
+        return max(timestamps) if timestamps else None
+
+    @staticmethod
+    def iter_feed(chunk_size=FEED_CHUNK_SIZE):
+        """Stream every active product as NDJSON through a server-side cursor"""
+        products = Product.objects.filter(is_active=True).order_by('id')
+        rows = ProductService.rows(products).iterator(chunk_size=chunk_size)
+        return iter_ndjson(rows, ProductService.finish_rows, chunk_size=chunk_size)
+
+
+class ChangeFeedService:
+    PAGE_SIZE = 500
+    # Rows newer than this may still be hidden by an uncommitted transaction
+    # with an earlier updated_at, so the feed never reads past it
+    SETTLE_SECONDS = 5
+
+    @staticmethod
+    def encode_token(product_position, category_position):
+        positions = {}
+        for key, position in (('p', product_position), ('c', category_position)):
+            if position is not None:
+                positions[key] = [position[0].isoformat(), position[1]]
+        return base64.urlsafe_b64encode(json.dumps(positions).encode()).decode()
+
+    @staticmethod
+    def decode_token(token):
+        """Return the (updated_at, id) watermarks stored in a sync token"""
+        if not token:
+            return None, None
+        try:
+            positions = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return tuple(
+                (datetime.fromisoformat(positions[key][0]), int(positions[key][1]))
+                if key in positions else None
+                for key in ('p', 'c')
+            )
+        except (ValueError, TypeError, KeyError, IndexError):
+            raise ValueError("Invalid sync token")
+
+    @staticmethod
+    def _page(queryset, position, until, limit):
+        """Keyset page of rows changed after position, in (updated_at, id) order"""
+        queryset = queryset.filter(updated_at__lt=until)
+        if position is not None:
+            updated_at, pk = position
+            queryset = queryset.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+            )
+        rows = list(queryset.order_by('updated_at', 'id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            position = (rows[-1]['updated_at'], rows[-1]['id'])
+        return rows, position, has_more
+
+    @staticmethod
+    def get_changes(token=None, limit=PAGE_SIZE):
+        """Products and categories changed since a sync token, plus the next token"""
+        product_position, category_position = ChangeFeedService.decode_token(token)
+        until = timezone.now() - timedelta(seconds=ChangeFeedService.SETTLE_SECONDS)
+
+        product_rows, product_position, more_products = ChangeFeedService._page(
+            ProductService.rows(Product.objects.all(), extra_fields=('updated_at',)),
+            product_position, until, limit
+        )
+        category_rows, category_position, more_categories = ChangeFeedService._page(
+            CategoryService.rows(Category.objects.all(), extra_fields=('updated_at', 'is_active')),
+            category_position, until, limit
+        )
+
+        # Soft-deleted rows only travel as tombstone ids
+        products, deleted_products = ChangeFeedService._split_tombstones(product_rows)
+        categories, deleted_categories = ChangeFeedService._split_tombstones(category_rows)
+        return {
+            'products': ProductService.finish_rows(products),
+            'deleted_products': deleted_products,
+            'categories': CategoryService.finish_rows(categories),
+            'deleted_categories': deleted_categories,
+            'next_token': ChangeFeedService.encode_token(product_position, category_position),
+            'has_more': more_products or more_categories,
+        }
+
+    @staticmethod
+    def _split_tombstones(rows):
+        live, deleted = [], []
+        for row in rows:
+            if row['is_active']:
+                live.append(row)
+            else:
+                deleted.append(row['id'])
+        return live, deleted
+
+
+class HomeService:
+    CACHE_KEY = 'catalog:home'
+    FEATURED_LIMIT = 12
+    NEW_ARRIVALS_LIMIT = 12
+    TOP_CATEGORIES_LIMIT = 8
+
+    @staticmethod
+    def build_snapshot(version):
+        """Query and serialize the homepage feed once, returning JSON bytes"""
+        products = ProductService.get_active_products()
+        top_categories = (
+            Category.objects.filter(is_active=True)
+            .annotate(product_count=Count('products', filter=Q(products__is_active=True)))
+            .filter(product_count__gt=0)
+            .order_by('-product_count', 'name')[:HomeService.TOP_CATEGORIES_LIMIT]
+        )
+
+        snapshot = HomeSchema.model_validate({
+            'version': version,
+            'generated_at': timezone.now(),
+            'featured': list(products.filter(is_featured=True)[:HomeService.FEATURED_LIMIT]),
+            'new_arrivals': list(products.order_by('-created_at')[:HomeService.NEW_ARRIVALS_LIMIT]),
+            'top_categories': list(top_categories),
+        })
+        return snapshot.model_dump_json().encode()
+
+    @staticmethod
+    def _snapshot_path(version):
+        snapshot_dir = getattr(settings, 'HOME_SNAPSHOT_DIR', None)
+        if not snapshot_dir:
+            return None
+        return Path(snapshot_dir) / f"home-{version}.json"
+
+    @staticmethod
+    def rebuild(version=None):
+        """Rebuild the snapshot for a catalog version and publish it"""
+        if version is None:
+            version = CatalogService.get_version()
+        payload = HomeService.build_snapshot(version)
+        cache.set(HomeService.CACHE_KEY, (version, payload), timeout=None)
+
+        path = HomeService._snapshot_path(version)
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(payload)
+                tmp_path.replace(path)
+                for stale in path.parent.glob('home-*.json'):
+                    if stale != path:
+                        stale.unlink(missing_ok=True)
+            except OSError as e:
+                logger.error(f"Error writing home snapshot to {path}: {e}")
+
+        return payload
+
+    @staticmethod
+    def get_snapshot():
+        """Serialized homepage feed for the current catalog version"""
+        # Version and snapshot travel in a single cache round trip
+        cached = cache.get_many([CatalogService.VERSION_KEY, HomeService.CACHE_KEY])
+        version = cached.get(CatalogService.VERSION_KEY)
+        if version is None:
+            version = CatalogService.get_version()
+
+        snapshot = cached.get(HomeService.CACHE_KEY)
+        if snapshot is not None and snapshot[0] == version:
+            cache_stats.record('home', hit=True)
+            return snapshot[1]
+        cache_stats.record('home', hit=False)
+
+        # A cold cache can reuse the copy another process left on disk
+        path = HomeService._snapshot_path(version)
+        if path is not None and path.exists():
+            payload = path.read_bytes()
+            cache.set(HomeService.CACHE_KEY, (version, payload), timeout=None)
+            return payload
+
+        return HomeService.rebuild(version)
+
+
+class CatalogSuggestions:
+    """
+    In-process prefix indexes over active product and category names.
+
+    Built lazily from one query per model, then kept in step with the
+    catalog version by re-reading only the rows updated since the last
+    refresh. A full rebuild every SUGGEST_REBUILD_SECONDS picks up changed
+    popularity, which does not touch the rows themselves. Only the
+    SUGGEST_MAX_PRODUCTS most popular products are indexed, so each
+    worker's memory stays bounded however large the catalog grows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.products = None
+        self.categories = None
+        self.version = None
+        self.refreshed_at = None
+        self.built_at = 0.0
+
+    @staticmethod
+    def product_rows(queryset):
+        # Popularity is units sold
+        return queryset.order_by().annotate(
+            popularity=Coalesce(Sum('order_items__quantity'), 0)
+        ).values_list('id', 'name', 'is_active', 'popularity')
+
+    @staticmethod
+    def category_rows(queryset):
+        # Popularity is the number of active products
+        return queryset.order_by().annotate(
+            popularity=Count('products', filter=Q(products__is_active=True))
+        ).values_list('id', 'name', 'is_active', 'popularity')
+
+    def ensure_current(self):
+        version = CatalogService.get_version()
+        rebuild_due = time.monotonic() - self.built_at > getattr(settings, 'SUGGEST_REBUILD_SECONDS', 3600)
+        if version == self.version and not rebuild_due:
+            return
+        # Once built, readers keep using the current indexes while one
+        # thread refreshes them
+        if not self._lock.acquire(blocking=self.products is None):
+            return
+        try:
+            if version == self.version and not rebuild_due:
+                return
+            started = timezone.now()
+            max_products = getattr(settings, 'SUGGEST_MAX_PRODUCTS', 100000)
+            if self.products is None or rebuild_due:
+                products = self.product_rows(Product.objects.filter(is_active=True)).order_by('-popularity', 'id')
+                self.products = PrefixIndex.build(
+                    (pk, name, popularity) for pk, name, _, popularity in products[:max_products]
+                )
+                self.categories = PrefixIndex.build(
+                    (pk, name, popularity)
+                    for pk, name, _, popularity in self.category_rows(Category.objects.filter(is_active=True))
+                )
+                self.built_at = time.monotonic()
+            else:
+                # Overlap by the change feed's settle time: a transaction
+                # committing late may carry an earlier updated_at
+                since = self.refreshed_at - timedelta(seconds=ChangeFeedService.SETTLE_SECONDS)
+                for index, rows, limit in (
+                    (self.products, self.product_rows(Product.objects.filter(updated_at__gte=since)), max_products),
+                    (self.categories, self.category_rows(Category.objects.filter(updated_at__gte=since)), None),
+                ):
+                    for pk, name, is_active, popularity in rows:
+                        # New products only take free room; the next rebuild
+                        # ranks them against the rest
+                        if is_active and (pk in index or limit is None or len(index) < limit):
+                            index.upsert(pk, name, popularity)
+                        else:
+                            index.remove(pk)
+            self.version = version
+            self.refreshed_at = started
+        finally:
+            self._lock.release()
+
+
+catalog_suggestions = CatalogSuggestions()
+
+
+class SuggestService:
+    LIMIT = 10
+    CATEGORY_LIMIT = 3
+
+    @staticmethod
+    def suggest(query, limit=LIMIT):
+        """Best matching product and category names for a search box"""
+        catalog_suggestions.ensure_current()
+        return {
+            'products': [
+                {'id': pk, 'name': name}
+                for pk, name in catalog_suggestions.products.search(query, limit=limit)
+            ],
+            'categories': [
+                {'id': pk, 'name': name}
+                for pk, name in catalog_suggestions.categories.search(query, limit=SuggestService.CATEGORY_LIMIT)
+            ],
+        }
+
+
+class TrendingService:
+    UPSERT_BATCH_SIZE = 300
+    SCORE_CHUNK_SIZE = 5000
+
+    @staticmethod
+    def add_views(counts):
+        """Add {(product_id, hour_index): views} to the hourly ProductStats rows in one upsert per batch"""
+        table = connection.ops.quote_name(ProductStats._meta.db_table)
+        rows = [
+            (product_id, connection.ops.adapt_datetimefield_value(
+                datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+            ), views)
+            for (product_id, hour), views in counts.items()
+        ]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), TrendingService.UPSERT_BATCH_SIZE):
+                batch = rows[start:start + TrendingService.UPSERT_BATCH_SIZE]
+                # Adds to the row when another worker already wrote this hour;
+                # the same statement works on PostgreSQL and SQLite
+                cursor.execute(
+                    f"INSERT INTO {table} (product_id, hour, views) VALUES "
+                    f"{', '.join(['(%s, %s, %s)'] * len(batch))} "
+                    f"ON CONFLICT (product_id, hour) DO UPDATE SET views = {table}.views + EXCLUDED.views",
+                    [value for row in batch for value in row]
+                )
+
+    @staticmethod
+    def compute_scores(now=None):
+        """
+        Every product's views over the last TRENDING_WINDOW_HOURS, each hour
+        weighted down by half every TRENDING_HALF_LIFE_HOURS
+        """
+        half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+        window = getattr(settings, 'TRENDING_WINDOW_HOURS', 168)
+        current_hour = (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+        # One row per product and hour: the weights are applied here rather
+        # than in a CASE with a branch per hour of the window
+        weights = [0.5 ** (age / half_life) for age in range(window)]
+        rows = (
+            ProductStats.objects.filter(hour__gt=current_hour - timedelta(hours=window))
+            .values_list('product_id', 'hour', 'views')
+            .iterator(chunk_size=TrendingService.SCORE_CHUNK_SIZE)
+        )
+        scores = defaultdict(float)
+        for product_id, hour, views in rows:
+            age = int((current_hour - hour).total_seconds()) // 3600
+            # Hours ahead of now, from a worker with a skewed clock, count for nothing
+            scores[product_id] += views * weights[age] if age >= 0 else 0.0
+        return dict(scores)
+
+    @staticmethod
+    def update_trending(now=None):
+        """Store fresh trending scores on the products, returning how many have one"""
+        scores = TrendingService.compute_scores(now)
+        with transaction.atomic():
+            Product.objects.filter(trending_score__gt=0).update(trending_score=0)
+            Product.objects.bulk_update(
+                [Product(id=product_id, trending_score=score) for product_id, score in scores.items()],
+                ['trending_score'],
+                batch_size=500,
+            )
+            # Cached "trending" listings are derived from the scores
+            transaction.on_commit(CatalogService.bump_version)
+        return len(scores)
+
+    @staticmethod
+    def prune_stats(keep_days):
+        """Delete hourly stats older than keep_days"""
+        deleted, _ = ProductStats.objects.filter(hour__lt=timezone.now() - timedelta(days=keep_days)).delete()
+        return deleted
@@ -0,0 +1,26 @@
+# apps/products/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, Product, ProductImage
+from .services import CatalogService
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def bump_catalog_version(sender, **kwargs):
+    """Invalidate everything derived from the catalog when it changes"""
+    # Wait for the commit so a rebuild never caches the pre-write rows
+    transaction.on_commit(CatalogService.bump_version)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_image_product(sender, instance, **kwargs):
+    """Images are rendered with their product, so the feeds must see the product as changed"""
+    Product.objects.filter(id=instance.product_id).update(updated_at=timezone.now())
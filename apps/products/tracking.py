@@ -0,0 +1,79 @@
+# apps/products/tracking.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Product views counted in memory by each worker.
+
+    Recording a view only bumps a counter, so product pages never write to
+    the database. Every PRODUCT_VIEW_FLUSH_SECONDS a background thread adds
+    the counts to the hourly ProductStats rows with one upsert. Counts still
+    buffered when the process exits are flushed then; a killed worker loses
+    at most one interval of views.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._next_flush = time.monotonic()
+        self._flushing = False
+
+    def record(self, product_id):
+        if not getattr(settings, 'PRODUCT_VIEW_TRACKING', True):
+            return
+        # Bucketed by the hour the view happened, not the hour of the flush
+        hour = int(time.time() // 3600)
+        with self._lock:
+            self._counts[(product_id, hour)] += 1
+            if self._flushing or time.monotonic() < self._next_flush:
+                return
+            self._flushing = True
+        threading.Thread(target=self._flush_in_background, name='product-view-flush', daemon=True).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # The thread's own connection
+            connection.close()
+            with self._lock:
+                self._flushing = False
+
+    def flush(self):
+        """Write the buffered counts, returning how many (product, hour) rows were touched"""
+        from .services import TrendingService
+
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._next_flush = time.monotonic() + getattr(settings, 'PRODUCT_VIEW_FLUSH_SECONDS', 10)
+        if not counts:
+            return 0
+        try:
+            TrendingService.add_views(counts)
+        except OperationalError as e:
+            # Database unavailable: keep the counts for the next flush
+            logger.error(f"Error flushing product views, will retry: {e}")
+            with self._lock:
+                self._counts.update(counts)
+            return 0
+        except Exception as e:
+            logger.error(f"Error flushing product views, {sum(counts.values())} views dropped: {e}")
+            return 0
+        return len(counts)
+
+    def discard(self):
+        with self._lock:
+            self._counts.clear()
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
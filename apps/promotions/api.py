@@ -0,0 +1,71 @@
+# apps/promotions/api.py
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from ninja import Router
+from apps.accounts.api import AuthBearer
+from apps.accounts.schemas import ErrorResponseSchema
+from utils.constants import PromotionKind
+from .models import Promotion
+from .schemas import PromotionCreateSchema, PromotionSchema, QuoteRequestSchema, QuoteSchema
+from .services import PromotionService
+
+router = Router()
+
+
+# Cart pricing with the running promotions
+@router.post("/quote", response={200: QuoteSchema, 400: ErrorResponseSchema})
+def quote_cart(request, payload: QuoteRequestSchema):
+    try:
+        return PromotionService.quote(
+            [(line.product_id, line.quantity) for line in payload.lines], payload.coupons
+        )
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+
+# Admin endpoints
+@router.post(
+    "/", response={200: PromotionSchema, 400: ErrorResponseSchema, 403: ErrorResponseSchema}, auth=AuthBearer()
+)
+def create_promotion(request, payload: PromotionCreateSchema):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+
+    data = payload.dict()
+    product_ids = data.pop('product_ids')
+    category_ids = data.pop('category_ids')
+    data['kind'] = payload.kind.value
+    if payload.kind == PromotionKind.BUY_X_GET_Y and not (
+        payload.buy_quantity and payload.buy_quantity > 0 and payload.get_quantity and payload.get_quantity > 0
+    ):
+        return 400, {"detail": "Buy X get Y needs positive buy_quantity and get_quantity"}
+    if payload.kind == PromotionKind.BUY_X_GET_Y and not (product_ids or category_ids):
+        return 400, {"detail": "Buy X get Y needs products or categories"}
+    if payload.kind == PromotionKind.PERCENTAGE and not 0 < payload.value <= 100:
+        return 400, {"detail": "A percentage must be between 0 and 100"}
+    if payload.starts_at and payload.ends_at and payload.ends_at <= payload.starts_at:
+        return 400, {"detail": "ends_at must be after starts_at"}
+
+    # The unique index on code decides duplicates, so concurrent creates
+    # of one coupon cannot both succeed
+    try:
+        with transaction.atomic():
+            promotion = Promotion.objects.create(**data)
+            promotion.products.set(product_ids)
+            promotion.categories.set(category_ids)
+    except IntegrityError:
+        if data['code'] and Promotion.objects.filter(code=data['code'].strip().upper()).exists():
+            return 400, {"detail": "Coupon code already exists"}
+        return 400, {"detail": "Unknown products or categories"}
+    return promotion
+
+
+@router.delete("/{promotion_id}", response={204: None, 403: ErrorResponseSchema}, auth=AuthBearer())
+def end_promotion(request, promotion_id: int):
+    if not request.user.is_staff:
+        return 403, {"detail": "Admin access required"}
+
+    promotion = get_object_or_404(Promotion, id=promotion_id)
+    promotion.is_active = False
+    promotion.save()
+    return 204, None
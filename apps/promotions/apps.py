@@ -0,0 +1,12 @@
+# apps/promotions/apps.py
+from django.apps import AppConfig
+
+
+class PromotionsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.promotions'
+    label = 'promotions'
+
+    def ready(self):
+        # Register the promotions version signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,268 @@
+# apps/promotions/engine.py
+"""
+Promotions compiled for pricing whole carts.
+
+The active rules are compiled once into lookups keyed by product and
+category id. Automatic percentage and fixed rules become "tiers" per key:
+sorted by minimum spend with the best percentage and best amount so far,
+so a line's best discount is one bisect per key however many rules target
+it. Category rules are indexed under every subcategory too. Pricing a cart
+is then a sum for the subtotal and a single pass over its lines, without
+touching the database.
+
+Each line takes its best percentage or fixed discount; lines left without
+one can go towards a buy-X-get-Y; the best cart-wide rule then applies to
+what remains. Coupons compete with the automatic rules at each step.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+from utils.constants import PromotionKind
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal(100)
+ZERO = Decimal(0)
+
+PERCENTAGE = PromotionKind.PERCENTAGE.value
+FIXED = PromotionKind.FIXED.value
+BUY_X_GET_Y = PromotionKind.BUY_X_GET_Y.value
+
+
+def money(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class Rule:
+    """One promotion as the engine sees it"""
+    __slots__ = (
+        'id', 'name', 'code', 'kind', 'value', 'min_spend', 'buy', 'get', 'product_ids', 'category_ids'
+    )
+
+    def __init__(self, id, name, kind, value, code=None, min_spend=ZERO, buy=None, get=None,
+                 product_ids=(), category_ids=()):
+        self.id = id
+        self.name = name
+        self.code = code
+        self.kind = kind
+        self.value = Decimal(value)
+        self.min_spend = Decimal(min_spend)
+        self.buy = buy
+        self.get = get
+        self.product_ids = frozenset(product_ids)
+        self.category_ids = frozenset(category_ids)
+
+    @property
+    def scoped(self):
+        return bool(self.product_ids or self.category_ids)
+
+    def matches(self, product_id, category_id):
+        return product_id in self.product_ids or category_id in self.category_ids
+
+    def discount(self, amount):
+        """Discount on one unit, or on the cart for a cart-wide rule"""
+        if self.kind == PERCENTAGE:
+            return amount * self.value / HUNDRED
+        return min(self.value, amount)
+
+
+class Tiers:
+    """Automatic percentage and fixed rules of one key, by minimum spend"""
+    __slots__ = ('thresholds', 'best')
+
+    def __init__(self, rules):
+        self.thresholds = []
+        # (best percentage rule, best fixed rule) among the rules up to each threshold
+        self.best = []
+        percentage = fixed = None
+        for rule in sorted(rules, key=lambda rule: rule.min_spend):
+            if rule.kind == PERCENTAGE:
+                if percentage is None or rule.value > percentage.value:
+                    percentage = rule
+            elif fixed is None or rule.value > fixed.value:
+                fixed = rule
+            if self.thresholds and self.thresholds[-1] == rule.min_spend:
+                self.best[-1] = (percentage, fixed)
+            else:
+                self.thresholds.append(rule.min_spend)
+                self.best.append((percentage, fixed))
+
+    def discount(self, subtotal, amount):
+        """(discount, rule) of the best rule the subtotal qualifies for"""
+        position = bisect_right(self.thresholds, subtotal) - 1
+        if position < 0:
+            return ZERO, None
+        best, best_rule = ZERO, None
+        for rule in self.best[position]:
+            if rule is not None:
+                discount = rule.discount(amount)
+                if discount > best:
+                    best, best_rule = discount, rule
+        return best, best_rule
+
+
+def _descendants(category_parents):
+    """{category_id: {itself and every subcategory}}"""
+    children = defaultdict(list)
+    for category_id, parent_id in category_parents.items():
+        if parent_id is not None:
+            children[parent_id].append(category_id)
+    descendants = {}
+    for category_id in category_parents:
+        found, stack = set(), [category_id]
+        while stack:
+            current = stack.pop()
+            if current not in found:
+                found.add(current)
+                stack.extend(children[current])
+        descendants[category_id] = found
+    return descendants
+
+
+class PromotionIndex:
+    """Compiled active promotions; immutable once built, so readers need no lock"""
+
+    def __init__(self, rules, category_parents=None, expires_at=None):
+        # Stop serving this index once a promotion starts or ends
+        self.expires_at = expires_at
+        self.coupons = {}
+        descendants = _descendants(category_parents or {})
+
+        item_rules = (defaultdict(list), defaultdict(list))
+        self._bundles = (defaultdict(list), defaultdict(list))
+        cart_rules = []
+        for rule in rules:
+            rule.category_ids = frozenset(
+                category for category_id in rule.category_ids
+                for category in descendants.get(category_id, (category_id,))
+            )
+            if rule.code:
+                self.coupons[rule.code] = rule
+                continue
+            if not rule.scoped:
+                if rule.kind != BUY_X_GET_Y:
+                    cart_rules.append(rule)
+                continue
+            by_product, by_category = self._bundles if rule.kind == BUY_X_GET_Y else item_rules
+            for product_id in rule.product_ids:
+                by_product[product_id].append(rule)
+            for category_id in rule.category_ids:
+                by_category[category_id].append(rule)
+
+        self._product_tiers = {key: Tiers(rules) for key, rules in item_rules[0].items()}
+        self._category_tiers = {key: Tiers(rules) for key, rules in item_rules[1].items()}
+        self._cart_tiers = Tiers(cart_rules)
+
+    def price(self, lines, codes=()):
+        """
+        Price lines of (product_id, category_id, unit_price, quantity) with
+        the automatic promotions and the given coupon codes
+        """
+        coupons, invalid = [], []
+        for code in codes:
+            rule = self.coupons.get(code.strip().upper())
+            if rule is None:
+                invalid.append(code)
+            elif rule not in coupons:
+                coupons.append(rule)
+
+        subtotal = sum((unit_price * quantity for _, _, unit_price, quantity in lines), ZERO)
+        coupons = [rule for rule in coupons if subtotal >= rule.min_spend]
+        item_coupons = [rule for rule in coupons if rule.scoped and rule.kind != BUY_X_GET_Y]
+        bundle_coupons = [rule for rule in coupons if rule.scoped and rule.kind == BUY_X_GET_Y]
+        cart_coupons = [rule for rule in coupons if not rule.scoped and rule.kind != BUY_X_GET_Y]
+
+        discounts = [ZERO] * len(lines)
+        applied_rules = [None] * len(lines)
+        bundles = defaultdict(list)
+        bundles_by_product, bundles_by_category = self._bundles
+        for index, (product_id, category_id, unit_price, quantity) in enumerate(lines):
+            best, best_rule = ZERO, None
+            for tiers in (self._product_tiers.get(product_id), self._category_tiers.get(category_id)):
+                if tiers is not None:
+                    discount, rule = tiers.discount(subtotal, unit_price)
+                    if discount > best:
+                        best, best_rule = discount, rule
+            for rule in item_coupons:
+                if rule.matches(product_id, category_id):
+                    discount = rule.discount(unit_price)
+                    if discount > best:
+                        best, best_rule = discount, rule
+
+            if best_rule is not None:
+                discounts[index] = money(best) * quantity
+                applied_rules[index] = best_rule
+                continue
+            # Lines without a discount of their own can go towards a bundle
+            for rule in (
+                *bundles_by_product.get(product_id, ()), *bundles_by_category.get(category_id, ()), *bundle_coupons
+            ):
+                if subtotal >= rule.min_spend and rule.matches(product_id, category_id):
+                    bundles[rule].append(index)
+
+        self._apply_bundles(lines, bundles, discounts, applied_rules)
+
+        promotions = defaultdict(lambda: ZERO)
+        for rule, discount in zip(applied_rules, discounts):
+            if rule is not None:
+                promotions[rule] += discount
+        item_discount = sum(discounts, ZERO)
+
+        remaining = subtotal - item_discount
+        cart_discount, cart_rule = self._cart_tiers.discount(subtotal, remaining)
+        for rule in cart_coupons:
+            discount = rule.discount(remaining)
+            if discount > cart_discount:
+                cart_discount, cart_rule = discount, rule
+        cart_discount = money(cart_discount)
+        if cart_rule is not None and cart_discount:
+            promotions[cart_rule] += cart_discount
+
+        return {
+            'lines': [
+                {
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'unit_price': unit_price,
+                    'discount': discount,
+                    'total': unit_price * quantity - discount,
+                    'promotion_id': rule.id if rule is not None else None,
+                }
+                for (product_id, _, unit_price, quantity), discount, rule in zip(lines, discounts, applied_rules)
+            ],
+            'subtotal': subtotal,
+            'discount': item_discount + cart_discount,
+            'total': remaining - cart_discount,
+            'promotions': [
+                {'id': rule.id, 'name': rule.name, 'code': rule.code, 'amount': amount}
+                for rule, amount in promotions.items()
+            ],
+            'invalid_coupons': invalid,
+        }
+
+    @staticmethod
+    def _apply_bundles(lines, bundles, discounts, applied_rules):
+        """Buy X get Y: the cheapest units of each group are free, best bundle first"""
+        offers = []
+        for rule, indexes in bundles.items():
+            units = sum(lines[index][3] for index in indexes)
+            free = units // (rule.buy + rule.get) * rule.get
+            if not free:
+                continue
+            # Cheapest lines first
+            indexes.sort(key=lambda index: lines[index][2])
+            amounts = {}
+            for index in indexes:
+                taken = min(free, lines[index][3])
+                amounts[index] = lines[index][2] * taken
+                free -= taken
+                if not free:
+                    break
+            offers.append((sum(amounts.values()), rule, amounts))
+
+        # A line only counts towards one bundle
+        for _, rule, amounts in sorted(offers, key=lambda offer: offer[0], reverse=True):
+            if any(applied_rules[index] is not None for index in amounts):
+                continue
+            for index, amount in amounts.items():
+                discounts[index] = amount
+                applied_rules[index] = rule
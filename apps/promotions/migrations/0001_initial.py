@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-19 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0006_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(blank=True, max_length=40, null=True, unique=True)),
+                ('kind', models.CharField(choices=[('percentage', 'Percentage'), ('fixed', 'Fixed'), ('buy_x_get_y', 'Buy X Get Y')], max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('buy_quantity', models.PositiveIntegerField(blank=True, null=True)),
+                ('get_quantity', models.PositiveIntegerField(blank=True, null=True)),
+                ('min_spend', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('categories', models.ManyToManyField(blank=True, related_name='promotions', to='products.category')),
+                ('products', models.ManyToManyField(blank=True, related_name='promotions', to='products.product')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['ends_at'], name='promotion_active_ends_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# apps/promotions/models.py
+from django.db import models
+from django.db.models import Q
+from utils.constants import PromotionKind
+
+
+class Promotion(models.Model):
+    """
+    A discount rule. Without products or categories it applies to the whole
+    cart; with a code it is a coupon, applied only when the code is given.
+    """
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=40, unique=True, null=True, blank=True)
+    kind = models.CharField(
+        max_length=20,
+        choices=[(kind.value, kind.name.replace('_', ' ').title()) for kind in PromotionKind],
+    )
+    # Percent off for percentage promotions, amount off for fixed ones
+    value = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Buy X get Y: of every buy + get units, the get cheapest are free
+    buy_quantity = models.PositiveIntegerField(null=True, blank=True)
+    get_quantity = models.PositiveIntegerField(null=True, blank=True)
+    # Cart subtotal needed before the promotion applies
+    min_spend = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    products = models.ManyToManyField('products.Product', blank=True, related_name='promotions')
+    # Includes their subcategories
+    categories = models.ManyToManyField('products.Category', blank=True, related_name='promotions')
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Loading the promotions that have not ended yet
+            models.Index(fields=['ends_at'], condition=Q(is_active=True), name='promotion_active_ends_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.code})" if self.code else self.name
+
+    def save(self, *args, **kwargs):
+        if self.code:
+            self.code = self.code.strip().upper()
+        else:
+            self.code = None
+        super().save(*args, **kwargs)
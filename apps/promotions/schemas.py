@@ -0,0 +1,68 @@
+# apps/promotions/schemas.py
+from ninja import Schema
+from typing import List, Optional
+from datetime import datetime
+from utils.constants import PromotionKind
+
+
+class CartLineSchema(Schema):
+    product_id: int
+    quantity: int = 1
+
+
+class QuoteRequestSchema(Schema):
+    lines: List[CartLineSchema]
+    coupons: List[str] = []
+
+
+class QuoteLineSchema(Schema):
+    product_id: int
+    quantity: int
+    unit_price: float
+    discount: float
+    total: float
+    promotion_id: Optional[int] = None
+
+
+class AppliedPromotionSchema(Schema):
+    id: int
+    name: str
+    code: Optional[str] = None
+    amount: float
+
+
+class QuoteSchema(Schema):
+    lines: List[QuoteLineSchema]
+    subtotal: float
+    discount: float
+    total: float
+    promotions: List[AppliedPromotionSchema]
+    invalid_coupons: List[str]
+
+
+class PromotionCreateSchema(Schema):
+    name: str
+    code: Optional[str] = None
+    kind: PromotionKind
+    value: float = 0
+    buy_quantity: Optional[int] = None
+    get_quantity: Optional[int] = None
+    min_spend: float = 0
+    product_ids: List[int] = []
+    category_ids: List[int] = []
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+
+
+class PromotionSchema(Schema):
+    id: int
+    name: str
+    code: Optional[str] = None
+    kind: str
+    value: float
+    buy_quantity: Optional[int] = None
+    get_quantity: Optional[int] = None
+    min_spend: float
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    is_active: bool
@@ -0,0 +1,157 @@
+# apps/promotions/services.py
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, Q
+from django.utils import timezone
+from apps.products.models import Category, Product
+from utils.constants import PromotionKind
+from .engine import PromotionIndex, Rule
+from .models import Promotion
+
+logger = logging.getLogger(__name__)
+
+
+class PromotionService:
+    VERSION_KEY = 'promotions:version'
+    MAX_LINES = 200
+
+    @staticmethod
+    def get_version():
+        """Current promotions version, shared by every worker through the cache"""
+        version = cache.get(PromotionService.VERSION_KEY)
+        if version is None:
+            # Seed from the clock so a flushed cache never reuses an old version
+            cache.add(PromotionService.VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(PromotionService.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def bump_version():
+        """Make every worker recompile its promotions"""
+        try:
+            return cache.incr(PromotionService.VERSION_KEY)
+        except ValueError:
+            # Key missing: seeding it is already a new version
+            return PromotionService.get_version()
+
+    @staticmethod
+    def load_index(now=None):
+        """Compile the promotions running now, in five queries however many there are"""
+        now = now or timezone.now()
+        current = Promotion.objects.filter(
+            Q(starts_at__isnull=True) | Q(starts_at__lte=now),
+            Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+            is_active=True,
+        )
+        targets = {'products': defaultdict(list), 'categories': defaultdict(list)}
+        for relation, column in (('products', 'product_id'), ('categories', 'category_id')):
+            through = getattr(Promotion, relation).through
+            for promotion_id, target_id in through.objects.filter(
+                promotion__in=current
+            ).values_list('promotion_id', column).iterator(chunk_size=10000):
+                targets[relation][promotion_id].append(target_id)
+
+        rules = []
+        for row in current.values(
+            'id', 'name', 'code', 'kind', 'value', 'min_spend', 'buy_quantity', 'get_quantity'
+        ).iterator(chunk_size=10000):
+            if row['kind'] == PromotionKind.BUY_X_GET_Y.value:
+                if not (row['buy_quantity'] and row['get_quantity']):
+                    logger.error(f"Promotion {row['id']} is buy X get Y without both quantities, skipped")
+                    continue
+                if not (targets['products'][row['id']] or targets['categories'][row['id']]):
+                    logger.error(f"Promotion {row['id']} is buy X get Y without products or categories, skipped")
+                    continue
+            rules.append(Rule(
+                row['id'], row['name'], row['kind'], row['value'],
+                code=row['code'],
+                min_spend=row['min_spend'],
+                buy=row['buy_quantity'],
+                get=row['get_quantity'],
+                product_ids=targets['products'][row['id']],
+                category_ids=targets['categories'][row['id']],
+            ))
+
+        # The next time a promotion starts or ends
+        upcoming = Promotion.objects.filter(is_active=True).aggregate(
+            starts=Min('starts_at', filter=Q(starts_at__gt=now)),
+            ends=Min('ends_at', filter=Q(ends_at__gt=now)),
+        )
+        boundaries = [moment for moment in upcoming.values() if moment is not None]
+        category_parents = dict(Category.objects.values_list('id', 'parent_id'))
+        return PromotionIndex(rules, category_parents, expires_at=min(boundaries, default=None))
+
+    @staticmethod
+    def quote(lines, codes=()):
+        """
+        Price [(product_id, quantity)] with the running promotions and
+        coupon codes: one query for the products, none per line
+        """
+        if len(lines) > PromotionService.MAX_LINES:
+            raise ValueError(f"At most {PromotionService.MAX_LINES} lines per cart")
+        quantities = defaultdict(int)
+        for product_id, quantity in lines:
+            if quantity < 1:
+                raise ValueError("Quantities must be at least 1")
+            quantities[product_id] += quantity
+
+        products = {
+            product_id: (category_id, price)
+            for product_id, category_id, price in Product.objects.filter(
+                id__in=list(quantities), is_active=True
+            ).values_list('id', 'category_id', 'effective_price')
+        }
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            raise ValueError(f"Unknown products: {', '.join(map(str, missing))}")
+
+        return active_promotions.get().price(
+            [(product_id, *products[product_id], quantity) for product_id, quantity in quantities.items()],
+            codes,
+        )
+
+
+class ActivePromotions:
+    """
+    The compiled promotion index of this worker.
+
+    Recompiled when the promotions version changes, when a promotion starts
+    or ends, and every PROMOTIONS_REBUILD_SECONDS so category moves are
+    picked up too. Readers keep the current index while one thread
+    recompiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.built_at = 0.0
+
+    def _stale(self, version):
+        if self.index is None or version != self.version:
+            return True
+        if self.index.expires_at is not None and timezone.now() >= self.index.expires_at:
+            return True
+        return time.monotonic() - self.built_at > getattr(settings, 'PROMOTIONS_REBUILD_SECONDS', 300)
+
+    def get(self):
+        version = PromotionService.get_version()
+        if not self._stale(version):
+            return self.index
+        if not self._lock.acquire(blocking=self.index is None):
+            return self.index
+        try:
+            if self._stale(version):
+                self.index = PromotionService.load_index()
+                self.version = version
+                self.built_at = time.monotonic()
+            return self.index
+        finally:
+            self._lock.release()
+
+
+active_promotions = ActivePromotions()
@@ -0,0 +1,15 @@
+# apps/promotions/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from .models import Promotion
+from .services import PromotionService
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(m2m_changed, sender=Promotion.products.through)
+@receiver(m2m_changed, sender=Promotion.categories.through)
+def bump_promotions_version(sender, **kwargs):
+    """Recompile the promotions in every worker once the change is committed"""
+    transaction.on_commit(PromotionService.bump_version)
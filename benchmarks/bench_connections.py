@@ -0,0 +1,96 @@
+# benchmarks/bench_connections.py
+"""
+Compare request latency under each DB_CONN_MODE against a local Postgres.
+
+Point the DB_* variables at a migrated database, then:
+
+    python -m benchmarks.bench_connections [--repeat 300] [--modes none,persistent,pool,pgbouncer]
+
+Each mode runs in its own process, since settings are read at startup.
+Requests go through the WSGI handler rather than the test client so
+connections are closed, or kept, exactly as they would be under gunicorn.
+"pgbouncer" only differs from "persistent" if DB_HOST/DB_PORT point at a
+PgBouncer.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from io import BytesIO
+from benchmarks.common import measure, setup_django, summarize
+
+MODES = ('none', 'persistent', 'pool', 'pgbouncer')
+ROUTES = [('health', '/api/health/'), ('categories', '/api/products/categories')]
+
+
+def wsgi_get(application, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+    }
+    response = application(environ, lambda status, headers: None)
+    try:
+        for _ in response:
+            pass
+    finally:
+        # Fires request_finished, where Django closes or keeps the connection
+        response.close()
+
+
+def run_mode(repeat):
+    """Child process: benchmark the mode configured in the environment"""
+    setup_django(test_database=False)
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+    application = get_wsgi_application()
+
+    results = {}
+    for name, path in ROUTES:
+        opened.clear()
+        timings = measure(lambda: wsgi_get(application, path), repeat=repeat)
+        # Pool checkouts also send connection_created; count real connections instead
+        pool = getattr(connection, 'pool', None)
+        new_connections = pool.get_stats()['connections_num'] if pool is not None else len(opened)
+        results[name] = {**summarize(timings), 'new_connections': new_connections}
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.repeat)
+        return
+
+    print(f"{'mode':<11} {'route':<11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'connects':>9}")
+    for mode in args.modes.split(','):
+        env = {**os.environ, 'USE_POSTGRES': 'True', 'DB_CONN_MODE': mode, 'PERF_INSTRUMENTATION': 'False'}
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_connections', '--child', '--repeat', str(args.repeat)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        for route, summary in json.loads(output.strip().splitlines()[-1]).items():
+            print(
+                f"{mode:<11} {route:<11} {summary['p50_ms']:>8.3f} {summary['p95_ms']:>8.3f} "
+                f"{summary['p99_ms']:>8.3f} {summary['new_connections']:>9}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_fieldsets.py
+"""
+Compare a product list page with every field against sparse fieldsets.
+
+    python -m benchmarks.bench_fieldsets [--products 1000] [--limit 48] [--repeat 20]
+
+Reports latency, payload size and the time spent in the database per page.
+The response cache is off so every request runs its queries.
+"""
+import argparse
+import time
+from benchmarks.bench_serialization import seed
+from benchmarks.common import measure, setup_django, summarize
+
+FIELDSETS = [
+    ('all fields', None),
+    ('grid: name, price, images', 'id,slug,name,effective_price,on_sale,images'),
+    ('grid without images', 'id,slug,name,effective_price,on_sale'),
+    ('ids and prices', 'id,effective_price'),
+]
+
+
+def db_ms(client, url):
+    """Milliseconds spent in queries, and how many ran, for one request"""
+    from django.db import connection
+
+    timings = []
+
+    def timed(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.append((time.perf_counter() - start) * 1000)
+
+    with connection.execute_wrapper(timed):
+        client.get(url)
+    return sum(timings), len(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=48)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+
+    settings.CATALOG_CACHE_TTL = 0
+    seed(args.products)
+    client = Client()
+
+    print(f"{'fieldset':<28} {'median ms':>10} {'p95 ms':>10} {'db ms':>8} {'queries':>8} {'bytes':>10}")
+    for name, fields in FIELDSETS:
+        url = f"/api/products/products?limit={args.limit}"
+        if fields:
+            url += f"&fields={fields}"
+        size = len(client.get(url).content)
+        database_ms, queries = db_ms(client, url)
+        stats = summarize(measure(lambda: client.get(url), repeat=args.repeat))
+        print(
+            f"{name:<28} {stats['median_ms']:>10.2f} {stats['p95_ms']:>10.2f} "
+            f"{database_ms:>8.2f} {queries:>8} {size:>10}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_holds.py
+"""
+Time releasing expired stock holds.
+
+    python -m benchmarks.bench_holds [--holds 100000] [--batch-size 500] [--sweepers 1]
+
+Creates pending orders of 1-3 lines, all with an already expired hold, and
+times the sweeper putting their stock back and cancelling them. Several
+sweepers run as threads, each with its own connection; they only work in
+parallel on PostgreSQL, where SKIP LOCKED keeps them on different rows.
+"""
+import argparse
+import random
+import threading
+import time
+from datetime import timedelta
+from benchmarks.common import setup_django
+
+
+def make_holds(count, rng):
+    from django.db import transaction
+    from django.utils import timezone
+    from apps.accounts.models import User
+    from apps.orders.models import Order, OrderItem, StockHold
+    from apps.products.models import Product
+    from benchmarks.seed import seed
+    from utils.constants import OrderStatus
+
+    seed(orders=0, images_per_product=0)
+    user_ids = list(User.objects.values_list('id', flat=True))
+    products = list(Product.objects.values_list('id', 'name', 'price'))
+    expired = timezone.now() - timedelta(minutes=1)
+
+    with transaction.atomic():
+        orders = Order.objects.bulk_create(
+            [Order(user_id=rng.choice(user_ids), status=OrderStatus.PENDING.value) for _ in range(count)],
+            batch_size=2000,
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, product_id=product_id, product_name=name, quantity=rng.randrange(1, 4),
+                          unit_price=price)
+                for order in orders
+                for product_id, name, price in rng.sample(products, rng.randrange(1, 4))
+            ],
+            batch_size=2000,
+        )
+        StockHold.objects.bulk_create(
+            [StockHold(order=order, expires_at=expired - timedelta(seconds=rng.randrange(3600))) for order in orders],
+            batch_size=2000,
+        )
+
+
+def sweep(batch_size, released):
+    from django.db import connection
+    from apps.orders.services import HoldService
+
+    try:
+        released.append(HoldService.release_expired(batch_size=batch_size))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--holds', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--sweepers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from apps.orders.models import StockHold
+    from apps.products.models import StockMovement
+
+    if args.sweepers > 1 and connection.vendor != 'postgresql':
+        parser.error("parallel sweepers need PostgreSQL")
+
+    start = time.perf_counter()
+    make_holds(args.holds, random.Random(args.seed))
+    print(f"{args.holds} expired holds created in {time.perf_counter() - start:.1f}s")
+
+    released = []
+    threads = [threading.Thread(target=sweep, args=(args.batch_size, released)) for _ in range(args.sweepers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    total = sum(released)
+    print(
+        f"{args.sweepers} sweeper(s), batches of {args.batch_size}: released {total} holds "
+        f"in {seconds:.2f}s ({total / seconds:,.0f} holds/s)"
+    )
+    print(f"holds left {StockHold.objects.count()}, movements written {StockMovement.objects.filter(reason='cancellation').count()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# benchmarks/bench_instrumentation.py
+"""
+Measure the overhead of PerformanceMiddleware on a cheap and a DB-bound route.
+
+    python -m benchmarks.bench_instrumentation [--repeat 500]
+"""
+import argparse
+from benchmarks.common import measure, setup_django, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+    from apps.products.models import Category, Product
+
+    category = Category.objects.create(name="Bench")
+    Product.objects.bulk_create([
+        Product(name=f"Product {i}", slug=f"product-{i}", description="", price=10, category=category)
+        for i in range(20)
+    ])
+
+    client = Client()
+    routes = [('static', '/api/cart/'), ('db', '/api/products/products?limit=20')]
+    print(f"{'route':<8} {'off median ms':>14} {'on median ms':>13} {'overhead ms':>12}")
+    for name, url in routes:
+        results = {}
+        for enabled in (False, True):
+            settings.PERF_INSTRUMENTATION = enabled
+            results[enabled] = summarize(measure(lambda: client.get(url), repeat=args.repeat))
+        off, on = results[False]['median_ms'], results[True]['median_ms']
+        print(f"{name:<8} {off:>14.3f} {on:>13.3f} {on - off:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
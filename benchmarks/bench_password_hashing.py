@@ -0,0 +1,85 @@
+# benchmarks/bench_password_hashing.py
+"""
+Logins per second against catalog latency under mixed load, for several
+password-hashing pool sizes.
+
+    python -m benchmarks.bench_password_hashing [--workers 0,1,2,4] [--login-threads 8] [--duration 10]
+
+Login threads hammer /api/auth/login while catalog threads time
+/api/products/products. Workers 0 hashes inline on the request thread,
+which is how login behaved before the pool.
+"""
+import argparse
+import threading
+import time
+from benchmarks.common import setup_django, summarize
+
+
+def run_mode(hashing_workers, login_threads, catalog_threads, duration):
+    from django.conf import settings
+    from django.test import Client
+    from apps.accounts.hashers import password_pool
+    from benchmarks.seed import SEED_PASSWORD, seed_user_email
+
+    settings.PASSWORD_HASHING_WORKERS = hashing_workers
+    password_pool.shutdown()
+
+    stop = threading.Event()
+    logins = {'ok': 0, 'busy': 0, 'error': 0}
+    catalog_ms = []
+    lock = threading.Lock()
+
+    def login_loop(index):
+        client = Client()
+        payload = {'email': seed_user_email(index), 'password': SEED_PASSWORD}
+        while not stop.is_set():
+            status = client.post('/api/auth/login', payload, content_type='application/json').status_code
+            with lock:
+                logins['ok' if status == 200 else 'busy' if status == 503 else 'error'] += 1
+
+    def catalog_loop():
+        client = Client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/products/products?limit=20')
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                catalog_ms.append(elapsed)
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(login_threads)]
+    threads += [threading.Thread(target=catalog_loop) for _ in range(catalog_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    password_pool.shutdown()
+    return logins, summarize(catalog_ms or [0.0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='0,1,2,4', help="PASSWORD_HASHING_WORKERS values to compare")
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--catalog-threads', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per mode")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from benchmarks.seed import seed
+    settings.RATELIMIT_ENABLED = False
+    seed(users=args.login_threads, products=200, orders=0)
+
+    print(f"{'workers':>7} {'logins/s':>9} {'503s':>6} {'catalog p50':>12} {'catalog p95':>12}")
+    for workers in (int(value) for value in args.workers.split(',')):
+        logins, catalog = run_mode(workers, args.login_threads, args.catalog_threads, args.duration)
+        print(
+            f"{workers:>7} {logins['ok'] / args.duration:>9.1f} {logins['busy']:>6} "
+            f"{catalog['p50_ms']:>12.2f} {catalog['p95_ms']:>12.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_promotions.py
+"""
+Price carts against a large set of running promotions.
+
+    python -m benchmarks.bench_promotions [--promotions 10000] [--lines 100] [--budget-ms 5]
+
+Synthetic promotions mix product and category discounts, buy-X-get-Y
+bundles, min-spend cart rules and coupons over a catalog with a category
+tree. Reports the compile time and per-cart pricing latency, and exits
+non-zero when the p99 is over the budget. Runs in-process without a
+database: loading the promotions is not included.
+"""
+import argparse
+import random
+import sys
+import time
+from decimal import Decimal
+from benchmarks.common import measure, summarize
+from apps.promotions.engine import BUY_X_GET_Y, FIXED, PERCENTAGE, PromotionIndex, Rule
+
+
+def make_catalog(products, categories, rng):
+    # A tree a few levels deep: each category hangs under an earlier one
+    category_parents = {1: None}
+    for category_id in range(2, categories + 1):
+        category_parents[category_id] = rng.randrange(1, category_id) if rng.random() < 0.8 else None
+    catalog = {
+        product_id: (rng.randrange(1, categories + 1), Decimal(rng.randrange(100, 20000)) / 100)
+        for product_id in range(1, products + 1)
+    }
+    return category_parents, catalog
+
+
+def make_rules(count, products, categories, coupons, rng):
+    rules = []
+    for rule_id in range(1, count + 1):
+        roll = rng.random()
+        kind = PERCENTAGE if rng.random() < 0.6 else FIXED
+        value = rng.randrange(5, 40) if kind == PERCENTAGE else rng.randrange(1, 20)
+        min_spend = rng.choice((0, 0, 0, 50, 100, 250))
+        code = f"CODE{rule_id}" if rule_id <= coupons else None
+        if roll < 0.45:
+            rule = Rule(rule_id, f"Product deal {rule_id}", kind, value, code=code, min_spend=min_spend,
+                        product_ids=rng.sample(range(1, products + 1), rng.randrange(1, 20)))
+        elif roll < 0.75:
+            rule = Rule(rule_id, f"Category sale {rule_id}", kind, value, code=code, min_spend=min_spend,
+                        category_ids=rng.sample(range(1, categories + 1), rng.randrange(1, 3)))
+        elif roll < 0.9:
+            rule = Rule(rule_id, f"Bundle {rule_id}", BUY_X_GET_Y, 0, code=code, min_spend=min_spend,
+                        buy=rng.randrange(1, 4), get=1,
+                        product_ids=rng.sample(range(1, products + 1), rng.randrange(2, 30)))
+        else:
+            rule = Rule(rule_id, f"Cart deal {rule_id}", kind, value, code=code, min_spend=min_spend * 2)
+        rules.append(rule)
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--promotions', type=int, default=10000)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--categories', type=int, default=300)
+    parser.add_argument('--coupons', type=int, default=500)
+    parser.add_argument('--lines', type=int, default=100)
+    parser.add_argument('--carts', type=int, default=200)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    category_parents, catalog = make_catalog(args.products, args.categories, rng)
+    rules = make_rules(args.promotions, args.products, args.categories, args.coupons, rng)
+
+    start = time.perf_counter()
+    index = PromotionIndex(rules, category_parents)
+    print(f"{len(rules)} promotions compiled in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    carts = [
+        [(product_id, *catalog[product_id], rng.randrange(1, 4))
+         for product_id in rng.sample(range(1, args.products + 1), args.lines)]
+        for _ in range(args.carts)
+    ]
+    # Skewed towards promoted products, as real carts are
+    promoted = sorted({product_id for rule in rules for product_id in rule.product_ids})
+    hot_carts = [
+        [(product_id, *catalog[product_id], rng.randrange(1, 4)) for product_id in rng.sample(promoted, args.lines)]
+        for _ in range(args.carts)
+    ]
+    codes = [f"CODE{rng.randrange(1, args.coupons + 1)}" for _ in range(3)] + ["NOT-A-CODE"]
+
+    workloads = [
+        ('random products', carts, ()),
+        ('promoted products', hot_carts, ()),
+        ('promoted + 4 coupons', hot_carts, codes),
+    ]
+    print(f"{args.lines}-line carts, budget {args.budget_ms} ms at p99")
+    print(f"{'cart':<22} {'p50 ms':>8} {'p99 ms':>8} {'discount':>10}")
+    over_budget = False
+    for name, workload, cart_codes in workloads:
+        position = iter(range(10 ** 9))
+        stats = summarize(measure(
+            lambda: index.price(workload[next(position) % len(workload)], cart_codes), repeat=len(workload) * 2
+        ))
+        discount = index.price(workload[0], cart_codes)['discount']
+        over_budget |= stats['p99_ms'] > args.budget_ms
+        print(f"{name:<22} {stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f} {discount:>10}")
+
+    if over_budget:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# benchmarks/bench_ratelimit.py
+"""
+Measure sliding-window rate-limit checks per second for each counter store.
+
+    python -m benchmarks.bench_ratelimit [--hits 200000] [--keys 10000] [--threads 1,8]
+
+The cache store uses whatever CACHES configures: local memory by default,
+Redis when REDIS_URL is set.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import setup_django
+
+
+def run(store, hits, keys, threads):
+    from utils.ratelimit import sliding_window_hit
+
+    def worker(offset):
+        for i in range(offset, hits, threads):
+            sliding_window_hit(f"bench:ip:{i % keys}", 20, 60, store=store)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    return hits / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hits', type=int, default=200000)
+    parser.add_argument('--keys', type=int, default=10000, help="distinct IPs/accounts being counted")
+    parser.add_argument('--threads', default='1,8')
+    args = parser.parse_args()
+
+    setup_django(test_database=False)
+    from utils.ratelimit import CacheRateLimitStore, LocalRateLimitStore
+
+    print(f"{'store':<8} {'threads':>7} {'checks/s':>12} {'us/check':>9}")
+    for name, store_class in (('local', LocalRateLimitStore), ('cache', CacheRateLimitStore)):
+        for threads in (int(value) for value in args.threads.split(',')):
+            store = store_class()
+            rate = run(store, args.hits, args.keys, threads)
+            store.clear()
+            print(f"{name:<8} {threads:>7} {rate:>12,.0f} {1e6 / rate:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
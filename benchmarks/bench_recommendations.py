@@ -0,0 +1,66 @@
+# benchmarks/bench_recommendations.py
+"""
+Time the co-occurrence counting behind build_recommendations.
+
+    python -m benchmarks.bench_recommendations [--lines 1000000] [--products 50000] [--new-lines 10000]
+
+Synthetic order lines follow a skewed product popularity with 1-8 lines
+per order. Reports a full build (pair counting, top neighbours) and an
+incremental update merging newer orders into the saved counts. Runs
+in-memory: reading the lines from the database is not included.
+"""
+import argparse
+import time
+import numpy as np
+from benchmarks.common import setup_django
+
+
+def make_lines(count, products, rng, first_order=0):
+    sizes = rng.integers(1, 9, size=count // 4)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), count)]
+    order_ids = np.repeat(np.arange(first_order, first_order + len(sizes)), sizes)
+    product_ids = (rng.zipf(1.3, size=len(order_ids)) - 1) % products + 1
+    return order_ids, product_ids
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--new-lines', type=int, default=10000)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django(test_database=False)
+    from apps.products.recommendations import count_pairs, merge_counts, top_neighbours, ID_BITS
+
+    rng = np.random.default_rng(args.seed)
+    order_ids, product_ids = make_lines(args.lines, args.products, rng)
+
+    (keys, counts), count_seconds = timed(count_pairs, order_ids, product_ids)
+    neighbours, top_seconds = timed(top_neighbours, keys, counts, args.k)
+    state_mb = (keys.nbytes + counts.nbytes) / 1e6
+    print(f"full build: {len(order_ids)} lines in {order_ids[-1] + 1} orders")
+    print(f"  count pairs      {count_seconds:8.2f}s  ({len(keys)} distinct pairs, state {state_mb:.1f} MB)")
+    print(f"  top {args.k} per product {top_seconds:8.2f}s  ({len(neighbours)} products)")
+
+    new_orders, new_products = make_lines(args.new_lines, args.products, rng, first_order=int(order_ids[-1]) + 1)
+    (new_keys, new_counts), new_count_seconds = timed(count_pairs, new_orders, new_products)
+    (keys, counts), merge_seconds = timed(merge_counts, keys, counts, new_keys, new_counts)
+    touched = set((new_keys >> ID_BITS).tolist())
+    neighbours, retop_seconds = timed(top_neighbours, keys, counts, args.k, touched)
+    print(f"incremental: {len(new_orders)} new lines")
+    print(f"  count pairs      {new_count_seconds:8.2f}s")
+    print(f"  merge counts     {merge_seconds:8.2f}s")
+    print(f"  top {args.k} (touched) {retop_seconds:8.2f}s  ({len(neighbours)} products)")
+
+
+if __name__ == '__main__':
+    main()
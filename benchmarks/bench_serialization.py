@@ -0,0 +1,69 @@
+# benchmarks/bench_serialization.py
+"""
+Compare serialization cost of a 1,000-product page across output modes.
+
+    python -m benchmarks.bench_serialization [--products 1000] [--repeat 20]
+"""
+import argparse
+from benchmarks.common import measure, setup_django, summarize
+
+
+def seed(count):
+    from apps.products.models import Category, Product, ProductImage
+
+    category = Category.objects.create(name="Bench")
+    Product.objects.bulk_create([
+        Product(
+            name=f"Product {i}",
+            slug=f"product-{i}",
+            description="Organic produce " * 20,
+            price=10 + i % 90,
+            sale_price=(5 + i % 40) if i % 3 == 0 else None,
+            category=category,
+            stock=i % 50,
+        )
+        for i in range(count)
+    ])
+    ProductImage.objects.bulk_create([
+        ProductImage(product_id=product_id, image=f"products/{product_id}.jpg", is_primary=True)
+        for product_id in Product.objects.values_list('id', flat=True)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import Client
+    from utils import renderers
+
+    seed(args.products)
+    client = Client()
+    url = f"/api/products/products?limit={args.products}"
+
+    # Dropping the orjson module forces the stdlib fallback in utils.renderers
+    orjson = renderers.orjson
+    modes = [
+        ('stdlib json + validation', None, False),
+        ('orjson + validation', orjson, False),
+        ('stdlib json + trusted rows', None, True),
+        ('orjson + trusted rows', orjson, True),
+    ]
+    if orjson is None:
+        print("orjson is not installed; the orjson modes fall back to stdlib json")
+
+    print(f"{'mode':<30} {'median ms':>10} {'p95 ms':>10} {'bytes':>10}")
+    for name, json_module, trusted in modes:
+        renderers.orjson = json_module
+        settings.TRUSTED_OUTPUT = trusted
+        size = len(client.get(url).content)
+        stats = summarize(measure(lambda: client.get(url), repeat=args.repeat))
+        print(f"{name:<30} {stats['median_ms']:>10.2f} {stats['p95_ms']:>10.2f} {size:>10}")
+
+
+if __name__ == '__main__':
+    main()
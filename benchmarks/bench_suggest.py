@@ -0,0 +1,80 @@
+# benchmarks/bench_suggest.py
+"""
+Measure the autocomplete prefix index on synthetic product names.
+
+    python -m benchmarks.bench_suggest [--names 500000] [--queries 2000]
+
+Reports build time, the memory the index holds, and per-lookup latency for
+short prefixes, longer prefixes and prefixes with a typo. Runs in-process
+without a database.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from benchmarks.common import summarize
+from utils.prefix_index import PrefixIndex
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def make_names(count, rng):
+    words = [
+        ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(3, 9))).title()
+        for _ in range(5000)
+    ]
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def with_typo(text, rng):
+    position = rng.randrange(1, len(text))
+    return text[:position] + rng.choice(ALPHABET) + text[position + 1:]
+
+
+def time_lookups(index, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_names(args.names, rng)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PrefixIndex.build((i, name, rng.random()) for i, name in enumerate(names))
+    build_seconds = time.perf_counter() - start
+    memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    print(f"{len(index)} names indexed in {build_seconds:.2f}s, index holds {memory_mb:.1f} MB")
+
+    samples = [rng.choice(names) for _ in range(args.queries)]
+    workloads = [
+        ('1-2 characters', [name[:rng.randint(1, 2)] for name in samples]),
+        ('3-8 characters', [name[:rng.randint(3, 8)] for name in samples]),
+        ('typo in 6 characters', [with_typo(name[:6], rng) for name in samples]),
+    ]
+
+    print(f"{'prefixes':<22} {'first p50':>10} {'first p99':>10} {'repeat p50':>11} {'repeat p99':>11}")
+    for name, queries in workloads:
+        # The first pass pays for ranking large ranges once; repeats hit the cached top entries
+        first = summarize(time_lookups(index, queries))
+        repeat = summarize(time_lookups(index, queries))
+        print(
+            f"{name:<22} {first['p50_ms']:>10.3f} {first['p99_ms']:>10.3f} "
+            f"{repeat['p50_ms']:>11.3f} {repeat['p99_ms']:>11.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
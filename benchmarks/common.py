@@ -0,0 +1,51 @@
+# benchmarks/common.py
+import math
+import os
+import statistics
+import time
+
+
+def setup_django(test_database=True):
+    """Configure Django, by default against a throwaway test database"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    import django
+    django.setup()
+
+    if test_database:
+        from django.db import connection
+        from django.test.utils import setup_test_environment
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0)
+
+
+def measure(func, repeat=20, warmup=2):
+    """Run func repeatedly and return per-call timings in milliseconds"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        'median_ms': statistics.median(ordered),
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'min_ms': ordered[0],
+        'max_ms': ordered[-1],
+    }
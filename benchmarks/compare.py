@@ -0,0 +1,74 @@
+# benchmarks/compare.py
+"""
+Diff two result files written by ``benchmarks.run --output``.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Steps whose p95 latency or queries per request grew by more than the
+threshold (percent) are flagged, and the exit status is 1 if any were.
+"""
+import argparse
+import json
+from pathlib import Path
+
+
+def change(before, after):
+    if before is None or after is None:
+        return None
+    if before == 0:
+        return 0.0 if after == 0 else float('inf')
+    return (after - before) / before * 100
+
+
+def compare(before, after, threshold):
+    rows = []
+    regressions = 0
+    for scenario, scenario_results in after['results'].items():
+        base_steps = before['results'].get(scenario, {}).get('steps', {})
+        for step, stats in scenario_results['steps'].items():
+            base = base_steps.get(step)
+            if base is None:
+                rows.append((scenario, step, None, None, None, None, "new"))
+                continue
+            p95_change = change(base['p95_ms'], stats['p95_ms'])
+            query_change = change(base['queries_per_request'], stats['queries_per_request'])
+            regressed = p95_change > threshold or (query_change is not None and query_change > threshold)
+            regressions += regressed
+            rows.append((
+                scenario, step,
+                change(base['p50_ms'], stats['p50_ms']),
+                p95_change,
+                change(base['p99_ms'], stats['p99_ms']),
+                query_change,
+                "REGRESSION" if regressed else "",
+            ))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0)
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    if before['meta'].get('dataset') != after['meta'].get('dataset'):
+        print("warning: the two runs used different datasets")
+
+    def fmt(value):
+        return f"{'n/a':>8}" if value is None else f"{value:>+7.1f}%"
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(f"{'scenario':<10} {'step':<16} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>8}")
+    for scenario, step, p50, p95, p99, queries, flag in rows:
+        print(f"{scenario:<10} {step:<16} {fmt(p50)} {fmt(p95)} {fmt(p99)} {fmt(queries)} {flag}")
+    for scenario, scenario_results in after['results'].items():
+        base = before['results'].get(scenario, {}).get('throughput_rps')
+        print(f"{scenario:<10} {'throughput':<16} {fmt(change(base, scenario_results['throughput_rps']))}")
+    raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+# benchmarks/run.py
+"""
+Run load-test scenarios against the API and report latency percentiles,
+throughput and queries per request.
+
+    python -m benchmarks.run --driver client --iterations 50
+    python -m benchmarks.run --driver gunicorn --workers 4 --concurrency 16 --output after.json
+    python -m benchmarks.run --driver gunicorn --asgi --workers 4 --concurrency 16 --output asgi.json
+
+The client driver calls the app in-process through Django's test client;
+the gunicorn driver seeds a temporary SQLite database, starts a local
+gunicorn on it and drives it over HTTP, with sync workers or, with --asgi,
+uvicorn workers. The gunicorn driver also records the resident memory of
+the server so sync and ASGI runs can be compared at the same footprint.
+Query counts come from the Server-Timing header written by
+PerformanceMiddleware.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from benchmarks.common import setup_django, summarize
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+QUERY_COUNT_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class Recorder:
+    """Thread-safe collection of (step, latency, queries, ok) samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def add(self, scenario, step, elapsed_ms, queries, ok):
+        with self._lock:
+            self.samples[(scenario, step)].append((elapsed_ms, queries, ok))
+
+
+class BaseDriver:
+    def __init__(self, recorder, scenario):
+        self.recorder = recorder
+        self.scenario = scenario
+
+    def request(self, step, method, path, payload=None, token=None):
+        headers = {}
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        start = time.perf_counter()
+        status, body, server_timing = self.send(method, path, payload, headers)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = QUERY_COUNT_RE.search(server_timing or '')
+        queries = int(match.group(1)) if match else None
+        ok = 200 <= status < 400
+        self.recorder.add(self.scenario, step, elapsed_ms, queries, ok)
+        if not ok or not body:
+            return None
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+
+
+class ClientDriver(BaseDriver):
+    def __init__(self, recorder, scenario):
+        super().__init__(recorder, scenario)
+        from django.test import Client
+        self.client = Client()
+
+    def send(self, method, path, payload, headers):
+        extra = {f"HTTP_{name.upper()}": value for name, value in headers.items()}
+        if payload is not None:
+            response = self.client.generic(
+                method, path, json.dumps(payload), content_type='application/json', **extra
+            )
+        else:
+            response = self.client.generic(method, path, **extra)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, body, response.get('Server-Timing')
+
+
+class HttpDriver(BaseDriver):
+    base_url = None
+
+    def send(self, method, path, payload, headers):
+        data = None
+        if payload is not None:
+            data = json.dumps(payload).encode()
+            headers = {**headers, 'Content-Type': 'application/json'}
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read(), response.headers.get('Server-Timing')
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), e.headers.get('Server-Timing')
+        except OSError:
+            return 599, b'', None
+
+
+def start_gunicorn(database_path, workers, port, asgi=False):
+    env = {
+        **os.environ,
+        'SQLITE_PATH': str(database_path),
+        'DEBUG': 'False',
+        'PERF_INSTRUMENTATION': 'True',
+        'METRICS_DIR': str(Path(database_path).parent / 'metrics'),
+        'ASGI_MODE': str(asgi),
+        # Every request comes from 127.0.0.1: per-IP login limits would
+        # turn most of the login scenario into 429s
+        'RATELIMIT_ENABLED': 'False',
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+        cwd=PROJECT_ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health/', timeout=1).read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not become healthy within 30s")
+
+
+def process_tree_rss_mb(pid):
+    """Resident memory of a process and its children, from /proc (Linux only)"""
+    children = defaultdict(list)
+    for stat_path in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat_path.read_text().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children[int(fields[1])].append(int(stat_path.parent.name))
+
+    total_kb, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def run_scenarios(driver_class, scenarios, iterations, concurrency, dataset, seed):
+    from benchmarks.scenarios import SCENARIOS
+
+    recorder = Recorder()
+    wall_times = {}
+    for name in scenarios:
+        def journey(index, name=name):
+            driver = driver_class(recorder, name)
+            SCENARIOS[name](driver, random.Random(seed + index), dataset)
+
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(journey, range(iterations)))
+        else:
+            for index in range(iterations):
+                journey(index)
+        wall_times[name] = time.perf_counter() - start
+    return recorder, wall_times
+
+
+def build_report(recorder, wall_times, meta):
+    results = {}
+    for (scenario, step), samples in sorted(recorder.samples.items()):
+        latencies = [elapsed for elapsed, _, _ in samples]
+        queries = [count for _, count, _ in samples if count is not None]
+        stats = summarize(latencies)
+        scenario_results = results.setdefault(scenario, {'steps': {}})
+        scenario_results['steps'][step] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, ok in samples if not ok),
+            'p50_ms': stats['p50_ms'],
+            'p95_ms': stats['p95_ms'],
+            'p99_ms': stats['p99_ms'],
+            'mean_ms': stats['mean_ms'],
+            'queries_per_request': sum(queries) / len(queries) if queries else None,
+        }
+    for scenario, wall_time in wall_times.items():
+        total = sum(step['requests'] for step in results.get(scenario, {}).get('steps', {}).values())
+        results.setdefault(scenario, {'steps': {}})
+        results[scenario]['throughput_rps'] = total / wall_time if wall_time else 0.0
+        results[scenario]['wall_time_s'] = wall_time
+    return {'meta': meta, 'results': results}
+
+
+def print_report(report):
+    print(f"{'scenario':<10} {'step':<16} {'reqs':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>6}")
+    for scenario, scenario_results in report['results'].items():
+        for step, stats in scenario_results['steps'].items():
+            queries = stats['queries_per_request']
+            print(
+                f"{scenario:<10} {step:<16} {stats['requests']:>6} {stats['errors']:>4} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+                f"{queries if queries is None else round(queries, 1)!s:>6}"
+            )
+        print(f"{scenario:<10} {'throughput':<16} {scenario_results['throughput_rps']:>6.1f} req/s")
+    if report['meta'].get('server_rss_mb') is not None:
+        print(f"server memory {report['meta']['server_rss_mb']:.1f} MB RSS")
+
+
+def main():
+    from benchmarks.scenarios import SCENARIOS
+    from benchmarks.seed import DEFAULT_SIZES, seed
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--driver', choices=('client', 'gunicorn'), default='client')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument('--iterations', type=int, default=50, help="journeys per scenario")
+    parser.add_argument('--concurrency', type=int, default=1, help="parallel journeys (gunicorn driver)")
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--asgi', action='store_true', help="serve core.asgi with uvicorn workers")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--users', type=int, default=DEFAULT_SIZES['users'])
+    parser.add_argument('--products', type=int, default=DEFAULT_SIZES['products'])
+    parser.add_argument('--orders', type=int, default=DEFAULT_SIZES['orders'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write the results as JSON for benchmarks.compare")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or sorted(SCENARIOS)
+    sizes = {'users': args.users, 'products': args.products, 'orders': args.orders}
+
+    rss_mb = None
+    if args.driver == 'client':
+        setup_django()
+        from django.conf import settings
+        settings.RATELIMIT_ENABLED = False
+        dataset = seed(seed=args.seed, **sizes)
+        recorder, wall_times = run_scenarios(ClientDriver, scenarios, args.iterations, 1, dataset, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_path = Path(tmp_dir) / 'bench.sqlite3'
+            os.environ['SQLITE_PATH'] = str(database_path)
+            setup_django(test_database=False)
+            from django.core.management import call_command
+            call_command('migrate', verbosity=0)
+            dataset = seed(seed=args.seed, **sizes)
+
+            process = start_gunicorn(database_path, args.workers, args.port, asgi=args.asgi)
+            try:
+                HttpDriver.base_url = f'http://127.0.0.1:{args.port}'
+                recorder, wall_times = run_scenarios(
+                    HttpDriver, scenarios, args.iterations, args.concurrency, dataset, args.seed
+                )
+                rss_mb = process_tree_rss_mb(process.pid)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    meta = {
+        'driver': args.driver,
+        'iterations': args.iterations,
+        'concurrency': args.concurrency if args.driver == 'gunicorn' else 1,
+        'workers': args.workers if args.driver == 'gunicorn' else None,
+        'asgi': args.asgi if args.driver == 'gunicorn' else False,
+        'server_rss_mb': rss_mb,
+        'dataset': dataset,
+        'seed': args.seed,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    report = build_report(recorder, wall_times, meta)
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/scenarios.py
+"""
+User journeys exercised by the load-test runner. Each scenario receives a
+driver and a deterministic random generator and issues its requests
+through ``driver.request(step, method, path, ...)``.
+"""
+from benchmarks.seed import SEED_PASSWORD, seed_user_email
+
+
+def login(driver, rng, users):
+    email = seed_user_email(rng.randrange(users))
+    response = driver.request('login', 'POST', '/api/auth/login', payload={
+        'email': email,
+        'password': SEED_PASSWORD,
+    })
+    return (response or {}).get('access_token')
+
+
+def browse_catalog(driver, rng, dataset):
+    driver.request('home', 'GET', '/api/products/home')
+    driver.request('categories', 'GET', '/api/products/categories')
+    sort = rng.choice(('newest', 'price_asc', 'price_desc', 'discount', 'trending'))
+    page = driver.request('product_list', 'GET', f'/api/products/products?sort={sort}&limit=24')
+    for product in rng.sample((page or {}).get('items', []), min(3, len((page or {}).get('items', [])))):
+        driver.request('product_detail', 'GET', f"/api/products/products/{product['id']}")
+
+
+def login_profile(driver, rng, dataset):
+    token = login(driver, rng, dataset['users'])
+    if token:
+        driver.request('profile', 'GET', '/api/auth/me', token=token)
+
+
+def cart(driver, rng, dataset):
+    token = login(driver, rng, dataset['users'])
+    page = driver.request('product_list', 'GET', '/api/products/products?limit=24')
+    for product in (page or {}).get('items', [])[:2]:
+        driver.request('product_detail', 'GET', f"/api/products/products/{product['id']}")
+    driver.request('cart', 'GET', '/api/cart/', token=token)
+
+
+SCENARIOS = {
+    'browse': browse_catalog,
+    'login': login_profile,
+    'cart': cart,
+}
@@ -0,0 +1,140 @@
+# benchmarks/seed.py
+"""
+Deterministic benchmark dataset: users, a category tree, products with
+images and orders. The same arguments always produce the same rows.
+
+    python -m benchmarks.seed [--users 200] [--products 2000] [--orders 1000]
+
+Without --test-database the rows go into the configured database.
+"""
+import argparse
+import random
+from decimal import Decimal
+
+SEED_PASSWORD = "Bench-Passw0rd!"
+DEFAULT_SIZES = {
+    'users': 200,
+    'root_categories': 8,
+    'child_categories': 4,
+    'products': 2000,
+    'images_per_product': 2,
+    'orders': 1000,
+    'max_order_lines': 5,
+}
+
+
+def seed_user_email(index):
+    return f"bench-user-{index}@example.com"
+
+
+def seed(seed=42, **sizes):
+    """Populate the database and return the sizes that were used"""
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from apps.accounts.models import User
+    from apps.orders.models import Order, OrderItem
+    from apps.products.models import Category, Product, ProductImage, StockMovement
+    from utils.constants import OrderStatus
+
+    sizes = {**DEFAULT_SIZES, **{k: v for k, v in sizes.items() if v is not None}}
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        # Hash once: PBKDF2 per user would dominate seeding time
+        password = make_password(SEED_PASSWORD)
+        User.objects.bulk_create([
+            User(
+                username=f"bench{i}",
+                email=seed_user_email(i),
+                password=password,
+                first_name="Bench",
+                last_name=str(i),
+                is_email_verified=True,
+            )
+            for i in range(sizes['users'])
+        ])
+        user_ids = list(User.objects.filter(email__startswith="bench-user-").values_list('id', flat=True))
+
+        roots = Category.objects.bulk_create([
+            Category(name=f"Category {i}", slug=f"bench-category-{i}")
+            for i in range(sizes['root_categories'])
+        ])
+        children = Category.objects.bulk_create([
+            Category(name=f"Category {root.pk}.{j}", slug=f"bench-category-{root.pk}-{j}", parent=root)
+            for root in roots
+            for j in range(sizes['child_categories'])
+        ])
+        category_ids = [category.pk for category in roots + children]
+
+        products = []
+        for i in range(sizes['products']):
+            price = Decimal(rng.randrange(100, 10000)) / 100
+            on_sale = rng.random() < 0.25
+            products.append(Product(
+                name=f"Organic product {i}",
+                slug=f"bench-product-{i}",
+                description=" ".join(rng.choice(("fresh", "organic", "local", "seasonal", "raw"))
+                                     for _ in range(rng.randrange(10, 60))),
+                price=price,
+                sale_price=(price * Decimal("0.8")).quantize(Decimal("0.01")) if on_sale else None,
+                category_id=rng.choice(category_ids),
+                stock=rng.randrange(0, 500),
+                is_active=rng.random() > 0.05,
+                is_featured=rng.random() < 0.05,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=1000)
+        StockMovement.objects.bulk_create([
+            StockMovement(product=product, delta=product.stock, reason='adjustment', reference="opening balance")
+            for product in products
+            if product.stock
+        ], batch_size=1000)
+        product_prices = {product.pk: product.sale_price or product.price for product in products}
+        product_names = {product.pk: product.name for product in products}
+
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f"products/bench-{product.pk}-{j}.jpg", is_primary=j == 0)
+            for product in products
+            for j in range(sizes['images_per_product'])
+        ], batch_size=1000)
+
+        product_ids = list(product_prices)
+        statuses = [status.value for status in OrderStatus]
+        orders = Order.objects.bulk_create([
+            Order(user_id=rng.choice(user_ids), status=rng.choice(statuses))
+            for _ in range(sizes['orders'])
+        ], batch_size=1000)
+        items = []
+        for order in orders:
+            lines = rng.sample(product_ids, rng.randrange(1, sizes['max_order_lines'] + 1))
+            order.total_amount = Decimal(0)
+            for product_id in lines:
+                quantity = rng.randrange(1, 4)
+                items.append(OrderItem(
+                    order=order,
+                    product_id=product_id,
+                    product_name=product_names[product_id],
+                    quantity=quantity,
+                    unit_price=product_prices[product_id],
+                ))
+                order.total_amount += product_prices[product_id] * quantity
+        OrderItem.objects.bulk_create(items, batch_size=1000)
+        Order.objects.bulk_update(orders, ['total_amount'], batch_size=1000)
+
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--test-database', action='store_true', help="seed a throwaway test database")
+    args = vars(parser.parse_args())
+
+    from benchmarks.common import setup_django
+    setup_django(test_database=args.pop('test_database'))
+    print(seed(**args))
+
+
+if __name__ == '__main__':
+    main()
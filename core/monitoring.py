@@ -0,0 +1,72 @@
+# core/monitoring.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from ninja import Router, Schema
+from typing import Dict
+from utils.budgets import perf_budget
+from utils.metrics import metrics_store, render_prometheus
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+
+
+class HealthSchema(Schema):
+    status: str
+    checks: Dict[str, str]
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def check_cache():
+    cache.set('health:ping', 1, timeout=10)
+    if cache.get('health:ping') != 1:
+        raise RuntimeError("cache did not return the value just written")
+
+
+# Readiness probe used by Render's healthCheckPath
+@router.get("/health/", response={200: HealthSchema, 503: HealthSchema})
+@perf_budget(max_queries=1, max_ms=25)
+def health(request):
+    checks = {}
+    for name, check in (('database', check_database), ('cache', check_cache)):
+        try:
+            check()
+            checks[name] = "ok"
+        except Exception as e:
+            logger.error(f"Health check {name} failed: {e}")
+            checks[name] = "error"
+
+    if not all(result == "ok" for result in checks.values()):
+        return 503, {"status": "error", "checks": checks}
+
+    # Reads fall back to the primary, so a lost replica only degrades service
+    status = "ok"
+    for alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        try:
+            check_database(alias)
+            checks[alias] = "ok"
+        except Exception as e:
+            logger.error(f"Health check {alias} failed: {e}")
+            checks[alias] = "error"
+            status = "degraded"
+    return 200, {"status": status, "checks": checks}
+
+
+# Prometheus scrape target, aggregated across all gunicorn workers
+@router.get("/metrics")
+def metrics(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.META.get('HTTP_AUTHORIZATION') != f"Bearer {token}":
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        render_prometheus(metrics_store.read_all()),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
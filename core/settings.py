@@ -1,3 +1,4 @@
+import importlib.util
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -42,9 +43,12 @@ INSTALLED_APPS = [
     'apps.cart',
     'apps.payments',
     'apps.wishlist',
+    'apps.promotions',
 ]
 
 MIDDLEWARE = [
+    'utils.instrumentation.PerformanceMiddleware',  # Outermost so it times everything below
+    'utils.db_routing.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Add this line at the top
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,6 +59,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request timing (Server-Timing header and per-route aggregates)
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', 'True') == 'True'
+# Log requests slower than this many milliseconds with their SQL (0 disables)
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '0'))
+
+# Per-worker metrics files merged by /api/metrics; cleared when gunicorn starts
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / 'var' / 'metrics'))
+# Bearer token required to scrape /api/metrics (open when unset)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, set to False in production
 CORS_ALLOWED_ORIGINS = [
@@ -112,16 +126,166 @@ if os.getenv('USE_POSTGRES', 'False') == 'True':
             'PASSWORD': os.getenv('DB_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
+            'OPTIONS': {},
         }
     }
+    if os.getenv('DB_SSLMODE'):
+        DATABASES['default']['OPTIONS']['sslmode'] = os.getenv('DB_SSLMODE')
+
+    # How connections are reused between requests (DB_CONN_MODE):
+    # - persistent: each worker thread keeps its connection for DB_CONN_MAX_AGE
+    #   seconds and checks it is alive before reusing it
+    # - pool: Django's native psycopg 3 pool (needs psycopg[pool]), sized per
+    #   worker process; workers x DB_POOL_MAX_SIZE must fit max_connections
+    # - pgbouncer: persistent connections to a PgBouncer in transaction
+    #   pooling mode, which cannot hold server-side cursors across statements
+    # - none: a new connection per request
+    # Under ASGI every request runs its ORM calls on a fresh thread, so
+    # per-thread persistent connections would leak: pool is the default there
+    # and the other modes close connections after each request
+    ASGI_MODE = os.getenv('ASGI_MODE', 'False') == 'True'
+    DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'pool' if ASGI_MODE else 'persistent')
+    if DB_CONN_MODE == 'pool':
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        }
+    elif DB_CONN_MODE in ('persistent', 'pgbouncer'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0 if ASGI_MODE else int(os.getenv('DB_CONN_MAX_AGE', '600'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+        # .iterator() then buffers each chunk client-side instead of streaming
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = DB_CONN_MODE == 'pgbouncer'
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Read replicas (DB_REPLICAS): comma-separated Postgres hosts ("host" or
+# "host:port") or, for local testing, SQLite file paths. GET requests read
+# from them unless the client wrote within REPLICA_STICKY_SECONDS; a replica
+# that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f"replica{index + 1}"
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = replica.strip()
+    else:
+        host, _, port = replica.strip().partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['utils.db_routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_RETRY_SECONDS = int(os.getenv('REPLICA_RETRY_SECONDS', '30'))
+
+# Cache configuration. Every worker must see the same cache: the catalog
+# and promotions versions, single-flight locks, replica stickiness and the
+# rate-limit counters live in it. CACHE_BACKEND is "redis" (REDIS_URL),
+# "database" (a table made by `manage.py createcachetable`) or "locmem",
+# which is per process and only suits development or a single worker.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if os.getenv('REDIS_URL') else 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         }
     }
 
+# Rendered catalog list responses are cached for CATALOG_CACHE_TTL seconds
+# (0 disables) and served stale for up to CATALOG_CACHE_STALE_SECONDS more
+# while a single caller rebuilds them
+CATALOG_CACHE_TTL = int(os.getenv('CATALOG_CACHE_TTL', '30'))
+CATALOG_CACHE_STALE_SECONDS = int(os.getenv('CATALOG_CACHE_STALE_SECONDS', '300'))
+# Single products cached for batch lookups, under the catalog version (0 disables)
+PRODUCT_CACHE_SECONDS = int(os.getenv('PRODUCT_CACHE_SECONDS', '3600'))
+SINGLE_FLIGHT_LOCK_SECONDS = int(os.getenv('SINGLE_FLIGHT_LOCK_SECONDS', '10'))
+# Higher values refresh hot entries earlier, before they expire
+CACHE_EARLY_EXPIRY_BETA = float(os.getenv('CACHE_EARLY_EXPIRY_BETA', '1.0'))
+
+# Full rebuild interval of the in-process autocomplete index; in between
+# it only re-reads changed rows. Each worker indexes at most
+# SUGGEST_MAX_PRODUCTS products, the best sellers first (about 200 bytes each)
+SUGGEST_REBUILD_SECONDS = int(os.getenv('SUGGEST_REBUILD_SECONDS', '3600'))
+SUGGEST_MAX_PRODUCTS = int(os.getenv('SUGGEST_MAX_PRODUCTS', '100000'))
+
+# Product views are counted in memory and added to hourly ProductStats rows
+# every PRODUCT_VIEW_FLUSH_SECONDS. compute_trending scores products by those
+# views, halving an hour's weight every TRENDING_HALF_LIFE_HOURS
+PRODUCT_VIEW_TRACKING = os.getenv('PRODUCT_VIEW_TRACKING', 'True') == 'True'
+PRODUCT_VIEW_FLUSH_SECONDS = int(os.getenv('PRODUCT_VIEW_FLUSH_SECONDS', '10'))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_WINDOW_HOURS = int(os.getenv('TRENDING_WINDOW_HOURS', '168'))
+
+# "Frequently bought together": build_recommendations keeps the running pair
+# counts in this file and stores each product's top partners in the database,
+# together with the last order counted
+RECOMMENDATIONS_STATE_FILE = os.getenv(
+    'RECOMMENDATIONS_STATE_FILE', str(BASE_DIR / 'var' / 'recommendations' / 'cooccurrence.npz')
+)
+RECOMMENDATIONS_PER_PRODUCT = int(os.getenv('RECOMMENDATIONS_PER_PRODUCT', '20'))
+RECOMMENDATIONS_MAX_BASKET = int(os.getenv('RECOMMENDATIONS_MAX_BASKET', '50'))
+
+# Pending orders hold their stock this long; sweep_holds then cancels
+# unpaid ones and puts the stock back
+ORDER_HOLD_SECONDS = int(os.getenv('ORDER_HOLD_SECONDS', '900'))
+
+# Each worker compiles the running promotions once and recompiles them when
+# they change, or at the latest every PROMOTIONS_REBUILD_SECONDS
+PROMOTIONS_REBUILD_SECONDS = int(os.getenv('PROMOTIONS_REBUILD_SECONDS', '300'))
+
+# Sliding-window throttling of the auth endpoints. The "cache" store shares
+# counters across workers through CACHES; "local" keeps them in-process
+RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True') == 'True'
+RATELIMIT_STORE = os.getenv('RATELIMIT_STORE', 'cache')
+# Behind Render's proxy REMOTE_ADDR is the proxy; the client is in X-Forwarded-For
+RATELIMIT_TRUST_X_FORWARDED_FOR = os.getenv('RATELIMIT_TRUST_X_FORWARDED_FOR', 'False') == 'True'
+
+# Render list endpoints straight from .values() rows, skipping response validation
+TRUSTED_OUTPUT = os.getenv('TRUSTED_OUTPUT', 'False') == 'True'
+
+# Optional directory holding the pre-serialized homepage snapshot on disk
+HOME_SNAPSHOT_DIR = os.getenv('HOME_SNAPSHOT_DIR') or None
+
+# Password hashing: Argon2 when argon2-cffi is installed, PBKDF2 otherwise.
+# Hashes made by a later hasher in the list, or with other costs, are
+# upgraded to the first one on the user's next login
+PASSWORD_HASHERS = [
+    'apps.accounts.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+if importlib.util.find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, 'apps.accounts.hashers.TunedArgon2PasswordHasher')
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '102400'))  # KiB
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '1'))
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', '870000'))
+# Hashing runs on this many threads per process; beyond the queue limit
+# logins fail fast with 503 instead of piling up (0 hashes inline)
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', '2'))
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', '8'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
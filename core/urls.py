@@ -6,6 +6,8 @@ from django.conf.urls.static import static
 from ninja import NinjaAPI
 from ninja import Router
 from django.http import HttpResponse
+from utils.renderers import FastJSONRenderer
+from apps.accounts.hashers import PasswordHashingBusy
 
 # Import your routers
 from apps.accounts.api import router as accounts_router
@@ -14,9 +16,19 @@ from apps.orders.api import router as orders_router
 from apps.cart.api import router as cart_router
 from apps.payments.api import router as payments_router
 from apps.wishlist.api import router as wishlist_router
+from apps.promotions.api import router as promotions_router
+from core.monitoring import router as monitoring_router
+
+# Initialize the API (orjson rendering when installed, stdlib json otherwise)
+api = NinjaAPI(renderer=FastJSONRenderer())
+
+# Login bursts beyond the password-hashing queue fail fast instead of queueing
+@api.exception_handler(PasswordHashingBusy)
+def password_hashing_busy(request, exc):
+    response = api.create_response(request, {"detail": "Service busy, try again shortly"}, status=503)
+    response['Retry-After'] = '1'
+    return response
 
-# Initialize the API
-api = NinjaAPI()
 
 # Add routers
 api.add_router("/auth/", accounts_router)
@@ -25,6 +37,8 @@ api.add_router("/orders/", orders_router)
 api.add_router("/cart/", cart_router)
 api.add_router("/payments/", payments_router)
 api.add_router("/wishlist/", wishlist_router)
+api.add_router("/promotions/", promotions_router)
+api.add_router("/", monitoring_router)
 
 
 urlpatterns = [
@@ -0,0 +1,32 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn` run from the project root.
+import os
+import shutil
+
+# The app is chosen here rather than on the command line so ASGI_MODE can
+# switch it: core.asgi under uvicorn workers serves the async endpoints on
+# the event loop, so one worker keeps many slow requests in flight
+wsgi_app = 'core.wsgi:application'
+if os.getenv('ASGI_MODE', 'False') == 'True':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    # Several request threads per process: password hashing runs on its own
+    # bounded pool, so while logins wait for it the other threads keep
+    # serving, and logins beyond PASSWORD_HASHING_QUEUE get a 503
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+
+def on_starting(server):
+    """Refuse to run workers without a shared cache, and drop old metrics files"""
+    from pathlib import Path
+    from core import settings
+    if server.cfg.workers > 1 and settings.CACHE_BACKEND == 'locmem':
+        # Each worker would keep its own catalog version, locks and rate
+        # limits, serving stale pages after another worker's writes
+        raise SystemExit(
+            f"{server.cfg.workers} workers need a shared cache: set REDIS_URL or CACHE_BACKEND=database"
+        )
+    metrics_dir = os.getenv('METRICS_DIR', str(Path(__file__).resolve().parent / 'var' / 'metrics'))
+    shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -0,0 +1,53 @@
+# tests/conftest.py
+from datetime import datetime, timedelta, timezone as dt_timezone
+import pytest
+
+pytest_plugins = ['tests.perf_budgets']
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    """
+    Put the SQLite test database in a file: shared-cache in-memory SQLite
+    fails concurrent writers with "table is locked" instead of making them
+    wait, which the concurrency tests need.
+    """
+    from django.conf import settings
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def local_rate_limits(settings):
+    """Rate-limit counters in-process, fresh for every test"""
+    from utils.ratelimit import get_store
+    settings.RATELIMIT_STORE = 'local'
+    yield
+    get_store().clear()
+
+
+@pytest.fixture(autouse=True)
+def no_view_tracking(settings):
+    """Keep the view counter from flushing into other tests' databases"""
+    settings.PRODUCT_VIEW_TRACKING = False
+
+
+class FakeClock:
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, **kwargs):
+        self.current += timedelta(**kwargs)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freeze django.utils.timezone.now, including auto_now fields, until advanced"""
+    from django.utils import timezone
+    fake = FakeClock(datetime(2026, 1, 1, 12, 0, tzinfo=dt_timezone.utc))
+    monkeypatch.setattr(timezone, 'now', fake.now)
+    return fake
@@ -0,0 +1,123 @@
+# tests/perf_budgets.py
+"""
+Pytest plugin enforcing the ``@perf_budget`` declared on API endpoints.
+
+Every budgeted route is requested against a small seeded dataset and fails
+if it runs more queries, or takes longer, than its budget allows. Latency
+budgets are multiplied by ``PERF_BUDGET_MS_FACTOR`` (default 1) so slower CI
+machines can relax them without touching the declarations.
+"""
+import os
+import time
+import pytest
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from utils.budgets import iter_budgeted_routes
+
+BUDGET_SIZES = {
+    'users': 20,
+    'root_categories': 4,
+    'child_categories': 3,
+    'products': 300,
+    'images_per_product': 2,
+    'orders': 100,
+    'max_order_lines': 4,
+}
+TIMED_RUNS = 3
+
+
+def _budgeted_routes():
+    from core.urls import api
+    return list(iter_budgeted_routes(api))
+
+
+def pytest_generate_tests(metafunc):
+    if 'budgeted_route' in metafunc.fixturenames:
+        routes = _budgeted_routes()
+        metafunc.parametrize(
+            'budgeted_route', routes, ids=[f"{route.method} {route.path}" for route in routes]
+        )
+
+
+@pytest.fixture(scope='module')
+def budget_dataset(django_db_setup, django_db_blocker):
+    """Seeded rows shared by the module, rolled back once it is done"""
+    from apps.accounts.models import User
+    from apps.accounts.services import AuthService
+    from apps.products.models import Category, Product
+    from benchmarks.seed import seed, seed_user_email
+
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            seed(**BUDGET_SIZES)
+            user = User.objects.get(email=seed_user_email(0))
+            staff = User.objects.create_user(
+                username="budget-staff", email="budget-staff@example.com",
+                password=None, is_staff=True
+            )
+            yield {
+                'tokens': {
+                    False: AuthService.create_token(user.id),
+                    True: AuthService.create_token(staff.id),
+                },
+                'path_params': {
+                    'product_id': Product.objects.filter(is_active=True).values_list('id', flat=True).first(),
+                    'category_id': Category.objects.filter(is_active=True).values_list('id', flat=True).first(),
+                },
+            }
+            transaction.set_rollback(True)
+
+
+def _request(client, route, url, token):
+    headers = {'HTTP_AUTHORIZATION': f"Bearer {token}"} if token else {}
+    response = getattr(client, route.method.lower())(url, data=route.budget.query, **headers)
+    # Streaming bodies only hit the database while they are consumed
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+@pytest.fixture
+def check_budget(budget_dataset, db, settings):
+    # Replica test mirrors cannot see the uncommitted seeded rows
+    settings.DATABASE_REPLICAS = []
+    # Budgets guard the queries behind a response, not the cached copy of it
+    settings.CATALOG_CACHE_TTL = 0
+    settings.PRODUCT_CACHE_SECONDS = 0
+
+    def check(route):
+        from core.urls import api
+
+        url = reverse(
+            f"{api.urls_namespace}:{route.url_name}",
+            kwargs={name: budget_dataset['path_params'][name] for name in route.path_params},
+        )
+        token = budget_dataset['tokens'][route.budget.staff] if route.requires_auth else None
+        client = Client()
+
+        # Warm-up: caches, snapshots and lazily imported code
+        response = _request(client, route, url, token)
+        assert response.status_code < 400, f"{route.method} {url} returned {response.status_code}"
+
+        with CaptureQueriesContext(connection) as queries:
+            _request(client, route, url, token)
+        # Read them now: the next request resets connection.queries
+        captured = queries.captured_queries
+
+        timings = []
+        for _ in range(TIMED_RUNS):
+            start = time.perf_counter()
+            _request(client, route, url, token)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        max_ms = route.budget.max_ms * float(os.getenv('PERF_BUDGET_MS_FACTOR', '1'))
+        assert len(captured) <= route.budget.max_queries, (
+            f"{route.method} {url} ran {len(captured)} queries, budget is {route.budget.max_queries}:\n"
+            + "\n".join(query['sql'] for query in captured)
+        )
+        assert min(timings) <= max_ms, (
+            f"{route.method} {url} took {min(timings):.1f}ms, budget is {max_ms:.0f}ms"
+        )
+    return check
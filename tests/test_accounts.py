@@ -0,0 +1,101 @@
+# tests/test_accounts.py
+import threading
+import pytest
+from django.db import connection
+from django.test import Client
+from apps.accounts.models import User
+
+
+def register(email, username="racer"):
+    return Client().post(
+        '/api/auth/register',
+        {"email": email, "username": username, "password": "Str0ng!Passw0rd"},
+        content_type='application/json'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_registrations_create_one_user(settings):
+    settings.PASSWORD_HASHING_WORKERS = 0
+    attempts = 6
+    barrier = threading.Barrier(attempts)
+    statuses = []
+
+    def attempt(index):
+        try:
+            barrier.wait()
+            # Different casing: the unique index is on lower(email)
+            email = "racer@example.com" if index % 2 else "Racer@Example.com"
+            statuses.append(register(email, username=f"racer{index}").status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=attempt, args=(i,)) for i in range(attempts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [201] + [400] * (attempts - 1)
+    assert User.objects.filter(email__iexact="racer@example.com").count() == 1
+
+
+@pytest.mark.django_db
+def test_duplicate_registration_is_rejected(settings):
+    settings.PASSWORD_HASHING_WORKERS = 0
+    assert register("dup@example.com").status_code == 201
+
+    response = register("DUP@example.com")
+
+    assert response.status_code == 400
+    assert "Email already registered" in response.json()["detail"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_login_beyond_hashing_queue_gets_503(settings, monkeypatch):
+    from django.contrib.auth import hashers
+    from apps.accounts.hashers import password_pool
+
+    User.objects.create_user(username="busy", email="busy@example.com", password="Str0ng!Passw0rd")
+    settings.PASSWORD_HASHING_WORKERS = 1
+    settings.PASSWORD_HASHING_QUEUE = 0
+    password_pool.shutdown()
+
+    hashing, release = threading.Event(), threading.Event()
+
+    def slow_verify(password, encoded):
+        hashing.set()
+        release.wait(5)
+        return True, False
+
+    monkeypatch.setattr(hashers, 'verify_password', slow_verify)
+
+    def login():
+        return Client().post(
+            '/api/auth/login',
+            {"email": "busy@example.com", "password": "Str0ng!Passw0rd"},
+            content_type='application/json'
+        )
+
+    statuses = []
+
+    def first_login():
+        try:
+            statuses.append(login().status_code)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=first_login)
+    thread.start()
+    try:
+        assert hashing.wait(5)
+        # The only hashing slot is taken: refused at once, not queued
+        response = login()
+        assert response.status_code == 503
+        assert response['Retry-After'] == '1'
+    finally:
+        release.set()
+        thread.join()
+        password_pool.shutdown()
+
+    assert statuses == [200]
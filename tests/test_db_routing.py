@@ -0,0 +1,95 @@
+# tests/test_db_routing.py
+import sqlite3
+import pytest
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+from apps.accounts.models import User
+from apps.accounts.services import AuthService
+from apps.products.models import Category, Product
+from utils.db_routing import STICKY_COOKIE, ReplicaRoutingMiddleware, replica_health
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def replicate(settings, tmp_path):
+    """
+    A second SQLite alias as the only replica; calling the fixture copies
+    the primary into it, which then lags until the next call
+    """
+    alias, path = 'replica1', str(tmp_path / 'replica.sqlite3')
+    primary = connections['default']
+    # Registered as a dynamically created connection rather than through
+    # settings.DATABASES, which the test case only allows for its databases
+    connections[alias] = primary.__class__({**primary.settings_dict, 'NAME': path}, alias)
+    settings.DATABASE_REPLICAS = [alias]
+
+    def copy():
+        connections[alias].close()
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    yield copy
+    connections[alias].close()
+    del connections[alias]
+    replica_health._down_until.clear()
+
+
+@pytest.fixture
+def lamp(replicate):
+    category = Category.objects.create(name="Lighting", slug="lighting")
+    product = Product.objects.create(name="Lamp", slug="lamp", description="", price=20, category=category)
+    replicate()
+    # The primary moves on before the replica catches up
+    Product.objects.filter(id=product.id).update(name="Desk lamp")
+    return product
+
+
+def product_name(request):
+    return HttpResponse(Product.objects.get(slug="lamp").name)
+
+
+middleware = ReplicaRoutingMiddleware(product_name)
+factory = RequestFactory()
+
+
+def test_safe_requests_read_from_the_replica(lamp):
+    assert middleware(factory.get('/')).content == b"Lamp"
+    assert middleware(factory.head('/')).content == b"Lamp"
+    # Writes and the reads around them go to the primary
+    assert middleware(factory.post('/')).content == b"Desk lamp"
+    # Outside a request everything reads from the primary
+    assert Product.objects.get(id=lamp.id).name == "Desk lamp"
+
+
+def test_browser_reads_its_own_writes(lamp):
+    response = middleware(factory.post('/'))
+    cookie = response.cookies[STICKY_COOKIE].value
+
+    request = factory.get('/')
+    request.COOKIES[STICKY_COOKIE] = cookie
+    assert middleware(request).content == b"Desk lamp"
+    # Other clients still read from the replica
+    assert middleware(factory.get('/')).content == b"Lamp"
+
+
+def test_token_client_reads_its_own_writes(lamp):
+    writer = User.objects.create_user(username="writer", email="writer@example.com")
+    reader = User.objects.create_user(username="reader", email="reader@example.com")
+    writer_auth = f"Bearer {AuthService.create_token(writer.id)}"
+    reader_auth = f"Bearer {AuthService.create_token(reader.id)}"
+
+    middleware(factory.post('/', HTTP_AUTHORIZATION=writer_auth))
+
+    assert middleware(factory.get('/', HTTP_AUTHORIZATION=writer_auth)).content == b"Desk lamp"
+    assert middleware(factory.get('/', HTTP_AUTHORIZATION=reader_auth)).content == b"Lamp"
+
+
+def test_failed_write_does_not_stick_to_the_primary(lamp):
+    failing = ReplicaRoutingMiddleware(lambda request: HttpResponse(status=400))
+    assert STICKY_COOKIE not in failing(factory.post('/')).cookies
@@ -0,0 +1,85 @@
+# tests/test_inventory.py
+from io import StringIO
+import pytest
+from django.core.management import call_command
+from apps.products.inventory import StockService
+from apps.products.models import Category, Product, StockMovement, StockSnapshot
+from utils.constants import StockReason
+
+
+@pytest.fixture
+def products(db):
+    category = Category.objects.create(name="Hardware", slug="hardware")
+    return [
+        Product.objects.create(name=name, slug=name.lower(), description="", price=5, category=category)
+        for name in ("Bolt", "Nut")
+    ]
+
+
+def ledger_total(product, until=None):
+    movements = StockMovement.objects.filter(product=product)
+    if until is not None:
+        movements = movements.filter(created_at__lte=until)
+    return sum(movements.values_list('delta', flat=True))
+
+
+def test_stock_at_adds_the_movements_after_a_snapshot(clock, products):
+    bolt, nut = products
+    StockService.set_levels({bolt.id: 50, nut.id: 10})
+    times = [clock.now()]
+    clock.advance(minutes=5)
+    StockService.apply({bolt.id: -8}, StockReason.RESERVATION)
+    times.append(clock.now())
+    clock.advance(minutes=2)
+    assert StockService.take_snapshots() == 2
+
+    clock.advance(minutes=5)
+    StockService.apply({bolt.id: -4, nut.id: 3}, StockReason.RESERVATION)
+    times.append(clock.now())
+    clock.advance(minutes=5)
+    StockService.apply({bolt.id: 20}, StockReason.IMPORT)
+    times.append(clock.now())
+
+    # Before the snapshot, and after it with one or two movements on top
+    for when in times:
+        for product in products:
+            assert StockService.stock_at(product.id, when) == ledger_total(product, when)
+    assert StockService.stock_at(bolt.id, times[-1]) == 58 == Product.objects.get(id=bolt.id).stock
+    assert StockSnapshot.objects.filter(product=bolt).count() == 1
+
+
+def test_snapshots_wait_for_movements_to_settle(clock, products):
+    bolt, _ = products
+    StockService.set_levels({bolt.id: 5})
+
+    clock.advance(seconds=StockService.SNAPSHOT_SETTLE_SECONDS - 1)
+    assert StockService.take_snapshots() == 0
+    assert not StockSnapshot.objects.exists()
+
+    clock.advance(seconds=2)
+    assert StockService.take_snapshots() == 1
+    # Nothing new since: nothing more to snapshot
+    clock.advance(minutes=5)
+    assert StockService.take_snapshots() == 0
+
+    StockService.apply({bolt.id: 2}, StockReason.ADJUSTMENT)
+    clock.advance(seconds=30)
+    assert StockService.take_snapshots() == 0
+    clock.advance(seconds=31)
+    assert StockService.take_snapshots() == 1
+    latest = StockSnapshot.objects.order_by('-movement_id').first()
+    assert (latest.stock, latest.movement_id) == (7, StockMovement.objects.order_by('-id').first().id)
+
+
+def test_verify_reports_stock_changed_behind_the_ledger(products):
+    bolt, nut = products
+    StockService.set_levels({bolt.id: 12, nut.id: 4})
+    assert StockService.verify() == []
+
+    # An update that bypasses StockService
+    Product.objects.filter(id=bolt.id).update(stock=15)
+    assert StockService.verify(chunk_size=1) == [(bolt.id, 15, 12)]
+
+    call_command('verify_stock', '--fix', stdout=StringIO())
+    assert StockService.verify() == []
+    assert Product.objects.get(id=bolt.id).stock == 12
@@ -0,0 +1,43 @@
+# tests/test_metrics.py
+import os
+import threading
+import pytest
+from django.db import connection
+from utils.metrics import connection_stats, render_prometheus
+
+
+@pytest.mark.django_db(transaction=True)
+def test_open_connections_counts_every_thread():
+    connection.ensure_connection()
+    before = connection_stats.open_connections()['default']
+    connected, release = threading.Event(), threading.Event()
+
+    def hold_connection():
+        from django.db import connection
+        connection.ensure_connection()
+        connected.set()
+        release.wait(5)
+        connection.close()
+
+    thread = threading.Thread(target=hold_connection)
+    thread.start()
+    try:
+        assert connected.wait(5)
+        assert connection_stats.open_connections()['default'] == before + 1
+    finally:
+        release.set()
+        thread.join()
+    assert connection_stats.open_connections()['default'] == before
+
+
+def test_pool_stats_are_summed_over_workers():
+    # Two live workers, each with two connections checked out of its pool
+    snapshot = {
+        'pid': os.getpid(), 'routes': {}, 'cache': {}, 'connections': {'default': 2},
+        'pools': {'default': {'pool_size': 3, 'pool_available': 1, 'pool_max': 4, 'requests_waiting': 0}},
+    }
+    snapshots = [snapshot, snapshot]
+    text = render_prometheus(snapshots)
+    assert 'db_connections_open{alias="default"} 4' in text
+    assert 'db_pool_size{alias="default"} 6' in text
+    assert 'db_pool_available{alias="default"} 2' in text
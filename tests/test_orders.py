@@ -0,0 +1,168 @@
+# tests/test_orders.py
+from datetime import date
+from decimal import Decimal
+import pytest
+from apps.accounts.models import User
+from apps.orders.models import (
+    DailyCategorySales, DailyProductSales, DailySales, Order, OrderItem, RollupWatermark, StockHold
+)
+from apps.orders.services import HoldService, SalesRollupService
+from apps.products.inventory import StockService
+from apps.products.models import Category, Product
+from utils.constants import OrderStatus
+
+
+@pytest.fixture
+def product(db):
+    category = Category.objects.create(name="Tools", slug="tools")
+    product = Product.objects.create(name="Hammer", slug="hammer", description="", price=10, category=category)
+    StockService.set_levels({product.id: 10})
+    return product
+
+
+def place_order(product, quantity):
+    user, _ = User.objects.get_or_create(username="buyer", email="buyer@example.com")
+    order = Order.objects.create(user=user, status=OrderStatus.PENDING.value, total_amount=10 * quantity)
+    OrderItem.objects.create(
+        order=order, product=product, product_name=product.name, quantity=quantity, unit_price=10
+    )
+    HoldService.place(order.id)
+    return order
+
+
+def stock(product):
+    return Product.objects.values_list('stock', flat=True).get(id=product.id)
+
+
+def test_unpaid_hold_is_released_only_after_it_expires(clock, product, settings):
+    settings.ORDER_HOLD_SECONDS = 900
+    order = place_order(product, 3)
+    assert stock(product) == 7
+
+    clock.advance(seconds=899)
+    assert HoldService.release_expired() == 0
+    assert stock(product) == 7
+
+    clock.advance(seconds=1)
+    assert HoldService.release_expired() == 1
+    assert stock(product) == 10
+    order.refresh_from_db()
+    assert order.status == OrderStatus.CANCELLED.value
+    assert not StockHold.objects.exists()
+    # Paying after the hold lapsed must not succeed
+    assert HoldService.confirm(order.id) is False
+    assert StockService.verify() == []
+
+
+def test_paid_hold_is_never_released(clock, product, settings):
+    settings.ORDER_HOLD_SECONDS = 60
+    paid = place_order(product, 2)
+    unpaid = place_order(product, 4)
+
+    clock.advance(seconds=30)
+    assert HoldService.confirm(paid.id) is True
+
+    clock.advance(hours=1)
+    assert HoldService.release_expired(batch_size=1) == 1
+    assert stock(product) == 8
+    paid.refresh_from_db()
+    unpaid.refresh_from_db()
+    assert paid.status == OrderStatus.PENDING.value
+    assert unpaid.status == OrderStatus.CANCELLED.value
+
+
+def test_expired_hold_of_an_order_no_longer_pending_keeps_its_stock(clock, product, settings):
+    settings.ORDER_HOLD_SECONDS = 60
+    order = place_order(product, 3)
+    Order.objects.filter(id=order.id).update(status=OrderStatus.PROCESSING.value)
+
+    clock.advance(minutes=5)
+    assert HoldService.release_expired() == 1
+    assert stock(product) == 7
+    order.refresh_from_db()
+    assert order.status == OrderStatus.PROCESSING.value
+    assert not StockHold.objects.exists()
+
+
+def test_hold_is_refused_when_stock_is_short(clock, product):
+    place_order(product, 8)
+
+    with pytest.raises(ValueError, match="Not enough stock"):
+        place_order(product, 3)
+    assert stock(product) == 2
+    assert StockHold.objects.count() == 1
+
+
+def test_only_pending_orders_can_hold_stock(clock, product):
+    order = place_order(product, 1)
+    with pytest.raises(ValueError, match="already holds"):
+        HoldService.place(order.id)
+
+    Order.objects.filter(id=order.id).update(status=OrderStatus.SHIPPED.value)
+    StockHold.objects.all().delete()
+    with pytest.raises(ValueError, match="pending"):
+        HoldService.place(order.id)
+    assert stock(product) == 9
+
+
+def rollup_rows():
+    return (
+        list(DailySales.objects.order_by('day').values_list('day', 'orders', 'units', 'revenue')),
+        list(DailyProductSales.objects.order_by('day', 'product_id')
+             .values_list('day', 'product_id', 'orders', 'units', 'revenue')),
+        list(DailyCategorySales.objects.order_by('day', 'category_id')
+             .values_list('day', 'category_id', 'orders', 'units', 'revenue')),
+    )
+
+
+@pytest.fixture
+def sales(clock, product):
+    """Two orders on the first day, one on the second; the clock ends on the third"""
+    user = User.objects.create(username="regular", email="regular@example.com")
+    orders = []
+    for quantity, days_later in ((1, 0), (2, 0), (4, 1)):
+        clock.current = clock.current.replace(day=1 + days_later, hour=10 + quantity)
+        order = Order.objects.create(user=user, status=OrderStatus.PROCESSING.value)
+        OrderItem.objects.create(order=order, product=product, product_name=product.name, quantity=quantity,
+                                 unit_price=10)
+        orders.append(order)
+    clock.current = clock.current.replace(day=3, hour=1)
+    assert SalesRollupService.update_incremental() == 2
+    return orders
+
+
+def test_rerunning_the_rollup_gives_the_same_rows(clock, sales):
+    rows = rollup_rows()
+    assert rows[0] == [(date(2026, 1, 1), 2, 3, Decimal('30.00')), (date(2026, 1, 2), 1, 4, Decimal('40.00'))]
+
+    clock.advance(hours=1)
+    # Nothing changed since the watermark: nothing rebuilt
+    assert SalesRollupService.update_incremental() == 0
+    assert rollup_rows() == rows
+    # Rebuilding every day again, as a first run does, changes nothing either
+    RollupWatermark.objects.all().delete()
+    assert SalesRollupService.update_incremental() == 2
+    assert rollup_rows() == rows
+
+
+def test_cancelled_order_leaves_its_day(clock, sales):
+    clock.advance(hours=1)
+    cancelled = sales[1]
+    cancelled.status = OrderStatus.CANCELLED.value
+    cancelled.save()
+
+    clock.advance(hours=1)
+    assert SalesRollupService.update_incremental() == 1
+    days, products, categories = rollup_rows()
+    assert days == [(date(2026, 1, 1), 1, 1, Decimal('10.00')), (date(2026, 1, 2), 1, 4, Decimal('40.00'))]
+    assert products[0][2:] == (1, 1, Decimal('10.00'))
+    assert categories[0][2:] == (1, 1, Decimal('10.00'))
+
+
+def test_backfill_matches_the_incremental_rollup(clock, sales):
+    incremental = rollup_rows()
+    for model in (DailySales, DailyProductSales, DailyCategorySales):
+        model.objects.all().delete()
+
+    assert SalesRollupService.backfill(date(2025, 12, 30), date(2026, 1, 3), workers=1, chunk_days=2) == 2
+    assert rollup_rows() == incremental
@@ -0,0 +1,5 @@
+# tests/test_perf_budgets.py
+
+
+def test_route_within_budget(budgeted_route, check_budget):
+    check_budget(budgeted_route)
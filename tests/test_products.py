@@ -0,0 +1,360 @@
+# tests/test_products.py
+import json
+import threading
+import time
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from apps.products.models import Category, Product
+from apps.products.schemas import CategorySchema, ProductSchema
+from apps.products.services import ProductService
+from utils.singleflight import single_flight
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cold_catalog_key_is_computed_once(settings, monkeypatch):
+    settings.CATALOG_CACHE_TTL = 30
+    category = Category.objects.create(name="Tools", slug="tools")
+    Product.objects.create(name="Hammer", slug="hammer", description="", price=10, category=category, stock=5)
+
+    calls = []
+    get_active_products = ProductService.get_active_products
+
+    def counting_get_active_products():
+        calls.append(1)
+        # Keep the computation in flight while the other threads arrive
+        time.sleep(0.2)
+        return get_active_products()
+
+    monkeypatch.setattr(ProductService, 'get_active_products', staticmethod(counting_get_active_products))
+
+    callers = 12
+    barrier = threading.Barrier(callers)
+    bodies = []
+
+    def fetch():
+        try:
+            barrier.wait()
+            response = Client().get('/api/products/products', {'sort': 'newest'})
+            assert response.status_code == 200
+            bodies.append(response.content)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=fetch) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(bodies) == callers and len(set(bodies)) == 1
+    assert b'"Hammer"' in bodies[0]
+
+
+def test_expired_entry_is_served_stale_while_refreshing(settings):
+    settings.CACHE_EARLY_EXPIRY_BETA = 0
+    single_flight.get_or_compute('test:stale', lambda: 'old', ttl=0, stale_ttl=60)
+
+    refreshing = threading.Event()
+    release = threading.Event()
+
+    def slow_compute():
+        refreshing.set()
+        release.wait(5)
+        return 'new'
+
+    results = []
+    refresher = threading.Thread(
+        target=lambda: results.append(single_flight.get_or_compute('test:stale', slow_compute, ttl=60, stale_ttl=60))
+    )
+    refresher.start()
+    assert refreshing.wait(5)
+
+    # Meanwhile other callers neither wait nor recompute
+    assert single_flight.get_or_compute('test:stale', lambda: pytest.fail("recomputed"), ttl=60) == 'old'
+
+    release.set()
+    refresher.join()
+    assert results == ['new']
+    assert single_flight.get_or_compute('test:stale', lambda: pytest.fail("recomputed"), ttl=60) == 'new'
+
+
+@pytest.mark.django_db
+def test_image_changes_move_the_feed_last_modified(monkeypatch):
+    from datetime import timedelta
+    from django.utils import timezone
+    from apps.products.models import ProductImage
+
+    category = Category.objects.create(name="Garden", slug="garden")
+    product = Product.objects.create(name="Rake", slug="rake", description="", price=10, category=category)
+    before = ProductService.feed_last_modified()
+
+    later = timezone.now() + timedelta(minutes=5)
+    monkeypatch.setattr(timezone, 'now', lambda: later)
+    ProductImage.objects.create(product=product, image="products/rake.jpg", is_primary=True)
+
+    assert ProductService.feed_last_modified() == later > before
+
+
+@pytest.mark.django_db
+def test_image_changes_reach_the_change_feed(monkeypatch):
+    from datetime import timedelta
+    from django.utils import timezone
+    from apps.products.models import ProductImage
+    from apps.products.services import ChangeFeedService
+
+    category = Category.objects.create(name="Kitchen", slug="kitchen")
+    product = Product.objects.create(name="Whisk", slug="whisk", description="", price=4, category=category)
+    start = timezone.now()
+
+    def at(minutes):
+        monkeypatch.setattr(timezone, 'now', lambda: start + timedelta(minutes=minutes))
+
+    at(1)
+    token = ChangeFeedService.get_changes()['next_token']
+    assert ChangeFeedService.get_changes(token)['products'] == []
+
+    at(2)
+    image = ProductImage.objects.create(product=product, image="products/whisk.jpg", is_primary=True)
+    at(3)
+    changes = ChangeFeedService.get_changes(token)
+    assert [row['id'] for row in changes['products']] == [product.id]
+    assert len(changes['products'][0]['images']) == 1
+    token = changes['next_token']
+
+    at(4)
+    image.delete()
+    at(5)
+    changes = ChangeFeedService.get_changes(token)
+    assert [row['id'] for row in changes['products']] == [product.id]
+    assert changes['products'][0]['images'] == []
+
+
+@pytest.mark.django_db
+def test_suggestions_index_only_the_best_sellers(settings):
+    from apps.accounts.models import User
+    from apps.orders.models import Order, OrderItem
+    from apps.products.services import CatalogService, CatalogSuggestions
+
+    settings.SUGGEST_MAX_PRODUCTS = 2
+    category = Category.objects.create(name="Garden", slug="garden")
+    user = User.objects.create(username="buyer", email="buyer@example.com")
+    order = Order.objects.create(user=user, total_amount=0)
+    for name, sold in (("Spade", 0), ("Shears", 5), ("Sprinkler", 2)):
+        product = Product.objects.create(name=name, slug=name.lower(), description="", price=1, category=category)
+        if sold:
+            OrderItem.objects.create(order=order, product=product, product_name=name, quantity=sold, unit_price=1)
+
+    suggestions = CatalogSuggestions()
+    suggestions.ensure_current()
+    assert [name for _, name in suggestions.products.search("s")] == ["Shears", "Sprinkler"]
+
+    # A refresh only adds products while there is room
+    Product.objects.create(name="Sieve", slug="sieve", description="", price=1, category=category)
+    CatalogService.bump_version()
+    suggestions.ensure_current()
+    assert len(suggestions.products) == 2
+    assert [name for _, name in suggestions.products.search("sie", typos=False)] == []
+
+
+@pytest.mark.django_db
+def test_discount_sort_keeps_an_explicit_on_sale_filter():
+    category = Category.objects.create(name="Paint", slug="paint")
+    for name, price, sale_price in (("Primer", 10, 6), ("Gloss", 10, 9), ("Matte", 10, None)):
+        Product.objects.create(name=name, slug=name.lower(), description="", price=price, sale_price=sale_price,
+                               category=category)
+
+    def names(**filters):
+        return list(ProductService.filter_products(Product.objects.all(), **filters).values_list('name', flat=True))
+
+    assert names(sort='discount') == ["Primer", "Gloss"]
+    assert names(sort='discount', on_sale=True) == ["Primer", "Gloss"]
+    assert names(sort='discount', on_sale=False) == ["Matte"]
+
+
+@pytest.mark.django_db
+def test_add_views_adds_to_existing_hours():
+    from apps.products.models import ProductStats
+    from apps.products.services import TrendingService
+
+    category = Category.objects.create(name="Books", slug="books")
+    product = Product.objects.create(name="Atlas", slug="atlas", description="", price=30, category=category)
+    hour = 493_000
+
+    TrendingService.add_views({(product.id, hour): 3})
+    TrendingService.add_views({(product.id, hour): 4, (product.id, hour + 1): 1})
+
+    assert [
+        (int(row.hour.timestamp()) // 3600, row.views) for row in ProductStats.objects.order_by('hour')
+    ] == [(hour, 7), (hour + 1, 1)]
+
+
+@pytest.mark.django_db
+def test_trending_sort_follows_decayed_views(settings):
+    from datetime import datetime, timezone as dt_timezone
+    from apps.products.services import TrendingService
+
+    settings.TRENDING_HALF_LIFE_HOURS = 24
+    category = Category.objects.create(name="Toys", slug="toys")
+    kite, yoyo, ball, top = (
+        Product.objects.create(name=name, slug=name.lower(), description="", price=3, category=category)
+        for name in ("Kite", "Yoyo", "Ball", "Top")
+    )
+    now = datetime(2026, 3, 1, 12, 30, tzinfo=dt_timezone.utc)
+    hour = int(now.timestamp()) // 3600
+    TrendingService.add_views({
+        (kite.id, hour): 10,
+        # Two half-lives ago: worth a quarter
+        (yoyo.id, hour - 48): 32,
+        (ball.id, hour - 1): 1,
+        # Outside the window
+        (top.id, hour - settings.TRENDING_WINDOW_HOURS): 1000,
+    })
+
+    assert TrendingService.update_trending(now) == 3
+    scores = dict(Product.objects.values_list('name', 'trending_score'))
+    assert scores['Kite'] == pytest.approx(10)
+    assert scores['Yoyo'] == pytest.approx(8)
+    assert scores['Top'] == 0
+    ordered = ProductService.filter_products(Product.objects.all(), sort='trending')
+    assert [product.name for product in ordered] == ["Kite", "Yoyo", "Ball", "Top"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('with_orjson', [True, False])
+def test_trusted_output_renders_the_same_bytes(settings, monkeypatch, with_orjson):
+    from apps.products.models import ProductImage
+    from utils import renderers
+
+    if not with_orjson:
+        monkeypatch.setattr(renderers, 'orjson', None)
+    settings.CATALOG_CACHE_TTL = 0
+    garden = Category.objects.create(name="Garden", slug="garden", description="Outdoor things")
+    Category.objects.create(name="Empty", slug="empty")
+    hose = Product.objects.create(name="Hose", slug="hose", description="25 m", price="19.99", sale_price="14.95",
+                                  category=garden, is_featured=True)
+    Product.objects.create(name="Shovel", slug="shovel", description="", price="12.10", category=garden)
+    ProductImage.objects.create(product=hose, image="products/hose.jpg", is_primary=True)
+    ProductImage.objects.create(product=hose, image="products/hose-2.jpg")
+
+    responses = {}
+    for trusted in (False, True):
+        settings.TRUSTED_OUTPUT = trusted
+        cache.clear()
+        responses[trusted] = [
+            Client().get('/api/products/products', {'sort': sort}).content for sort in ('newest', 'price_asc')
+        ] + [Client().get('/api/products/categories').content]
+
+    assert responses[True] == responses[False]
+    product = json.loads(responses[True][0])['items'][-1]
+    # Datetimes at millisecond precision, decimals as numbers
+    assert product['created_at'] == hose.created_at.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    assert (product['price'], product['sale_price'], len(product['images'])) == (19.99, 14.95, 2)
+
+
+@pytest.fixture
+def shelf(db):
+    category = Category.objects.create(name="Shelf", slug="shelf")
+    products = [
+        Product.objects.create(name=name, slug=name.lower(), description="", price=2, category=category)
+        for name in ("Jar", "Tin", "Box", "Bag")
+    ]
+    Product.objects.filter(id=products[3].id).update(is_active=False)
+    return products
+
+
+def test_batch_follows_the_requested_order(shelf):
+    jar, tin, box, _ = shelf
+    batch = ProductService.get_batch([box.id, jar.id, tin.id, jar.id])
+    assert [product['id'] for product in batch['products']] == [box.id, jar.id, tin.id]
+    assert batch['missing'] == []
+
+    batch = ProductService.get_batch(["tin", "box"], field='slug')
+    assert [product['slug'] for product in batch['products']] == ["tin", "box"]
+
+
+def test_batch_reports_missing_and_inactive_products(shelf):
+    jar, _, box, bag = shelf
+    batch = ProductService.get_batch([bag.id, jar.id, 999_999, box.id])
+    assert [product['id'] for product in batch['products']] == [jar.id, box.id]
+    assert batch['missing'] == [bag.id, 999_999]
+
+
+def test_batch_only_queries_the_products_missing_from_the_cache(shelf, settings):
+    from django.test.utils import CaptureQueriesContext
+
+    settings.PRODUCT_CACHE_SECONDS = 3600
+    jar, tin, box, _ = shelf
+    ProductService.get_batch([jar.id, tin.id])
+
+    with CaptureQueriesContext(connection) as queries:
+        batch = ProductService.get_batch([tin.id, box.id, jar.id])
+    assert [product['id'] for product in batch['products']] == [tin.id, box.id, jar.id]
+    product_queries = [query['sql'] for query in queries if 'FROM "products_product"' in query['sql']]
+    assert len(product_queries) == 1
+    assert f"IN ({box.id})" in product_queries[0]
+
+    with CaptureQueriesContext(connection) as queries:
+        ProductService.get_batch([tin.id, box.id, jar.id])
+    assert len(queries) == 0
+
+
+def test_batch_beyond_the_limit_is_rejected(shelf):
+    ids = ','.join(str(n) for n in range(1, ProductService.BATCH_LIMIT + 2))
+    response = Client().get('/api/products/products/batch', {'ids': ids})
+    assert response.status_code == 400
+    assert response.json()['detail'] == f"At most {ProductService.BATCH_LIMIT} products per request"
+
+    slugs = ','.join(f"slug-{n}" for n in range(ProductService.BATCH_LIMIT + 1))
+    assert Client().get('/api/products/products/batch/by-slug', {'slugs': slugs}).status_code == 400
+    assert Client().get('/api/products/products/batch', {'ids': '1,2'}).status_code == 200
+
+
+@pytest.mark.parametrize('trusted', [False, True])
+def test_fields_trim_list_and_detail_responses(shelf, settings, trusted):
+    settings.TRUSTED_OUTPUT = trusted
+    jar = shelf[0]
+    category = jar.category
+
+    response = Client().get('/api/products/products', {'fields': 'name,id'})
+    assert sorted(response.json()['items'], key=lambda item: item['id']) == [
+        {'name': product.name, 'id': product.id} for product in shelf[:3]
+    ]
+    response = Client().get(f'/api/products/products/{jar.id}', {'fields': 'slug,price'})
+    assert response.json() == {'slug': "jar", 'price': 2.0}
+
+    response = Client().get('/api/products/categories', {'fields': 'slug'})
+    assert response.json() == [{'slug': "shelf"}]
+    response = Client().get(f'/api/products/categories/{category.id}', {'fields': 'id,name'})
+    assert response.json() == {'id': category.id, 'name': "Shelf"}
+
+
+def test_unknown_fields_are_rejected(shelf):
+    jar = shelf[0]
+    for path in ('/api/products/products', f'/api/products/products/{jar.id}',
+                 '/api/products/categories', f'/api/products/categories/{jar.category_id}'):
+        response = Client().get(path, {'fields': 'id,colour'})
+        assert response.status_code == 400
+        assert response.json() == {'detail': "Unknown fields: colour"}
+
+
+def test_trimmed_responses_are_cached_apart(shelf, settings):
+    settings.CATALOG_CACHE_TTL = 30
+    client = Client()
+    assert client.get('/api/products/products', {'fields': 'id'}).json()['items'][0].keys() == {'id'}
+    assert client.get('/api/products/categories', {'fields': 'name'}).json() == [{'name': "Shelf"}]
+
+    product = client.get('/api/products/products').json()['items'][0]
+    assert product.keys() == ProductSchema.model_fields.keys()
+    assert client.get('/api/products/categories').json()[0].keys() == CategorySchema.model_fields.keys()
+    # And the other way round
+    assert client.get('/api/products/products', {'fields': 'id'}).json()['items'][0].keys() == {'id'}
@@ -0,0 +1,90 @@
+# tests/test_promotions.py
+from decimal import Decimal
+import pytest
+from django.test import Client
+from apps.accounts.models import User
+from apps.accounts.services import AuthService
+from apps.promotions.engine import BUY_X_GET_Y, FIXED, PERCENTAGE, PromotionIndex, Rule
+
+
+@pytest.fixture
+def staff_client(db):
+    staff = User.objects.create_user(username="promo-admin", email="promo-admin@example.com", is_staff=True)
+    return Client(HTTP_AUTHORIZATION=f"Bearer {AuthService.create_token(staff.id)}")
+
+
+def create_promotion(client, **fields):
+    return client.post('/api/promotions/', {"name": "Deal", "kind": "fixed", "value": 5, **fields},
+                       content_type='application/json')
+
+
+def test_duplicate_coupon_code_is_rejected(staff_client):
+    assert create_promotion(staff_client, code="spring").status_code == 200
+
+    response = create_promotion(staff_client, code="SPRING ")
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Coupon code already exists"
+
+
+def test_buy_x_get_y_without_products_or_categories_is_rejected(staff_client):
+    response = create_promotion(staff_client, kind="buy_x_get_y", buy_quantity=2, get_quantity=1)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Buy X get Y needs products or categories"
+
+
+def line(product_id, category_id, price, quantity=1):
+    return (product_id, category_id, Decimal(price), quantity)
+
+
+def test_line_takes_the_best_rule_its_subtotal_qualifies_for():
+    index = PromotionIndex([
+        Rule(1, "10% off", PERCENTAGE, 10, product_ids=[1]),
+        Rule(2, "3 off", FIXED, 3, product_ids=[1]),
+        Rule(3, "25% off over 100", PERCENTAGE, 25, min_spend=100, category_ids=[7]),
+    ], category_parents={7: None, 8: 7})
+
+    # 10% of 20 is 2, so the fixed 3 wins; the 25% needs a bigger cart
+    small = index.price([line(1, 8, '20.00')])
+    assert small['lines'][0]['discount'] == Decimal('3.00')
+    assert small['lines'][0]['promotion_id'] == 2
+
+    # Over 100 the category rule applies, subcategory 8 included
+    large = index.price([line(1, 8, '20.00', 6)])
+    assert large['lines'][0]['promotion_id'] == 3
+    assert large['lines'][0]['discount'] == Decimal('30.00')
+
+
+def test_buy_x_get_y_makes_the_cheapest_units_free():
+    index = PromotionIndex([Rule(1, "Buy 2 get 1", BUY_X_GET_Y, 0, buy=2, get=1, product_ids=[1, 2, 3])])
+
+    quote = index.price([line(1, 5, '30.00'), line(2, 5, '10.00', 2), line(3, 5, '50.00', 3)])
+
+    # 6 units make two groups: the two cheapest units are free
+    assert [entry['discount'] for entry in quote['lines']] == [Decimal('0'), Decimal('20.00'), Decimal('0')]
+    assert quote['total'] == Decimal('180.00')
+
+
+def test_coupon_needs_its_minimum_spend():
+    index = PromotionIndex([Rule(1, "Welcome", FIXED, 15, code="WELCOME", min_spend=50)])
+
+    assert index.price([line(1, 5, '40.00')], ["welcome"])['discount'] == 0
+    quote = index.price([line(1, 5, '40.00', 2)], ["welcome"])
+    assert quote['discount'] == Decimal('15.00')
+    assert quote['promotions'][0]['code'] == "WELCOME"
+    assert index.price([line(1, 5, '40.00')], ["nope"])['invalid_coupons'] == ["nope"]
+
+
+def test_cart_rule_applies_to_what_line_discounts_leave():
+    index = PromotionIndex([
+        Rule(1, "Half off", PERCENTAGE, 50, product_ids=[1]),
+        Rule(2, "10% over 100", PERCENTAGE, 10, min_spend=100),
+    ])
+
+    quote = index.price([line(1, 5, '100.00'), line(2, 5, '60.00')])
+
+    # The cart rule qualifies on the 160 subtotal and takes 10% of 50 + 60
+    assert quote['subtotal'] == Decimal('160.00')
+    assert quote['discount'] == Decimal('50.00') + Decimal('11.00')
+    assert quote['total'] == Decimal('99.00')
@@ -0,0 +1,93 @@
+# tests/test_ratelimit.py
+from types import SimpleNamespace
+import pytest
+from django.test import Client
+from utils import ratelimit
+from utils.ratelimit import LocalRateLimitStore, sliding_window_hit
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """The rate limiter's clock, settable through now.value"""
+    clock = SimpleNamespace(value=1_000_000.0)
+    monkeypatch.setattr(ratelimit, 'time', SimpleNamespace(time=lambda: clock.value))
+    return clock
+
+
+@pytest.fixture
+def hashes(settings, monkeypatch):
+    """Count password checks instead of running them"""
+    from django.contrib.auth import hashers
+    settings.PASSWORD_HASHING_WORKERS = 0
+    calls = []
+
+    def verify_password(password, encoded):
+        calls.append(password)
+        return False, False
+
+    monkeypatch.setattr(hashers, 'verify_password', verify_password)
+    return calls
+
+
+def login(email, ip='10.0.0.1'):
+    return Client(REMOTE_ADDR=ip).post(
+        '/api/auth/login', {"email": email, "password": "Wr0ng!Passw0rd"}, content_type='application/json'
+    )
+
+
+@pytest.mark.django_db
+def test_ip_over_its_limit_gets_429_before_any_hashing(now, hashes):
+    # login allows 20 attempts a minute per IP
+    for n in range(20):
+        assert login(f"user{n}@example.com").status_code == 401
+
+    response = login("another@example.com")
+    assert response.status_code == 429
+    assert int(response['Retry-After']) > 0
+    assert len(hashes) == 20
+    # Other addresses are not affected
+    assert login("another@example.com", ip='10.0.0.2').status_code == 401
+
+
+@pytest.mark.django_db
+def test_account_over_its_limit_gets_429_from_any_ip(now, hashes):
+    # and 10 per account every 15 minutes
+    for n in range(10):
+        assert login("Target@example.com", ip=f"10.0.1.{n}").status_code == 401
+
+    response = login("target@example.com", ip='10.0.2.1')
+    assert response.status_code == 429
+    assert int(response['Retry-After']) > 0
+    assert len(hashes) == 10
+
+
+@pytest.mark.django_db
+def test_limit_lifts_once_the_window_decays(now, hashes):
+    for n in range(10):
+        login("target@example.com", ip=f"10.0.1.{n}")
+    retry_after = int(login("target@example.com", ip='10.0.2.1')['Retry-After'])
+
+    now.value += retry_after - 1
+    assert login("target@example.com", ip='10.0.2.2').status_code == 429
+    now.value += retry_after
+    assert login("target@example.com", ip='10.0.2.3').status_code == 401
+
+
+def busy_store(previous_hits, now, limit, window):
+    """A store with previous_hits in the last window and this one hit until refused; (store, Retry-After)"""
+    store = LocalRateLimitStore()
+    for _ in range(previous_hits):
+        sliding_window_hit('key', limit, window, store=store, now=now - window)
+    while True:
+        wait = sliding_window_hit('key', limit, window, store=store, now=now)
+        if wait:
+            return store, wait
+
+
+@pytest.mark.parametrize('previous_hits, offset', [(8, 45), (4, 15), (0, 30), (4, 59)])
+def test_retry_after_is_long_enough_for_the_retry(previous_hits, offset):
+    limit, window = 4, 60
+    now = 6000.0 + offset
+
+    store, wait = busy_store(previous_hits, now, limit, window)
+    assert sliding_window_hit('key', limit, window, store=store, now=now + wait) == 0
@@ -0,0 +1,145 @@
+# tests/test_recommendations.py
+import pytest
+from apps.accounts.models import User
+from apps.orders.models import Order, OrderItem
+from apps.orders.services import HoldService
+from apps.products.inventory import StockService
+from apps.products.models import Category, Product, ProductRecommendation
+from utils.constants import OrderStatus
+
+np = pytest.importorskip('numpy')
+
+from apps.products.recommendations import (  # noqa: E402
+    ID_BITS, RecommendationService, count_pairs, merge_counts, top_neighbours
+)
+
+
+def pairs(keys, counts):
+    return {(int(key) >> ID_BITS, int(key) & ((1 << ID_BITS) - 1)): int(count) for key, count in zip(keys, counts)}
+
+
+def test_count_pairs_counts_each_order_once_both_ways():
+    # Order 1: products 1, 2, 3 (2 twice); order 2: 1, 2; order 3: 4, 5, 6
+    order_ids = [1, 1, 1, 1, 2, 2, 3, 3, 3]
+    product_ids = [1, 2, 2, 3, 2, 1, 4, 5, 6]
+
+    keys, counts = count_pairs(order_ids, product_ids, max_basket=3)
+    assert pairs(keys, counts) == {
+        (1, 2): 2, (2, 1): 2, (1, 3): 1, (3, 1): 1, (2, 3): 1, (3, 2): 1,
+        (4, 5): 1, (5, 4): 1, (4, 6): 1, (6, 4): 1, (5, 6): 1, (6, 5): 1,
+    }
+    # Baskets over max_basket are skipped
+    keys, counts = count_pairs(order_ids, product_ids, max_basket=2)
+    assert pairs(keys, counts) == {(1, 2): 1, (2, 1): 1}
+    assert len(count_pairs([], [])[0]) == 0
+
+
+def test_merge_counts_adds_matching_pairs():
+    first = count_pairs([1, 1], [1, 2])
+    second = count_pairs([2, 2, 2], [1, 2, 3])
+    assert pairs(*merge_counts(*first, *second)) == {
+        (1, 2): 2, (2, 1): 2, (1, 3): 1, (3, 1): 1, (2, 3): 1, (3, 2): 1,
+    }
+    assert pairs(*merge_counts(np.empty(0, np.int64), np.empty(0, np.int64), *first)) == pairs(*first)
+
+
+def test_top_neighbours_ranks_by_count_then_id():
+    keys, counts = count_pairs([1, 1, 1, 2, 2, 3, 3], [1, 3, 2, 1, 3, 1, 4])
+    assert top_neighbours(keys, counts, 2) == {
+        1: ([3, 2], [2, 1]), 2: ([1, 3], [1, 1]), 3: ([1, 2], [2, 1]), 4: ([1], [1]),
+    }
+    assert top_neighbours(keys, counts, 1, products={4}) == {4: ([1], [1])}
+
+
+@pytest.fixture
+def catalog(db, settings, tmp_path):
+    settings.RECOMMENDATIONS_STATE_FILE = str(tmp_path / 'cooccurrence.npz')
+    category = Category.objects.create(name="Pantry", slug="pantry")
+    products = [
+        Product.objects.create(name=f"Item {n}", slug=f"item-{n}", description="", price=1, category=category)
+        for n in range(5)
+    ]
+    StockService.set_levels({product.id: 100 for product in products})
+    return products
+
+
+def place_order(products, hold=False):
+    user, _ = User.objects.get_or_create(username="shopper", email="shopper@example.com")
+    order = Order.objects.create(user=user, status=OrderStatus.PENDING.value)
+    for product in products:
+        OrderItem.objects.create(order=order, product=product, product_name=product.name, quantity=1, unit_price=1)
+    if hold:
+        HoldService.place(order.id)
+    return order
+
+
+def related(product):
+    return list(ProductRecommendation.objects.filter(product=product).values_list('related', flat=True).first() or [])
+
+
+def stored():
+    return {
+        row.product_id: (row.related, row.scores)
+        for row in ProductRecommendation.objects.order_by('product_id')
+    }
+
+
+def test_incremental_updates_match_a_full_recount(clock, catalog):
+    a, b, c, d, e = catalog
+    place_order([a, b, c])
+    place_order([a, b])
+    clock.advance(minutes=2)
+    RecommendationService.update()
+
+    place_order([c, d])
+    place_order([a, d, e])
+    clock.advance(minutes=2)
+    # Five lines read; b had no new partner
+    assert RecommendationService.update() == (5, 4)
+    # Nothing new: nothing read, nothing changes
+    incremental = stored()
+    assert RecommendationService.update() == (0, 0)
+    assert stored() == incremental
+
+    RecommendationService.update(full=True)
+    assert stored() == incremental
+    assert related(a) == [b.id, c.id, d.id, e.id]
+
+
+def test_order_waits_while_it_holds_stock(clock, catalog, settings):
+    settings.ORDER_HOLD_SECONDS = 900
+    a, b, c, _, _ = catalog
+    abandoned = place_order([a, b], hold=True)
+    later = place_order([a, c])
+    clock.advance(minutes=2)
+
+    # Neither the held order nor the one after it is counted yet
+    assert RecommendationService.update() == (0, 0)
+    assert related(a) == []
+
+    clock.advance(minutes=15)
+    HoldService.release_expired()
+    abandoned.refresh_from_db()
+    assert abandoned.status == OrderStatus.CANCELLED.value
+    RecommendationService.update()
+    assert related(a) == [c.id]
+    assert RecommendationService.stored_order_id() == later.id
+
+
+def test_counts_out_of_step_with_the_rows_are_recounted(clock, catalog):
+    a, b, c, _, _ = catalog
+    place_order([a, b])
+    clock.advance(minutes=2)
+    RecommendationService.update()
+
+    # As if the last run had stored its rows and then crashed before
+    # putting its counts in place
+    place_order([a, c])
+    clock.advance(minutes=2)
+    path = RecommendationService.state_path()
+    before = path.read_bytes()
+    RecommendationService.update()
+    path.write_bytes(before)
+
+    RecommendationService.update()
+    assert stored()[a.id] == ([b.id, c.id], [1, 1])
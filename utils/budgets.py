@@ -0,0 +1,62 @@
+# utils/budgets.py
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+PATH_PARAM_RE = re.compile(r'{(?:\w+:)?(\w+)}')
+
+
+@dataclass(frozen=True)
+class PerfBudget:
+    max_queries: int
+    max_ms: float
+    query: Dict[str, Any] = field(default_factory=dict)
+    staff: bool = False
+
+
+def perf_budget(max_queries, max_ms, query=None, staff=False):
+    """
+    Declare the performance budget of a Ninja endpoint on the seeded
+    dataset. Goes directly under the ``@router.<method>`` decorator; the
+    view is returned unchanged, the budget is only read by the test suite.
+
+    ``query`` adds query-string parameters to the request made by the
+    budget check, ``staff`` makes it authenticate as an admin.
+    """
+    def decorator(view_func):
+        view_func.perf_budget = PerfBudget(max_queries, max_ms, query or {}, staff)
+        return view_func
+    return decorator
+
+
+@dataclass(frozen=True)
+class BudgetedRoute:
+    method: str
+    path: str
+    url_name: str
+    budget: PerfBudget
+    requires_auth: bool
+    path_params: tuple
+
+
+def iter_budgeted_routes(api):
+    """Every operation of ``api`` that declares a perf budget"""
+    for _prefix, router in api._routers:
+        for path, path_view in router.path_operations.items():
+            for operation in path_view.operations:
+                budget: Optional[PerfBudget] = getattr(operation.view_func, 'perf_budget', None)
+                if budget is None:
+                    continue
+                url_name = getattr(operation, 'url_name', None) or api.get_operation_url_name(
+                    operation, router=router
+                )
+                for method in operation.methods:
+                    yield BudgetedRoute(
+                        method=method,
+                        path=path,
+                        url_name=url_name,
+                        budget=budget,
+                        requires_auth=bool(operation.auth_callbacks),
+                        path_params=tuple(PATH_PARAM_RE.findall(path)),
+                    )
@@ -12,4 +12,16 @@ class PaymentStatus(Enum):
     PENDING = 'pending'
     COMPLETED = 'completed'
     FAILED = 'failed'
-    REFUNDED = 'refunded'
\ No newline at end of file
+    REFUNDED = 'refunded'
+
+class StockReason(Enum):
+    ADJUSTMENT = 'adjustment'
+    IMPORT = 'import'
+    RESERVATION = 'reservation'
+    CANCELLATION = 'cancellation'
+    RETURN = 'return'
+
+class PromotionKind(Enum):
+    PERCENTAGE = 'percentage'
+    FIXED = 'fixed'
+    BUY_X_GET_Y = 'buy_x_get_y'
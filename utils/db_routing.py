@@ -0,0 +1,187 @@
+# utils/db_routing.py
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from itertools import count
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'db_primary_until'
+
+# Alias reads go to while handling the current request; None means primary
+_read_alias = ContextVar('db_read_alias', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """
+    Send reads to the replica chosen for the current request, everything
+    else to the primary. Outside a request (commands, signals, tests) all
+    queries go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaHealth:
+    """Round-robin over replicas, skipping the ones that recently failed"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._counter = count()
+
+    def mark_down(self, alias, error):
+        logger.error(f"Replica {alias} unavailable, reading from primary: {error}")
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+
+    def is_up(self, alias):
+        with self._lock:
+            return self._down_until.get(alias, 0) <= time.monotonic()
+
+    def choose(self):
+        aliases = replica_aliases()
+        if not aliases:
+            return None
+        start = next(self._counter)
+        for offset in range(len(aliases)):
+            alias = aliases[(start + offset) % len(aliases)]
+            if not self.is_up(alias):
+                continue
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError as e:
+                self.mark_down(alias, e)
+                continue
+            return alias
+        return None
+
+
+replica_health = ReplicaHealth()
+
+
+def _sticky_user_key(user_id):
+    return f"db:primary:user:{user_id}"
+
+
+def _bearer_user_id(request):
+    from apps.accounts.services import AuthService
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Bearer '):
+        return None
+    return AuthService.get_user_id_from_token(header[len('Bearer '):])
+
+
+def _read_from(alias, iterable):
+    """Keep routing a streaming body's queries while it is being consumed"""
+    iterator = iter(iterable)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route the reads of safe (GET/HEAD/OPTIONS) requests to a healthy
+    replica. After a successful write the client reads from the primary
+    for REPLICA_STICKY_SECONDS, so it sees its own changes: browsers via a
+    cookie, token clients via a per-user marker in the cache.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        alias = self.choose_alias(request)
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.finish(request, response, alias)
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        # Choosing connects to the replica and may read the cache
+        alias = await sync_to_async(self.choose_alias)(request)
+        token = _read_alias.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return await sync_to_async(self.finish)(request, response, alias)
+
+    def choose_alias(self, request):
+        if request.method in SAFE_METHODS and not self.is_sticky(request):
+            return replica_health.choose()
+        return None
+
+    def finish(self, request, response, alias):
+        if alias is not None and response.streaming and not response.is_async:
+            response.streaming_content = _read_from(alias, response.streaming_content)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.stick_to_primary(request, response)
+        return response
+
+    @staticmethod
+    def is_sticky(request):
+        try:
+            if float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        user_id = _bearer_user_id(request)
+        return user_id is not None and cache.get(_sticky_user_key(user_id)) is not None
+
+    @staticmethod
+    def stick_to_primary(request, response):
+        seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+        response.set_cookie(
+            STICKY_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, httponly=True, samesite='Lax'
+        )
+        user = getattr(request, 'user', None)
+        user_id = user.pk if user is not None and user.is_authenticated else _bearer_user_id(request)
+        if user_id is not None:
+            cache.set(_sticky_user_key(user_id), 1, timeout=seconds)
@@ -0,0 +1,204 @@
+# utils/instrumentation.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+class RequestMetrics:
+    """Timings collected while a single request is being handled"""
+
+    def __init__(self, capture_sql=False):
+        self.capture_sql = capture_sql
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.total_time = 0.0
+        self.started = 0.0
+        self.queries = []
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing every statement"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.db_time += duration
+            if self.capture_sql:
+                self.queries.append((duration, sql))
+
+    def server_timing(self):
+        return (
+            f'app;dur={self.total_time * 1000:.2f}, '
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries", '
+            f'serialize;dur={self.serialize_time * 1000:.2f}'
+        )
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.queries = 0
+        self.serialize_ms = 0.0
+        self.response_bytes = 0
+
+    def observe(self, metrics, response_size):
+        total_ms = metrics.total_time * 1000
+        self.count += 1
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, total_ms)] += 1
+        self.total_ms += total_ms
+        self.db_ms += metrics.db_time * 1000
+        self.queries += metrics.query_count
+        self.serialize_ms += metrics.serialize_time * 1000
+        self.response_bytes += response_size
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'buckets': dict(zip(LATENCY_BUCKETS_MS, self.buckets)),
+            'total_ms': self.total_ms,
+            'db_ms': self.db_ms,
+            'queries': self.queries,
+            'serialize_ms': self.serialize_ms,
+            'response_bytes': self.response_bytes,
+        }
+
+
+class RouteStatsRegistry:
+    """Per-route aggregates for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, metrics, response_size):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.observe(metrics, response_size)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: stats.as_dict() for route, stats in self._routes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStatsRegistry()
+
+
+def record_serialization(request, duration):
+    """Attribute rendering time to the request being instrumented, if any"""
+    metrics = getattr(request, 'perf_metrics', None)
+    if metrics is not None:
+        metrics.serialize_time += duration
+
+
+def route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    route = f"/{match.route}" if match is not None else 'unmatched'
+    return f"{request.method} {route}"
+
+
+class PerformanceMiddleware:
+    """
+    Measure wall time, DB queries and DB time, serialization time and
+    response size per route. Results go out as a Server-Timing header and
+    into route_stats; requests slower than SLOW_REQUEST_MS are logged with
+    their slowest SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from .metrics import metrics_store
+        self.get_response = get_response
+        self.metrics_store = metrics_store
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'PERF_INSTRUMENTATION', False):
+            return self.get_response(request)
+
+        metrics = self.start(request)
+        with self.wrap_connections(metrics):
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'PERF_INSTRUMENTATION', False):
+            return await self.get_response(request)
+
+        metrics = self.start(request)
+        # Connections are per thread: install the wrappers in the thread the
+        # request's sync and async ORM calls run in, not on the event loop
+        wrappers = await sync_to_async(self.wrap_connections)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self.finish(request, response, metrics)
+
+    @staticmethod
+    def start(request):
+        metrics = RequestMetrics(capture_sql=getattr(settings, 'SLOW_REQUEST_MS', 0) > 0)
+        metrics.started = time.perf_counter()
+        request.perf_metrics = metrics
+        return metrics
+
+    @staticmethod
+    def wrap_connections(metrics):
+        """Install the query hook on this thread's connections until closed"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(metrics.record_query))
+        return stack
+
+    def finish(self, request, response, metrics):
+        metrics.total_time = time.perf_counter() - metrics.started
+
+        # Streaming bodies are produced after we return, so only their
+        # headers are accounted for here
+        response_size = 0 if response.streaming else len(response.content)
+        route = route_label(request)
+        route_stats.observe(route, metrics, response_size)
+        self.metrics_store.maybe_flush()
+        response['Server-Timing'] = metrics.server_timing()
+
+        slow_request_ms = getattr(settings, 'SLOW_REQUEST_MS', 0)
+        if slow_request_ms and metrics.total_time * 1000 >= slow_request_ms:
+            self.log_slow_request(route, metrics)
+        return response
+
+    @staticmethod
+    def log_slow_request(route, metrics, max_queries=5):
+        slowest = sorted(metrics.queries, key=lambda query: query[0], reverse=True)[:max_queries]
+        logger.warning(
+            "Slow request %s: %.1fms, %d queries, %.1fms in DB\n%s",
+            route,
+            metrics.total_time * 1000,
+            metrics.query_count,
+            metrics.db_time * 1000,
+            "\n".join(f"  {duration * 1000:.1f}ms {sql}" for duration, sql in slowest),
+        )
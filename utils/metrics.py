@@ -0,0 +1,285 @@
+# utils/metrics.py
+import json
+import os
+import threading
+import time
+import weakref
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from .instrumentation import LATENCY_BUCKETS_MS, route_stats
+
+
+class CacheStats:
+    """Hit/miss counters for the application's named caches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hit': 0, 'miss': 0})
+            counts['hit' if hit else 'miss'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+cache_stats = CacheStats()
+
+
+class ConnectionStats:
+    """
+    Database connections of this process, across all its threads.
+
+    django.db.connections only holds the calling thread's connections, so
+    every connection wrapper is remembered, weakly, when it connects, and
+    the ones still connected are counted when asked. With DB_CONN_MODE=pool
+    a connected wrapper is one checked out of the pool; the pool's own
+    stats say how many connections it holds and how many callers wait.
+    """
+
+    POOL_STATS = ('pool_size', 'pool_available', 'pool_max', 'requests_waiting')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wrappers = weakref.WeakSet()
+
+    def connected(self, sender, connection, **kwargs):
+        with self._lock:
+            self._wrappers.add(connection)
+
+    def open_connections(self):
+        """Connected wrappers per alias"""
+        for alias in connections:
+            # Connected before this module was imported
+            if connections[alias].connection is not None:
+                self.connected(None, connections[alias])
+        with self._lock:
+            wrappers = list(self._wrappers)
+        counts = {alias: 0 for alias in connections}
+        for wrapper in wrappers:
+            if wrapper.connection is not None:
+                counts[wrapper.alias] = counts.get(wrapper.alias, 0) + 1
+        return counts
+
+    def pools(self):
+        """{alias: psycopg pool stats} for the pooled aliases"""
+        stats = {}
+        for alias in connections:
+            pool = getattr(connections[alias], 'pool', None)
+            if pool is not None:
+                pool_stats = pool.get_stats()
+                stats[alias] = {key: pool_stats.get(key, 0) for key in self.POOL_STATS}
+        return stats
+
+
+connection_stats = ConnectionStats()
+connection_created.connect(connection_stats.connected)
+
+
+class MetricsStore:
+    """
+    File-backed store aggregating metrics across worker processes.
+
+    Each process periodically writes its own counters to
+    ``METRICS_DIR/worker-<pid>.json``; a scrape sums every file so the
+    answer does not depend on which worker served it. Files of exited
+    workers keep contributing their counters but not their gauges.
+    """
+
+    def __init__(self, flush_interval=1.0):
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, 'METRICS_DIR'))
+
+    def collect(self):
+        return {
+            'pid': os.getpid(),
+            'routes': route_stats.snapshot(),
+            'cache': cache_stats.snapshot(),
+            'connections': connection_stats.open_connections(),
+            'pools': connection_stats.pools(),
+        }
+
+    def flush(self):
+        path = self.directory / f"worker-{os.getpid()}.json"
+        tmp_path = path.with_suffix('.tmp')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(json.dumps(self.collect()))
+        tmp_path.replace(path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush at most once per flush_interval; cheap enough to call per request"""
+        if time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self.flush()
+        except OSError:
+            pass
+        finally:
+            self._lock.release()
+
+    def read_all(self):
+        """Snapshots from every worker, this process's always current"""
+        own = None
+        try:
+            self.flush()
+        except OSError:
+            # Unwritable directory: report this process straight from memory
+            own = self.collect()
+        snapshots = [own] if own is not None else []
+        for path in self.directory.glob('worker-*.json'):
+            if own is not None and path.name == f"worker-{own['pid']}.json":
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def clear(self):
+        for path in self.directory.glob('worker-*'):
+            path.unlink(missing_ok=True)
+
+
+metrics_store = MetricsStore()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _bucket_label(bound):
+    return '+Inf' if bound == float('inf') else str(bound)
+
+
+def render_prometheus(snapshots):
+    """Merge worker snapshots into the Prometheus text exposition format"""
+    routes = {}
+    for snapshot in snapshots:
+        for route, stats in snapshot['routes'].items():
+            merged = routes.setdefault(route, {
+                'count': 0, 'buckets': [0] * len(LATENCY_BUCKETS_MS), 'total_ms': 0.0,
+                'db_ms': 0.0, 'queries': 0, 'serialize_ms': 0.0, 'response_bytes': 0,
+            })
+            for key in ('count', 'total_ms', 'db_ms', 'queries', 'serialize_ms', 'response_bytes'):
+                merged[key] += stats[key]
+            # JSON turned the bucket bounds into strings; order is preserved
+            for i, count in enumerate(stats['buckets'].values()):
+                merged['buckets'][i] += count
+
+    lines = [
+        "# HELP http_requests_total Requests handled, per route.",
+        "# TYPE http_requests_total counter",
+    ]
+    for route, stats in sorted(routes.items()):
+        lines.append(f"http_requests_total{_labels(route=route)} {stats['count']}")
+
+    lines += [
+        "# HELP http_request_duration_ms Request wall time in milliseconds.",
+        "# TYPE http_request_duration_ms histogram",
+    ]
+    for route, stats in sorted(routes.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, stats['buckets']):
+            cumulative += count
+            lines.append(
+                f"http_request_duration_ms_bucket{_labels(route=route, le=_bucket_label(bound))} {cumulative}"
+            )
+        lines.append(f"http_request_duration_ms_sum{_labels(route=route)} {stats['total_ms']:.3f}")
+        lines.append(f"http_request_duration_ms_count{_labels(route=route)} {stats['count']}")
+
+    for name, key, help_text in (
+        ('db_queries_total', 'queries', 'Database queries issued, per route.'),
+        ('db_time_ms_total', 'db_ms', 'Time spent in the database, per route.'),
+        ('serialize_time_ms_total', 'serialize_ms', 'Time spent rendering responses, per route.'),
+        ('http_response_bytes_total', 'response_bytes', 'Response body bytes, per route.'),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for route, stats in sorted(routes.items()):
+            value = stats[key]
+            value = f"{value:.3f}" if isinstance(value, float) else value
+            lines.append(f"{name}{_labels(route=route)} {value}")
+
+    cache_counts = {}
+    for snapshot in snapshots:
+        for cache_name, counts in snapshot['cache'].items():
+            merged = cache_counts.setdefault(cache_name, {'hit': 0, 'miss': 0})
+            merged['hit'] += counts['hit']
+            merged['miss'] += counts['miss']
+    lines += [
+        "# HELP cache_requests_total Application cache lookups by result.",
+        "# TYPE cache_requests_total counter",
+    ]
+    for cache_name, counts in sorted(cache_counts.items()):
+        for result in ('hit', 'miss'):
+            lines.append(f"cache_requests_total{_labels(cache=cache_name, result=result)} {counts[result]}")
+    lines += [
+        "# HELP cache_hit_ratio Share of application cache lookups that hit.",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    for cache_name, counts in sorted(cache_counts.items()):
+        total = counts['hit'] + counts['miss']
+        ratio = counts['hit'] / total if total else 0.0
+        lines.append(f"cache_hit_ratio{_labels(cache=cache_name)} {ratio:.4f}")
+
+    open_by_alias = {}
+    pools = {}
+    live_workers = 0
+    for snapshot in snapshots:
+        if not _pid_alive(snapshot['pid']):
+            continue
+        live_workers += 1
+        for alias, count in snapshot['connections'].items():
+            open_by_alias[alias] = open_by_alias.get(alias, 0) + count
+        for alias, stats in snapshot.get('pools', {}).items():
+            merged = pools.setdefault(alias, {})
+            for key, value in stats.items():
+                merged[key] = merged.get(key, 0) + value
+    lines += [
+        "# HELP db_connections_open Database connections held by live workers' threads "
+        "(checked out of the pool when pooled).",
+        "# TYPE db_connections_open gauge",
+    ]
+    for alias, count in sorted(open_by_alias.items()):
+        lines.append(f"db_connections_open{_labels(alias=alias)} {count}")
+    for name, key, help_text in (
+        ('db_pool_size', 'pool_size', "Connections held by the live workers' pools."),
+        ('db_pool_available', 'pool_available', "Idle connections in the live workers' pools."),
+        ('db_pool_max', 'pool_max', "Most connections the live workers' pools may open."),
+        ('db_pool_requests_waiting', 'requests_waiting', "Callers waiting for a pooled connection."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for alias, stats in sorted(pools.items()):
+            lines.append(f"{name}{_labels(alias=alias)} {stats.get(key, 0)}")
+    lines += [
+        "# HELP workers_live Worker processes currently reporting metrics.",
+        "# TYPE workers_live gauge",
+        f"workers_live {live_workers}",
+    ]
+    return "\n".join(lines) + "\n"
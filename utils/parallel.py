@@ -0,0 +1,41 @@
+# utils/parallel.py
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    django.setup()
+
+
+def _run_chunk(func, args):
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def map_chunks(func, chunks, workers=4):
+    """
+    [func(*chunk) for chunk in chunks], spread over a pool of worker
+    processes that each open their own database connections. func must be
+    importable by name (a module-level function or a staticmethod).
+    """
+    if workers <= 1 or len(chunks) <= 1:
+        return [func(*chunk) for chunk in chunks]
+
+    # Forked workers must not share this process's connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(_run_chunk, func, chunk) for chunk in chunks]
+        results = []
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Error in parallel chunk {chunk}: {e}")
+                raise
+        return results
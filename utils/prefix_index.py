@@ -0,0 +1,195 @@
+# utils/prefix_index.py
+import heapq
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Sorts after every character a key can contain
+_KEY_END = '\U0010ffff'
+
+
+def normalize(text):
+    """Case- and accent-insensitive form of a name: 'Crème  Brûlée' -> 'creme brulee'"""
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Names searchable by prefix, best scored first.
+
+    Normalized names live in one sorted list, so a prefix is a contiguous
+    range found with two bisects. Small ranges are ranked on the spot; the
+    top entries of large ones (short prefixes) are computed once and kept
+    until an entry under that prefix changes. When a query has fewer
+    matches than asked for, prefixes one edit away fill the rest.
+
+    Memory is a few parallel arrays plus two strings per name: no trie
+    nodes, and nothing per prefix beyond the cached top entries.
+    """
+
+    KEY_LENGTH = 48
+    SCAN_LIMIT = 256
+    MAX_LIMIT = 50
+    TYPO_MIN_LENGTH = 3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._key_slots = array('q')
+        self._ids = array('q')
+        self._names = []
+        self._scores = array('d')
+        self._slot_of = {}
+        self._free = []
+        self._top = {}
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, item_id):
+        return item_id in self._slot_of
+
+    @classmethod
+    def build(cls, entries):
+        """Index (id, name, score) entries in one sort"""
+        index = cls()
+        pairs = []
+        for item_id, name, score in entries:
+            key = normalize(name)[:cls.KEY_LENGTH]
+            if not key:
+                continue
+            pairs.append((key, index._new_slot(item_id, name, score)))
+        pairs.sort()
+        index._keys = [key for key, _ in pairs]
+        index._key_slots = array('q', (slot for _, slot in pairs))
+        return index
+
+    def _new_slot(self, item_id, name, score):
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot], self._names[slot], self._scores[slot] = item_id, name, score
+        else:
+            slot = len(self._names)
+            self._ids.append(item_id)
+            self._names.append(name)
+            self._scores.append(score)
+        self._slot_of[item_id] = slot
+        return slot
+
+    def _forget(self, key):
+        for length in range(1, len(key) + 1):
+            self._top.pop(key[:length], None)
+
+    def _remove(self, item_id):
+        slot = self._slot_of.pop(item_id, None)
+        if slot is None:
+            return
+        key = normalize(self._names[slot])[:self.KEY_LENGTH]
+        position = bisect_left(self._keys, key)
+        while self._key_slots[position] != slot:
+            position += 1
+        del self._keys[position]
+        del self._key_slots[position]
+        self._names[slot] = None
+        self._free.append(slot)
+        self._forget(key)
+
+    def upsert(self, item_id, name, score=0.0):
+        """Add a name, or replace the name and score indexed for item_id"""
+        with self._lock:
+            self._remove(item_id)
+            key = normalize(name)[:self.KEY_LENGTH]
+            if not key:
+                return
+            slot = self._new_slot(item_id, name, score)
+            position = bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._key_slots.insert(position, slot)
+            self._forget(key)
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove(item_id)
+
+    def _range(self, prefix):
+        low = bisect_left(self._keys, prefix)
+        return low, bisect_left(self._keys, prefix + _KEY_END, low)
+
+    def _best(self, prefix, limit):
+        """Slots under prefix with the highest scores, best first"""
+        low, high = self._range(prefix)
+        if high - low <= self.SCAN_LIMIT:
+            return heapq.nlargest(limit, self._key_slots[low:high], key=self._scores.__getitem__)
+        top = self._top.get(prefix)
+        if top is None:
+            top = self._top[prefix] = heapq.nlargest(
+                self.MAX_LIMIT, self._key_slots[low:high], key=self._scores.__getitem__
+            )
+        return top[:limit]
+
+    def _near(self, query):
+        """
+        Prefixes one edit away from query (a deleted, swapped, replaced or
+        missing character) that some name starts with.
+
+        Every edit at position i keeps query[:i], so candidates are only
+        looked up among the names sharing that head, and only with the
+        characters those names actually have at position i. Once no name
+        starts with the head, later positions cannot match either. Edits
+        at the very end are left out: dropping the last character already
+        matches everything they would.
+        """
+        keys = self._keys
+        near = set()
+
+        def check(candidate, low, high):
+            position = bisect_left(keys, candidate, low, high)
+            if position < high and keys[position].startswith(candidate):
+                near.add(candidate)
+
+        low, high = 0, len(keys)
+        check(query[:-1], low, high)
+        for i in range(len(query) - 1):
+            head, tail = query[:i], query[i:]
+            check(head + tail[1:], low, high)
+            check(head + tail[1] + tail[0] + tail[2:], low, high)
+            position = low
+            while position < high:
+                key = keys[position]
+                if len(key) <= i:
+                    position += 1
+                    continue
+                branch = head + key[i]
+                branch_high = bisect_left(keys, branch + _KEY_END, position, high)
+                if key[i] != tail[0]:
+                    check(branch + tail[1:], position, branch_high)
+                check(branch + tail, position, branch_high)
+                position = branch_high
+
+            low = bisect_left(keys, query[:i + 1], low, high)
+            high = bisect_left(keys, query[:i + 1] + _KEY_END, low, high)
+            if low >= high:
+                break
+        return near
+
+    def search(self, query, limit=10, typos=True):
+        """[(id, name)] of the best names starting with query"""
+        prefix = normalize(query)[:self.KEY_LENGTH]
+        limit = min(limit, self.MAX_LIMIT)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            slots = self._best(prefix, limit)
+            if typos and len(slots) < limit and len(prefix) >= self.TYPO_MIN_LENGTH:
+                found = set(slots)
+                candidates = set()
+                for edit in self._near(prefix):
+                    if len(edit) >= self.TYPO_MIN_LENGTH - 1:
+                        candidates.update(self._best(edit, limit))
+                candidates -= found
+                slots += heapq.nlargest(limit - len(slots), candidates, key=self._scores.__getitem__)
+            return [(self._ids[slot], self._names[slot]) for slot in slots]
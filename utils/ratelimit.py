@@ -0,0 +1,168 @@
+# utils/ratelimit.py
+import math
+import re
+import threading
+import time
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60), '20/15m' -> (20, 900)"""
+    match = RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f"Invalid rate {rate!r}")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNIT_SECONDS[unit]
+
+
+class LocalRateLimitStore:
+    """Counters in this process only; for tests and single-process development"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def hit(self, key, window_index, window):
+        with self._lock:
+            if len(self._counts) >= self.max_keys:
+                self._sweep(time.time())
+            current_key = (key, window_index)
+            # Like the cache store's timeout: a counter lives on as the
+            # next window's "previous" count
+            count, expires_at = self._counts.get(current_key, (0, (window_index + 2) * window))
+            self._counts[current_key] = (count + 1, expires_at)
+            previous = self._counts.get((key, window_index - 1), (0, 0))[0]
+            return previous, count + 1
+
+    def _sweep(self, now):
+        self._counts = {key: value for key, value in self._counts.items() if value[1] > now}
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class CacheRateLimitStore:
+    """Counters in the default cache, shared by every worker when it is Redis"""
+
+    def hit(self, key, window_index, window):
+        current_key = f"{key}:{window_index}"
+        # Counters outlive their window by one window: they are the next
+        # window's "previous" count
+        cache.add(current_key, 0, timeout=2 * window)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(current_key, 1, timeout=2 * window)
+            current = 1
+        previous = cache.get(f"{key}:{window_index - 1}", 0)
+        return previous, current
+
+    def clear(self):
+        pass
+
+
+_stores = {'local': LocalRateLimitStore(), 'cache': CacheRateLimitStore()}
+
+
+def get_store():
+    return _stores[getattr(settings, 'RATELIMIT_STORE', 'cache')]
+
+
+def sliding_window_hit(key, limit, window, store=None, now=None):
+    """
+    Count a hit against ``key`` and return seconds to wait, or 0 if allowed.
+
+    The window is approximated from two fixed windows: the previous one's
+    count weighted by how much of it still overlaps the sliding window,
+    plus the current one's. One increment and one read per hit.
+    """
+    store = store or get_store()
+    now = time.time() if now is None else now
+    window_index, offset = divmod(now, window)
+    previous, current = store.hit(key, int(window_index), window)
+    elapsed = offset / window
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+
+    # Long enough that the retry, itself a hit, is allowed
+    if current < limit:
+        # Wait for the previous window's share to decay enough
+        wait = (1 - (limit - current - 1) / previous - elapsed) * window
+    else:
+        # Wait for this window to roll over and then decay in turn
+        wait = (1 - elapsed) * window + (1 - (limit - 1) / current) * window
+    return max(1, math.ceil(wait))
+
+
+def client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def rate_limit(scope, per_ip=None, per_account=None, account=None):
+    """
+    Throttle a Ninja endpoint per client IP and, optionally, per account.
+
+    Rates are strings like ``'10/m'`` or ``'5/15m'``. ``account`` maps the
+    request payload to the account being targeted (e.g. the email); hits
+    with no account are only limited per IP. Over the limit the view is not
+    called at all and the client gets a 429 with Retry-After.
+    """
+    limits = []
+    if per_ip:
+        limits.append(('ip', parse_rate(per_ip)))
+    if per_account:
+        limits.append(('account', parse_rate(per_account)))
+
+    def check(request, kwargs):
+        if not getattr(settings, 'RATELIMIT_ENABLED', True):
+            return None
+        identities = {'ip': client_ip(request)}
+        if account is not None and kwargs.get('payload') is not None:
+            identities['account'] = account(kwargs['payload'])
+
+        retry_after = 0
+        for kind, (limit, window) in limits:
+            identity = identities.get(kind)
+            if not identity:
+                continue
+            key = f"ratelimit:{scope}:{kind}:{identity}"
+            retry_after = max(retry_after, sliding_window_hit(key, limit, window))
+        if not retry_after:
+            return None
+
+        response = JsonResponse({"detail": "Too many requests, try again later"}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                limited = await sync_to_async(check)(request, kwargs)
+                if limited is not None:
+                    return limited
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            limited = check(request, kwargs)
+            if limited is not None:
+                return limited
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,178 @@
+# utils/singleflight.py
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from .metrics import cache_stats
+from .renderers import dumps
+
+
+class SingleFlight:
+    """
+    Cache computed values so that only one caller recomputes a missing or
+    expiring entry.
+
+    Entries carry their own expiry and outlive it by a stale window. Within
+    one process concurrent callers share a single computation; across
+    processes a lock key in the cache elects the one that recomputes. While
+    a refresh is in flight everyone else is served the stale value, and a
+    cold key makes them wait for the winner instead of querying too.
+
+    To keep popular entries from all expiring at once, each read may treat
+    an entry as expired slightly early, with a probability rising as expiry
+    nears and with how long the value took to compute ("XFetch").
+    """
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    @staticmethod
+    def _is_fresh(entry, version, now):
+        if version is not None and entry['version'] != version:
+            return False
+        beta = getattr(settings, 'CACHE_EARLY_EXPIRY_BETA', 1.0)
+        # -log(u) for u in (0, 1] is >= 0, and only rarely large
+        early = entry['delta'] * beta * -math.log(1.0 - random.random())
+        return now + early < entry['expires']
+
+    def get_or_compute(self, key, compute, ttl, stale_ttl=0, version=None, name=None):
+        """
+        Return the cached value for ``key``, calling ``compute()`` at most
+        once across concurrent callers when it is missing or expired. An
+        entry made for another ``version`` counts as expired but may still
+        be served stale.
+        """
+        entry = cache.get(key)
+        if entry is not None and self._is_fresh(entry, version, time.time()):
+            if name:
+                cache_stats.record(name, hit=True)
+            return entry['value']
+        if name:
+            cache_stats.record(name, hit=False)
+
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+
+        if not leader:
+            if entry is not None:
+                return entry['value']
+            return future.result()
+
+        try:
+            value = self._refresh(key, compute, ttl, stale_ttl, version, entry)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def _refresh(self, key, compute, ttl, stale_ttl, version, entry):
+        lock_key = f"{key}:lock"
+        lock_seconds = getattr(settings, 'SINGLE_FLIGHT_LOCK_SECONDS', 10)
+        if cache.add(lock_key, 1, timeout=lock_seconds):
+            try:
+                return self._compute(key, compute, ttl, stale_ttl, version)
+            finally:
+                cache.delete(lock_key)
+
+        # Another process is refreshing: serve stale, or wait for its result
+        if entry is not None:
+            return entry['value']
+        deadline = time.monotonic() + lock_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.POLL_SECONDS)
+            entry = cache.get(key)
+            if entry is not None and (version is None or entry['version'] == version):
+                return entry['value']
+        # The lock holder died or is too slow; compute rather than fail
+        return self._compute(key, compute, ttl, stale_ttl, version)
+
+    @staticmethod
+    def _compute(key, compute, ttl, stale_ttl, version):
+        start = time.perf_counter()
+        value = compute()
+        entry = {
+            'value': value,
+            'version': version,
+            'delta': time.perf_counter() - start,
+            'expires': time.time() + ttl,
+        }
+        cache.set(key, entry, timeout=ttl + stale_ttl)
+        return value
+
+
+single_flight = SingleFlight()
+
+
+def _render(schema, result):
+    if isinstance(result, HttpResponse):
+        return result.content
+    if isinstance(result, dict) and 'items' in result:
+        return dumps({**result, 'items': [schema.from_orm(item).model_dump() for item in result['items']]})
+    return dumps([schema.from_orm(item).model_dump() for item in result])
+
+
+def cached_response(name, schema, version=None):
+    """
+    Serve a read-only list endpoint from the cache through ``single_flight``.
+
+    The rendered JSON is cached per path and query string for
+    CATALOG_CACHE_TTL seconds and may be served stale for
+    CATALOG_CACHE_STALE_SECONDS more while one caller refreshes it.
+    ``version`` returns the current data version; entries made for an older
+    one are refreshed. Place it above ``@trusted_output``; a TTL of 0
+    disables it.
+    """
+    def key_for(request):
+        query = urlencode(sorted(request.GET.items()))
+        return f"response:{name}:{request.path}?{query}"
+
+    def get_content(request, compute):
+        return single_flight.get_or_compute(
+            key_for(request),
+            compute,
+            ttl=getattr(settings, 'CATALOG_CACHE_TTL', 0),
+            stale_ttl=getattr(settings, 'CATALOG_CACHE_STALE_SECONDS', 0),
+            version=version() if version is not None else None,
+            name=name,
+        )
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if not getattr(settings, 'CATALOG_CACHE_TTL', 0):
+                    return await view_func(request, *args, **kwargs)
+
+                def compute():
+                    return _render(schema, async_to_sync(view_func)(request, *args, **kwargs))
+
+                content = await sync_to_async(get_content)(request, compute)
+                return HttpResponse(content, content_type="application/json")
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'CATALOG_CACHE_TTL', 0):
+                return view_func(request, *args, **kwargs)
+            content = get_content(request, lambda: _render(schema, view_func(request, *args, **kwargs)))
+            return HttpResponse(content, content_type="application/json")
+        return wrapper
+    return decorator
@@ -0,0 +1,58 @@
+# utils/streaming.py
+from itertools import islice
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from django.utils.text import compress_sequence
+from .renderers import dumps
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def iter_chunks(iterable, chunk_size):
+    """Yield lists of up to chunk_size items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_ndjson(rows, finish_rows=None, chunk_size=2000):
+    """
+    Encode rows as newline-delimited JSON.
+
+    ``rows`` is usually ``queryset.values().iterator(chunk_size=...)`` so the
+    database streams through a server-side cursor; ``finish_rows`` can attach
+    related data to each chunk with one query.
+    """
+    for chunk in iter_chunks(rows, chunk_size):
+        if finish_rows is not None:
+            chunk = finish_rows(chunk)
+        yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+
+def ndjson_response(request, lines, last_modified=None, filename=None):
+    """
+    Stream NDJSON lines, honouring If-Modified-Since and gzip when the client
+    accepts it. ``lines`` is only consumed if a body is actually sent.
+    """
+    if last_modified is not None:
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_modified_since is not None and int(last_modified.timestamp()) <= if_modified_since:
+            response = HttpResponseNotModified()
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+            return response
+
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = StreamingHttpResponse(compress_sequence(lines), content_type=NDJSON_CONTENT_TYPE)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(lines, content_type=NDJSON_CONTENT_TYPE)
+    response['Vary'] = 'Accept-Encoding'
+
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response